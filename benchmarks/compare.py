@@ -0,0 +1,70 @@
+"""
+Compares two results files of benchmarks.phases and flags the phases that got
+slower, or used more memory, by more than a tolerance.
+
+Run from the repository root with
+
+    python -m benchmarks.compare before.json after.json --tolerance 0.1
+
+Exits with status 1 if there is a regression.
+"""
+import argparse
+import json
+import sys
+
+key = ("n", "d", "r", "s", "engine")
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    return data, {tuple(x[k] for k in key): x for x in data["results"]}
+
+
+def regressions(before, after, tolerance=0.1, min_seconds=1e-3):
+    """(point, phase, measure, before, after) for each phase that got worse.
+    Phases faster than min_seconds in both are too noisy to compare times."""
+    found = []
+    for point, new in after.items():
+        if (old := before.get(point)) is None:
+            continue
+        for phase, x in new["stages"].items():
+            if (y := old["stages"].get(phase)) is None:
+                continue
+            if max(x["seconds"], y["seconds"]) >= min_seconds and (
+                x["seconds"] > y["seconds"] * (1 + tolerance)
+            ):
+                found.append((point, phase, "seconds", y["seconds"], x["seconds"]))
+            if x["peak_memory"] > y["peak_memory"] * (1 + tolerance):
+                found.append((point, phase, "peak_memory", y["peak_memory"], x["peak_memory"]))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+    (info_before, before), (info_after, after) = load(args.before), load(args.after)
+    print(f"{info_before['commit']} -> {info_after['commit']}")
+    phases = sorted({p for x in after.values() for p in x["stages"]})
+    print(f"{'phase':>15} {'before s':>10} {'after s':>10} {'ratio':>7}")
+    for phase in phases:
+        pairs = [
+            (before[k]["stages"][phase]["seconds"], x["stages"][phase]["seconds"])
+            for k, x in after.items()
+            if k in before and phase in x["stages"] and phase in before[k]["stages"]
+        ]
+        if pairs:
+            old, new = (sum(x) for x in zip(*pairs))
+            print(f"{phase:>15} {old:>10.3f} {new:>10.3f} {new / max(old, 1e-9):>7.2f}")
+    found = regressions(before, after, args.tolerance)
+    for point, phase, measure, old, new in found:
+        point = " ".join(f"{k}={v}" for k, v in zip(key, point))
+        print(f"REGRESSION {point} {phase} {measure}: {old:.4g} -> {new:.4g}")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
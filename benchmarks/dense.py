@@ -0,0 +1,80 @@
+"""
+Time to generate the remaining arcs of near-complete instances, one
+predecessor at a time with gen_arcs_to_nodes and by complement sampling with
+gen_remaining_arcs_dense, with the weights of the arcs.
+
+Run from the repository root with
+
+    python -m benchmarks.dense --n 1000 10000 --d 1
+
+The arcs are counted and dropped rather than stored, an instance with n = 10^4
+and d = 1 has 10^8 of them. Drawing them one at a time takes hours at that
+size, so it is timed over the nodes order[:--sample] and the time for all the
+arcs is extrapolated from its rate.
+"""
+import argparse
+import random
+import time
+from functools import partial
+from strong_graphs.arc_generators import gen_arcs_to_nodes, plan_remaining_arcs
+from strong_graphs.generator import arc_weight_remaining, build_instance
+from strong_graphs.negative import nb_neg_arcs
+from strong_graphs.progress import Progress
+from strong_graphs.utils import determine_order, nb_arcs_from_density
+
+
+class ArcCounter:
+    """Takes the place of an ArcSpool, counting the arcs it is given"""
+
+    def __init__(self):
+        self.count = 0
+
+    def add_arc(self, u, v, w):
+        self.count += 1
+
+    def add_arcs(self, tails, heads, weights):
+        self.count += len(tails)
+
+    def number_of_arcs(self):
+        return self.count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--d", type=float, nargs="+", default=[1])
+    parser.add_argument("--r", type=float, default=0.5)
+    parser.add_argument("--sample", type=int, default=100, help="Nodes the one at a time generator is timed over")
+    args = parser.parse_args(argv)
+    print(f"{'n':>7} {'d':>5} {'m':>11} {'one at a time s':>16} {'dense s':>9} {'speedup':>8}")
+    for n in args.n:
+        for d in args.d:
+            m = min(n * (n - 1), nb_arcs_from_density(n, d))
+            D = partial(random.Random.randint, a=-1000, b=1000)
+            progress, counter = Progress(quiet=True), ArcCounter()
+            network, _, distances, _, _ = build_instance(
+                random.Random(0), n, m, args.r, D, engine="dense", progress=progress, spool=counter
+            )
+            dense_s = next(x.seconds for x in progress.stages if x.name == "Remaining arcs")
+            # The same plan for the one at a time generator
+            ξ = random.Random(1)
+            order = determine_order(distances)
+            start = time.perf_counter()
+            allocation, vacancies = plan_remaining_arcs(
+                ξ, network, n, m, nb_neg_arcs(n, m, args.r), Progress(quiet=True), None, order
+            )
+            plan_s = time.perf_counter() - start
+            start = time.perf_counter()
+            arcs = gen_arcs_to_nodes(ξ, network.has_arc, n, order, allocation, vacancies, 0, args.sample)
+            k = 0
+            for u, v, is_negative in arcs:
+                arc_weight_remaining(ξ, D, distances[v] - distances[u], is_negative)
+                k += 1
+            python_s = plan_s + (time.perf_counter() - start) * counter.count / max(k, 1)
+            print(
+                f"{n:>7} {d:>5} {counter.count:>11} {python_s:>16.1f} {dense_s:>9.2f} {python_s / dense_s:>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
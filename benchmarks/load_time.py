@@ -0,0 +1,39 @@
+"""
+Time to load an instance from extended DIMACS against the binary format.
+
+Run from the repository root with
+
+    python -m benchmarks.load_time 100000 1000000
+"""
+import os
+import sys
+import tempfile
+import time
+from strong_graphs.formats import read_binary, read_dimacs
+from strong_graphs.generator import generate_instance
+
+
+def timed(f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    sizes = [int(x) for x in sys.argv[1:]] or [10000, 100000]
+    print(f"{'m':>10} {'DIMACS MB':>10} {'binary MB':>10} {'DIMACS s':>9} {'memmap s':>9} {'sum s':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for m in sizes:
+            generate_instance(m, 0, False, True, output_dir=f"{directory}/")
+            generate_instance(m, 0, False, True, output_dir=f"{directory}/", file_format="binary")
+            dimacs = os.path.join(directory, f"strong-graph-{m}-0")
+            binary = dimacs + ".bin"
+            _, text_time = timed(read_dimacs, dimacs)
+            instance, binary_time = timed(read_binary, binary)
+            # Touching every weight forces the pages of the memory map in
+            _, sum_time = timed(lambda: instance.weights.sum())
+            print(
+                f"{m:>10} {os.path.getsize(dimacs) / 2**20:>10.1f} "
+                f"{os.path.getsize(binary) / 2**20:>10.1f} {text_time:>9.3f} "
+                f"{binary_time:>9.4f} {sum_time:>9.4f}"
+            )
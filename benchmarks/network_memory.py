@@ -0,0 +1,40 @@
+"""
+Peak memory of build_instance using Network against CompactNetwork.
+
+Run from the repository root with
+
+    python -m benchmarks.network_memory 1000 10000 100000
+"""
+import random
+import sys
+import time
+import tracemalloc
+from functools import partial
+from strong_graphs.generator import build_instance
+from strong_graphs.data_structure import Network, CompactNetwork
+from strong_graphs.generator import determine_n
+
+
+def measure(network_type, m, d=0.5, r=0.5, s=0):
+    ξ = random.Random(s)
+    n = determine_n(m, d)
+    D = partial(random.Random.randint, a=-1000, b=1000)
+    tracemalloc.start()
+    start = time.perf_counter()
+    network, *_ = build_instance(ξ, n, m, r, D, network_type=network_type)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return network.number_of_arcs(), current, peak, elapsed
+
+
+if __name__ == "__main__":
+    sizes = [int(x) for x in sys.argv[1:]] or [1000, 10000, 100000]
+    print(f"{'class':>15} {'m':>10} {'final MB':>10} {'peak MB':>10} {'B/arc':>8} {'time s':>8}")
+    for m in sizes:
+        for network_type in (Network, CompactNetwork):
+            arcs, current, peak, elapsed = measure(network_type, m)
+            print(
+                f"{network_type.__name__:>15} {arcs:>10} {current / 2**20:>10.1f} "
+                f"{peak / 2**20:>10.1f} {current / arcs:>8.0f} {elapsed:>8.2f}"
+            )
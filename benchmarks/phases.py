@@ -0,0 +1,110 @@
+"""
+Time and peak traced memory of each phase of build_instance and output over a
+grid of n, density d and negative arc ratio r, saved as JSON for
+benchmarks.compare.
+
+Run from the repository root with
+
+    python -m benchmarks.phases results.json --n 1000 10000 --d 0 0.001 --r 0 0.5 0.9
+
+Whether an instance needed remapping depends on the seed, so each point of the
+grid is run for several seeds and the result records whether it was remapped.
+The seconds of a phase are the fastest of `--repeats` runs. Tracing memory
+slows Python down several times over, so the peak memory is measured in one
+more run with tracemalloc, the largest traced while the phase was open.
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from functools import partial
+from strong_graphs.generator import build_instance, change_source_nodes
+from strong_graphs.output import output
+from strong_graphs.progress import Progress
+from strong_graphs.utils import nb_arcs_from_density
+
+
+def run(n, d, r, s, output_dir, engine="python", trace=False):
+    """The stages of generating and writing one instance"""
+    ξ = random.Random(s)
+    m = max(n, nb_arcs_from_density(n, d))
+    D = partial(random.Random.randint, a=-1000, b=1000)
+    progress = Progress(quiet=True)
+    if trace:
+        tracemalloc.start()
+    try:
+        network, *_ = build_instance(ξ, n, m, r, D, engine=engine, progress=progress)
+        change_source_nodes(ξ, network, 1)
+        output(ξ, network, 0, m, d, r, s, 1, -1000, 1000, -1, output_dir=output_dir, progress=progress)
+    finally:
+        tracemalloc.stop()
+    return m, progress.stages
+
+
+def measure(n, d, r, s, repeats, output_dir, engine="python"):
+    stages = {}
+    for _ in range(repeats):
+        m, run_stages = run(n, d, r, s, output_dir, engine)
+        for stage in run_stages:
+            best = stages.setdefault(stage.name, stage.as_dict())
+            best["seconds"] = min(best["seconds"], stage.seconds)
+    _, run_stages = run(n, d, r, s, output_dir, engine, trace=True)
+    for stage in run_stages:
+        stages[stage.name]["peak_memory"] = stage.peak_memory
+    for stage in stages.values():
+        del stage["stage"]
+    return {
+        "n": n, "m": m, "d": d, "r": r, "s": s, "engine": engine,
+        "remapped": "Remapping" in stages,
+        "stages": stages,
+    }
+
+
+def commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="JSON file the results are written to")
+    parser.add_argument("--n", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--d", type=float, nargs="+", default=[0, 0.01])
+    parser.add_argument("--r", type=float, nargs="+", default=[0, 0.5, 0.9])
+    parser.add_argument("--seeds", type=int, default=2)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--engine", choices=["python", "numpy"], default="python")
+    args = parser.parse_args(argv)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n in args.n:
+            for d in args.d:
+                for r in args.r:
+                    for s in range(args.seeds):
+                        result = measure(n, d, r, s, args.repeats, f"{directory}/", args.engine)
+                        results.append(result)
+                        total = sum(x["seconds"] for x in result["stages"].values())
+                        print(
+                            f"n={n} m={result['m']} d={d} r={r} s={s} "
+                            f"remapped={result['remapped']} {total:.3f}s",
+                            file=sys.stderr,
+                        )
+    with open(args.path, "w") as f:
+        json.dump(
+            {"commit": commit(), "python": platform.python_version(), "results": results},
+            f,
+            indent=1,
+        )
+
+
+if __name__ == "__main__":
+    main()
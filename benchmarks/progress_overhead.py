@@ -0,0 +1,47 @@
+"""
+Cost of reporting progress once per item with tqdm against a Stage, which
+counts in batches and does nothing per item when quiet.
+
+Run from the repository root with
+
+    python -m benchmarks.progress_overhead 10000000
+"""
+import sys
+import time
+import tqdm
+from strong_graphs.progress import Progress
+
+
+def timed(f):
+    start = time.perf_counter()
+    f()
+    return time.perf_counter() - start
+
+
+def bare(n):
+    for _ in range(n):
+        pass
+
+
+def per_item_tqdm(n):
+    with tqdm.tqdm(total=n) as bar:
+        for _ in range(n):
+            bar.update()
+
+
+def stage(n, quiet):
+    with Progress(quiet=quiet).stage("Items", total=n) as s:
+        for _ in s.track(range(n)):
+            pass
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if sys.argv[1:] else 10**7
+    results = {
+        "bare loop": timed(lambda: bare(n)),
+        "tqdm per item": timed(lambda: per_item_tqdm(n)),
+        "Stage": timed(lambda: stage(n, quiet=False)),
+        "quiet Stage": timed(lambda: stage(n, quiet=True)),
+    }
+    for name, seconds in results.items():
+        print(f"{name:>15} {seconds:>8.3f}s {1e9 * seconds / n:>8.1f}ns/item", file=sys.stderr)
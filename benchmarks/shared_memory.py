@@ -0,0 +1,77 @@
+"""
+Time to hand the arcs of an instance to worker processes by pickling a
+Network, by pickling the arc arrays and through a SharedArcs segment. Each
+worker only sums its share of the weights, so the times are of moving the arcs.
+
+Run from the repository root with
+
+    python -m benchmarks.shared_memory 100000 1000000 --workers 4
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from strong_graphs.data_structure import CompactNetwork, Network
+from strong_graphs.generator import build_instance, determine_n
+from strong_graphs.shared import SharedArcs
+
+
+def sum_network(network):
+    return sum(w for _, _, w in network.arcs())
+
+
+def sum_arrays(tails, heads, weights):
+    return weights.sum().item()
+
+
+def sum_shared(handle, start, stop):
+    arcs = SharedArcs.attach(handle)
+    try:
+        return arcs.weights[start:stop].sum().item()
+    finally:
+        arcs.close()
+
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("m", type=int, nargs="*", default=[100000])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+    w = args.workers
+    print(f"{'m':>10} {'Network s':>10} {'arrays s':>10} {'shared s':>10} {'setup s':>10}")
+    for m in args.m:
+        D = partial(random.Random.randint, a=-1000, b=1000)
+        n = determine_n(m, 0.5)
+        network, *_ = build_instance(random.Random(0), n, m, 0.5, D, network_type=Network)
+        compact = CompactNetwork(nodes=network.nodes())
+        for u, v, weight in network.arcs():
+            compact.add_arc(u, v, weight)
+        columns = [np.frombuffer(x, dtype=np.int64) for x in compact.arc_columns()]
+        bounds = [m * i // w for i in range(w + 1)]
+        # The segment is created before the pool, so forked workers inherit the
+        # resource tracker that tracks it
+        arcs, setup_s = timed(lambda: SharedArcs.from_network(compact))
+        with arcs, ProcessPoolExecutor(max_workers=w) as pool:
+            pool.submit(int).result()  # Start the workers before timing
+            # Every worker is sent the whole network, as it would need to be to
+            # find its share of the arcs
+            expected, network_s = timed(lambda: sum(pool.map(sum_network, [network] * w)) // w)
+            total, arrays_s = timed(lambda: sum(pool.map(
+                sum_arrays, *zip(*([x[a:b] for x in columns] for a, b in zip(bounds, bounds[1:])))
+            )))
+            assert total == expected
+            total, shared_s = timed(lambda: sum(pool.map(sum_shared, [arcs.handle] * w, bounds, bounds[1:])))
+            assert total == expected
+        print(f"{m:>10} {network_s:>10.3f} {arrays_s:>10.3f} {shared_s:>10.3f} {setup_s:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Time of gen_tree_arcs as n grows, which should be linear: the time per node
+stays flat.
+
+Run from the repository root with
+
+    python -m benchmarks.tree_scaling 1000 10000 100000 1000000 10000000
+"""
+import random
+import sys
+import time
+from strong_graphs.arc_generators import gen_tree_arcs
+
+
+def measure(n, s=0):
+    ξ = random.Random(s)
+    start = time.perf_counter()
+    for _ in gen_tree_arcs(ξ, n, 2 * n, 0):
+        pass
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    sizes = [int(x) for x in sys.argv[1:]] or [10**k for k in range(3, 7)]
+    print(f"{'n':>10} {'time s':>8} {'ns/node':>8}")
+    for n in sizes:
+        elapsed = measure(n)
+        print(f"{n:>10} {elapsed:>8.2f} {1e9 * elapsed / n:>8.0f}")
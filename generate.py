@@ -1,10 +1,14 @@
-import random
-import math
-from functools import partial
+import sys
 import click
-from strong_graphs.generator import build_instance, determine_n, change_source_nodes
-from strong_graphs.output import output
-from strong_graphs.utils import nb_arcs_from_density
+from strong_graphs.generator import generate_instance
+
+
+def instance_cache(cache_dir, max_bytes):
+    if cache_dir is None:
+        return None
+    from strong_graphs.cache import InstanceCache
+
+    return InstanceCache(cache_dir, max_bytes)
 
 
 # Command line information
@@ -13,29 +17,156 @@ from strong_graphs.utils import nb_arcs_from_density
 @click.argument("s", type=int)
 @click.argument("is_non_neg", type=bool)
 @click.argument("is_int", type=bool)
-def generate_from_distribution(m, s, is_non_neg, is_int):
-    ξ = random.Random(s)
-    d = ξ.random()
-    n = determine_n(m, d)
-    z = ξ.randint(1, n)
-    r = 0 if is_non_neg else ξ.random()
-    #r = 0.001
-    lb = -10**ξ.randint(0, 10)
-    ub = 10**ξ.randint(0, 10)
+@click.option("--file-format", type=click.Choice(["dimacs", "binary"]), default="dimacs")
+@click.option("--quiet", is_flag=True, help="No progress bars")
+@click.option("--metrics", is_flag=True, help="Print the time, arcs and peak memory of each stage")
+@click.option("--verify", is_flag=True, help="Certify the distances before writing the instance")
+@click.option("--cache-dir", type=click.Path(file_okay=False), help="Reuse instances cached here")
+@click.option("--cache-max-bytes", type=int, default=None, help="Evict least recently used instances beyond this")
+@click.option("--out-of-core", is_flag=True, help="Keep the remaining arcs on disk, for instances larger than memory")
+@click.option("--engine", type=click.Choice(["python", "numpy", "parallel", "dense"]), default="python")
+@click.option("--workers", type=int, default=None, help="Processes of the parallel engine, defaults to the number of cores, and of the output")
+@click.option("--compression", type=click.Choice(["gzip", "zstd"]), default=None, help="Compress the DIMACS file")
+@click.option("--extra-features", is_flag=True, help="Add degree histograms, distance levels and tree depth to the header")
+def generate_from_distribution(m, s, is_non_neg, is_int, file_format, quiet, metrics, verify, cache_dir, cache_max_bytes, out_of_core, engine, workers, compression, extra_features):
+    from strong_graphs.progress import Progress
+
+    progress = Progress(quiet=quiet)
+    n = generate_instance(
+        m, s, is_non_neg, is_int, file_format=file_format, progress=progress, verify=verify,
+        cache=instance_cache(cache_dir, cache_max_bytes), out_of_core=out_of_core,
+        engine=engine, workers=workers, compression=compression, extra_features=extra_features,
+    )
     print(n, m)
-    D = partial(random.Random.randint if is_int else random.Random.uniform, a=lb, b=ub)
-    network, _, distances, _, source = build_instance(
-        ξ,
-        n,
-        m,
-        r,
-        D
+    if metrics:
+        for stage in progress.metrics():
+            print(stage, file=sys.stderr)
+
+
+@click.command()
+@click.option("--manifest", type=click.Path(exists=True), help="File of `m s [is_non_neg] [is_int]` lines")
+@click.option("-m", "ms", type=int, multiple=True, help="Number of arcs, can be repeated")
+@click.option("--seeds", default="0", help="Seed or range of seeds start:stop[:step]")
+@click.option("--is-non-neg", type=bool, multiple=True, default=[False])
+@click.option("--is-int", type=bool, multiple=True, default=[True])
+@click.option("--workers", type=int, default=None, help="Defaults to the number of cores")
+@click.option("--output-dir", default="output/")
+@click.option("--file-format", type=click.Choice(["dimacs", "binary"]), default="dimacs")
+@click.option("--cache-dir", type=click.Path(file_okay=False), help="Reuse instances cached here")
+@click.option("--cache-max-bytes", type=int, default=None, help="Evict least recently used instances beyond this")
+def generate_batch(manifest, ms, seeds, is_non_neg, is_int, workers, output_dir, file_format, cache_dir, cache_max_bytes):
+    """Generates many instances across a pool of processes, e.g.
+
+    python3 generate.py batch -m 1000 -m 10000 --seeds 0:100
+    """
+    from strong_graphs.batch import jobs_from_ranges, parse_range, read_manifest, run_batch
+
+    jobs = read_manifest(manifest) if manifest else []
+    jobs += jobs_from_ranges(ms, parse_range(seeds), is_non_neg, is_int)
+    run_batch(
+        jobs, output_dir=output_dir, workers=workers, file_format=file_format,
+        cache=instance_cache(cache_dir, cache_max_bytes),
+    )
+
+
+@click.command()
+@click.argument("s", type=int)
+@click.argument("is_non_neg", type=bool)
+@click.argument("is_int", type=bool)
+@click.option("-m", "ms", type=int, multiple=True, required=True, help="Number of arcs, repeated for each instance")
+@click.option("--output-dir", default="output/")
+@click.option("--file-format", type=click.Choice(["dimacs", "binary"]), default="dimacs")
+@click.option("--verify", is_flag=True, help="Certify the distances before writing each instance")
+@click.option("--engine", type=click.Choice(["python", "numpy", "parallel", "dense"]), default="python")
+@click.option("--workers", type=int, default=None, help="Processes of the parallel engine and of the output")
+@click.option("--compression", type=click.Choice(["gzip", "zstd"]), default=None, help="Compress the DIMACS files")
+def generate_family_command(s, is_non_neg, is_int, ms, output_dir, file_format, verify, engine, workers, compression):
+    """Generates one seed at several numbers of arcs, each instance a superset
+    of the smaller ones with the same distances, e.g.
+
+    python3 generate.py family 0 False True -m 1000 -m 10000 -m 100000 --output-dir family/
+    """
+    import os
+    from strong_graphs.family import generate_family
+
+    output_dir = os.path.join(output_dir, "")
+    os.makedirs(output_dir, exist_ok=True)
+    n = generate_family(
+        ms, s, is_non_neg, is_int, output_dir=output_dir, file_format=file_format, verify=verify,
+        engine=engine, workers=workers, compression=compression,
+    )
+    print(n, *sorted(set(ms)))
+
+
+@click.command()
+@click.argument("paths", nargs=-1, type=click.Path(exists=True))
+def verify_files(paths):
+    """Solves instance files, DIMACS or binary, with SPFA and checks every node
+    is reached without a negative cycle, e.g.
+
+    python3 generate.py verify output/*
+    """
+    from strong_graphs.formats import read_instance
+    from strong_graphs.verify import verify_instance
+
+    failed = 0
+    for path in paths:
+        verification = verify_instance(read_instance(path))
+        failed += not verification.ok
+        print(f"{'ok' if verification.ok else 'FAILED'} {path} {verification}")
+    sys.exit(1 if failed else 0)
+
+
+@click.command()
+@click.argument("paths", nargs=-1, type=click.Path(exists=True))
+@click.option("-m", "ms", type=int, multiple=True, help="Also generate instances with this many arcs, can be repeated")
+@click.option("--seeds", default="0", help="Seed or range of seeds start:stop[:step] of the generated instances")
+@click.option("--solver", "names", type=click.Choice(["fifo", "goldberg-radzik", "dijkstra"]), multiple=True, help="Defaults to all of them")
+@click.option("--workers", type=int, default=None, help="Defaults to the number of cores")
+@click.option("--results", type=click.Path(dir_okay=False), default=None, help="CSV file the results table is written to")
+def solve_instances(paths, ms, seeds, names, workers, results):
+    """Solves instance files, or the files in directories, and generated
+    instances with the reference solvers and records their work, e.g.
+
+    python3 generate.py solve output/ -m 10000 --seeds 0:10 --results results.csv
+    """
+    from strong_graphs.batch import jobs_from_ranges, parse_range
+    from strong_graphs.harness import run_harness
+
+    runs = run_harness(
+        [*paths, *jobs_from_ranges(ms, parse_range(seeds))], names=names or None, workers=workers, results=results,
     )
-    if not is_int:
-        network = network.normalise()
-    
-    sum_of_distances = 0 #sum(distances.values())
-    change_source_nodes(ξ, network, z)
-    output(ξ, network, sum_of_distances, m, d, r, s, z, lb, ub, -1)
-
-generate_from_distribution()  # pylint: disable=no-value-for-parameter
\ No newline at end of file
+    sys.exit(0 if all(run.correct for run in runs) else 1)
+
+
+@click.command()
+@click.argument("cache_dir", type=click.Path(exists=True, file_okay=False))
+@click.option("--max-bytes", type=int, default=None, help="Evict least recently used instances beyond this")
+@click.option("--clear", is_flag=True, help="Remove every cached instance")
+def cache_stats(cache_dir, max_bytes, clear):
+    """Prints the entries, size and hits and misses of an instance cache, e.g.
+
+    python3 generate.py cache cache/ --max-bytes 1000000000
+    """
+    cache = instance_cache(cache_dir, max_bytes)
+    if clear:
+        cache.clear()
+    else:
+        cache.evict()
+    for key, value in cache.stats().items():
+        print(f"{key} {value}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["batch"]:
+        generate_batch(sys.argv[2:])  # pylint: disable=no-value-for-parameter
+    elif sys.argv[1:2] == ["verify"]:
+        verify_files(sys.argv[2:])  # pylint: disable=no-value-for-parameter
+    elif sys.argv[1:2] == ["cache"]:
+        cache_stats(sys.argv[2:])  # pylint: disable=no-value-for-parameter
+    elif sys.argv[1:2] == ["solve"]:
+        solve_instances(sys.argv[2:])  # pylint: disable=no-value-for-parameter
+    elif sys.argv[1:2] == ["family"]:
+        generate_family_command(sys.argv[2:])  # pylint: disable=no-value-for-parameter
+    else:
+        generate_from_distribution()  # pylint: disable=no-value-for-parameter
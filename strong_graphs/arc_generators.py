@@ -1,70 +1,68 @@
 import math
-from ordered_set import OrderedSet
-from sortedcontainers import SortedSet
-from collections import defaultdict, OrderedDict
-from strong_graphs.utils import determine_order, take_closest
-from strong_graphs.negative import nb_neg_remaining, sample_number
-from typing import Dict, Hashable, List
-from tqdm import tqdm
+import numpy as np
+from strong_graphs.data_structure import NodeSet
+from strong_graphs.utils import csr, determine_order
+from strong_graphs.negative import (
+    determine_alpha_beta_batched,
+    nb_neg_remaining,
+    sample_number,
+)
+from typing import List
+from strong_graphs.progress import Progress
 
 
-__all__ = ["gen_tree_arcs", "gen_loop_arcs", "gen_remaining_arcs"]
+__all__ = ["gen_tree_arcs", "gen_loop_arcs", "gen_remaining_arcs", "gen_remaining_arcs_dense"]
 
 
-def gen_tree_arcs(ξ, n, m, m_neg, α=1, β=1, quiet=False):
+def gen_tree_arcs(ξ, n, m, m_neg, α=1, β=1):
     assert m > n - 1, "Number of arcs must be able to form a tree"
     # Sample the minimum required loop arcs
     nb_loop_arcs = max(0, 2 * n - 1 - m)
     loop_arc_predecessors = set(ξ.sample(range(n - 1), nb_loop_arcs))
-    tree_nodes = SortedSet([0])
-    with tqdm(total=n - 1, disable=quiet, desc="Tree arcs") as bar:
-
-        def dive(u):
-            """Add loop arcs to tree where possible"""
-            while u in loop_arc_predecessors:
-                tree_nodes.add(u + 1)
-                bar.update()
-                yield (u, u + 1)
-                u += 1
-
-        # Keep track of nodes without parents in the tree or in the loop arcs. We ignore
-        # loop arcs as they will be added by diving when the predecessor is added.
-        parentless = SortedSet(
-            set(range(1, n)) - set([u + 1 for u in loop_arc_predecessors])
-        )
-        # Source node must have at least one child, choose from parentless nodes
-        if 0 not in loop_arc_predecessors:
-            p_min = min(parentless)
-            x = 1 + ξ.betavariate(α, β) * (n-1)
-            v = take_closest(parentless, x)
-            parentless.remove(v)
-            tree_nodes.add(v)
-            bar.update()
-            yield (0, v)
-            yield from dive(v)
-        else:
-            yield from dive(0)
-        # Remaining nodes must have exactly one parent, choose from nodes in tree.
-        # parentless = list(parentless)
-        # ξ.shuffle(parentless)
-        # parentless = OrderedSet(parentless)
-        for _ in range(len(parentless)):
-            # choose the predecessor
-            x = ξ.betavariate(α, β) * (n)
-            v = take_closest(parentless, x)
-            parentless.remove(v)
-            # choose the successor
-            x = ξ.betavariate(α, β) * n
-            y = (v - x) % n
-            u = take_closest(tree_nodes, y)
-            tree_nodes.add(v)
-            bar.update()
-            yield (u, v)
-            yield from dive(v)
+    tree_nodes = NodeSet(n, [0])
+
+    def dive(u):
+        """Add loop arcs to tree where possible"""
+        while u in loop_arc_predecessors:
+            tree_nodes.add(u + 1)
+            yield (u, u + 1)
+            u += 1
+
+    # Keep track of nodes without parents in the tree or in the loop arcs. We ignore
+    # loop arcs as they will be added by diving when the predecessor is added.
+    parentless = NodeSet(
+        n, set(range(1, n)) - set([u + 1 for u in loop_arc_predecessors])
+    )
+    # Source node must have at least one child, choose from parentless nodes
+    if 0 not in loop_arc_predecessors:
+        x = 1 + ξ.betavariate(α, β) * (n-1)
+        v = parentless.closest(x)
+        parentless.remove(v)
+        tree_nodes.add(v)
+        yield (0, v)
+        yield from dive(v)
+    else:
+        yield from dive(0)
+    # Remaining nodes must have exactly one parent, choose from nodes in tree.
+    # parentless = list(parentless)
+    # ξ.shuffle(parentless)
+    # parentless = OrderedSet(parentless)
+    for _ in range(len(parentless)):
+        # choose the predecessor
+        x = ξ.betavariate(α, β) * (n)
+        v = parentless.closest(x)
+        parentless.remove(v)
+        # choose the successor
+        x = ξ.betavariate(α, β) * n
+        y = (v - x) % n
+        u = tree_nodes.closest(y)
+        tree_nodes.add(v)
+        yield (u, v)
+        yield from dive(v)
 
 
 # ----------------------------------------------------------
-def gen_loop_arcs(ξ, graph, distances, nb_neg_loop_arcs_remaining, quiet=False):
+def gen_loop_arcs(ξ, graph, distances, nb_neg_loop_arcs_remaining):
     n = graph.number_of_nodes()
 
     def determine_if_negative(u, v):
@@ -72,155 +70,288 @@ def gen_loop_arcs(ξ, graph, distances, nb_neg_loop_arcs_remaining, quiet=False)
 
     order = list(range(n))
     ξ.shuffle(order)
-    with tqdm(total=n, disable=quiet, desc="Loop Arcs") as bar:
-        for u in range(n):
-            v = (u + 1) % n
-            if (u, v) not in graph._arcs.keys():
-                is_negative = determine_if_negative(u, v)
-                if is_negative:
-                    nb_neg_loop_arcs_remaining -= 1
-                bar.update()
-                yield (u, v, is_negative)
+    for u in range(n):
+        v = (u + 1) % n
+        if not graph.has_arc(u, v):
+            is_negative = determine_if_negative(u, v)
+            if is_negative:
+                nb_neg_loop_arcs_remaining -= 1
+            yield (u, v, is_negative)
 
 
 # -----------------------------------------------------------
-def determine_predecessor_vacancies(graph, order, quiet=False):
+def determine_predecessor_vacancies(graph, order):
     """    
     A vacancy represents the lack of an inward arc to a node
     from a given predecessor.
 
     <- right-to-left arrow from high distances to low distances
     -> left-to-right arrow from low distances to high distances
+
+    Vacancies are counted for every node at once from the arc columns, as
+    arrays indexed by node.
      """
     n = graph.number_of_nodes()
-    pos = {v: pos for pos, v in enumerate(order)}
-    vacancies = {
-        "<-": {i: n - 1 - pos[i] for i in range(n)},
-        "->": {i: pos[i] for i in range(n)},
+    pos = np.empty(n, dtype=np.int64)
+    pos[np.asarray(order, dtype=np.int64)] = np.arange(n)
+    tails, heads, _ = graph.arc_columns()
+    tails = np.frombuffer(tails, dtype=np.int64)
+    heads = np.frombuffer(heads, dtype=np.int64)
+    is_left = pos[heads] < pos[tails]
+    return {
+        "<-": n - 1 - pos - np.bincount(heads[is_left], minlength=n),
+        "->": pos - np.bincount(heads[~is_left], minlength=n),
     }
-    with tqdm(total=n, disable=quiet, desc="Allocation") as bar:
-        for v in range(n):
-            bar.update()
-            for u, _ in graph.predecessors(v):
-                if pos[v] < pos[u]:
-                    vacancies["<-"][v] -= 1
-                else:
-                    vacancies["->"][v] -= 1
-    return vacancies
-
-
-def distribute(ξ, capacity: Dict[Hashable, int], quantity: int) -> Dict[Hashable, int]:
+
+
+def distribute(ξ, capacity: List[int], quantity: int) -> List[int]:
     """A method to distribute a quantity amongst choices with given capacities"""
-    allocation = defaultdict(int)
+    allocation = [0] * len(capacity)
     if quantity > 0:
-        total_capacity = sum(capacity.values())
+        total_capacity = sum(capacity)
         assert total_capacity >= quantity, f"{quantity=} exceeds {total_capacity=}"
-        choices = SortedSet([key for key, value in capacity.items() if value >= 1])
         μ = quantity / float(len(capacity))
-        with tqdm(total=quantity, desc="Distribute") as bar:
-            for i, q in capacity.items():
-                total_capacity -= q
-                min_allocation = max(quantity - total_capacity, 0)
-                max_allocation = min(quantity, q)
-                expected = max(min(max_allocation, μ), min_allocation)
-                x = sample_number(ξ, min_allocation, max_allocation, expected)
-                allocation[i] = x
-                quantity -= x
-                bar.update(x)
+        for i, q in enumerate(capacity):
+            total_capacity -= q
+            min_allocation = max(quantity - total_capacity, 0)
+            max_allocation = min(quantity, q)
+            expected = max(min(max_allocation, μ), min_allocation)
+            x = sample_number(ξ, min_allocation, max_allocation, expected)
+            allocation[i] = x
+            quantity -= x
     return allocation
 
 
-def allocate_predecessors_to_nodes(ξ, graph, vacancies, m_pos, m_neg):
+def water_level(capacity, quantity):
+    """The level λ at which sum(min(capacity, λ)) == quantity"""
+    c = np.sort(capacity)
+    k = len(c)
+    filled = np.concatenate(([0], np.cumsum(c)[:-1]))
+    λ = (quantity - filled) / (k - np.arange(k))
+    return λ[np.argmax(λ <= c)]
+
+
+def distribute_batched(rng, capacity, quantity):
+    """
+    As distribute, but with every beta variate drawn at once from a numpy
+    Generator. Each choice expects an equal share capped at its capacity, and
+    any difference between the rounded draws and the quantity is then spread
+    over the room left in the choices.
+    """
+    capacity = np.asarray(capacity, dtype=np.int64)
+    allocation = np.zeros(len(capacity), dtype=np.int64)
+    if quantity <= 0:
+        return allocation
+    total_capacity = int(capacity.sum())
+    assert total_capacity >= quantity, f"{quantity=} exceeds {total_capacity=}"
+    expected = np.minimum(capacity, water_level(capacity, quantity))
+    allocation[:] = np.rint(expected)
+    random = (expected > 0) & (expected < capacity)
+    μ = expected[random] / capacity[random]
+    α, β = determine_alpha_beta_batched(μ)
+    allocation[random] = np.rint(rng.beta(α, β) * capacity[random])
+    difference = quantity - int(allocation.sum())
+    if difference > 0:
+        allocation += spread(rng, capacity - allocation, difference)
+    elif difference < 0:
+        allocation -= spread(rng, allocation, -difference)
+    return allocation
+
+
+def spread(rng, room, quantity):
+    """Spreads a quantity at random over choices in proportion to their room,
+    redrawing whatever lands beyond the room of a choice"""
+    x = np.zeros(len(room), dtype=np.int64)
+    while quantity > 0:
+        left = room - x
+        y = np.minimum(rng.multinomial(quantity, left / left.sum()), left)
+        x += y
+        quantity -= int(y.sum())
+    return x
+
+
+def allocate_predecessors_to_nodes(ξ, graph, vacancies, m_pos, m_neg, rng=None):
     """
     Negative arcs (really <=) must be allocated to <- vacancies 
     Positive arcs (really >=) can be allocated to both <- and -> vacancies
     """
-    allocation = {"<=": distribute(ξ, vacancies["<-"], m_neg)}
-    remaining_combined_vacancies = {
-        i: vacancies["->"][i] + vacancies["<-"][i] - allocation["<="][i]
-        for i in graph.nodes()
-    }
-    allocation[">="] = distribute(ξ, remaining_combined_vacancies, m_pos)
+    if rng is None:
+        allocation = {"<=": np.array(distribute(ξ, vacancies["<-"].tolist(), m_neg))}
+    else:
+        allocation = {"<=": distribute_batched(rng, vacancies["<-"], m_neg)}
+    remaining_combined_vacancies = vacancies["->"] + vacancies["<-"] - allocation["<="]
+    if rng is None:
+        allocation[">="] = np.array(distribute(ξ, remaining_combined_vacancies.tolist(), m_pos))
+    else:
+        allocation[">="] = distribute_batched(rng, remaining_combined_vacancies, m_pos)
     return allocation
 
 
-def gen_remaining_arcs(ξ, graph, distances, n, m, m_neg_total, quiet=False):
+def plan_remaining_arcs(ξ, graph, n, m, m_neg_total, progress, rng, order):
+    """The number of negative (<=) and other (>=) arcs each node receives and its
+    vacancies, as lists indexed by node, recorded as the Vacancies and
+    Distribute stages of `progress`."""
     m_remaining = max(0, m - graph.number_of_arcs())
     # assert m_remaining >= 0
-    order = determine_order(distances)
-    arc_vacancies = determine_predecessor_vacancies(graph, order)
-    negative_arc_vacancies = sum(q for q in arc_vacancies["<-"].values())
+    with progress.stage("Vacancies", total=n) as stage:
+        arc_vacancies = determine_predecessor_vacancies(graph, order)
+        stage.count = n
+        negative_arc_vacancies = int(arc_vacancies["<-"].sum())
+        total_capacity = negative_arc_vacancies + int(arc_vacancies["->"].sum())
     m_neg = max(
         min(nb_neg_remaining(graph, m_neg_total), m_remaining, negative_arc_vacancies),
         0,
     )
     m_pos = m_remaining - m_neg
-    total_capacity = negative_arc_vacancies + sum(
-        q for q in arc_vacancies["->"].values()
-    )
     assert negative_arc_vacancies >= m_neg
     assert total_capacity >= m_pos + m_neg, ""
-    allocation = allocate_predecessors_to_nodes(ξ, graph, arc_vacancies, m_pos, m_neg)
-    total = sum(q for x in allocation.values() for q in x.values())
+    with progress.stage("Distribute", total=m_remaining) as stage:
+        allocation = allocate_predecessors_to_nodes(ξ, graph, arc_vacancies, m_pos, m_neg, rng)
+        total = stage.count = sum(int(x.sum()) for x in allocation.values())
     assert total == m_remaining
+    allocation = {key: x.tolist() for key, x in allocation.items()}
+    arc_vacancies = {key: x.tolist() for key, x in arc_vacancies.items()}
+    return allocation, arc_vacancies
+
+
+def gen_remaining_arcs(ξ, graph, distances, n, m, m_neg_total, progress=None, rng=None, order=None):
+    """`rng` is the numpy Generator of the numpy engine, used to allocate the
+    arcs to nodes in batches. `order` is determine_order(distances) if it is
+    already known."""
+    progress = progress or Progress(quiet=True)
+    if order is None:
+        order = determine_order(distances)
+    allocation, arc_vacancies = plan_remaining_arcs(ξ, graph, n, m, m_neg_total, progress, rng, order)
+    yield from gen_arcs_to_nodes(ξ, graph.has_arc, n, order, allocation, arc_vacancies)
+
+
+def gen_arcs_to_nodes(ξ, has_arc, n, order, allocation, arc_vacancies, start=0, stop=None):
+    """
+    The remaining arcs into the nodes order[start:stop] as planned by
+    plan_remaining_arcs, `has_arc` tells which arcs are already in the graph.
+    The arcs into a node only depend on the nodes before and after it in the
+    order, so any range of the order can be generated on its own.
+    """
     # Generate predecessors
     def generate_arcs(sample_range, q, threshold=0, α = 1, β = 1, shuffle=False):
-        """Can be used for both for both <- and -> arcs"""
+        """Can be used for both for both <- and -> arcs. Chosen nodes are taken
+        out of the shared sample range while sampling and put back afterwards,
+        which for a NodeSet is a constant time change per node."""
         #samples = ξ.sample(sample_range, min(q + 2, len(sample_range)))
         # if shuffle:
         #     ξ.shuffle(samples)
         count = 0
-        removed_nodes = set()
+        removed_nodes = []
         if (loop_pred := (v-1)%n) in sample_range:
-            sample_range.discard(loop_pred)   # This arc already exists in the loop
-            removed_nodes.add(loop_pred)      # Will need to add this back in
+            sample_range.remove(loop_pred)   # This arc already exists in the loop
+            removed_nodes.append(loop_pred)  # Will need to add this back in
         while count < q:
             x = ξ.betavariate(α, β) * n
             y = (v - x) % n
-            if y < sample_range[0]:
-                y = sample_range[-1]
-            u = take_closest(sample_range, y)
+            if y < sample_range.next_ge(0):
+                y = sample_range.prev_le(n - 1)
+            u = sample_range.closest(y)
             assert u != v, f"{u}"
             sample_range.remove(u)
-            removed_nodes.add(u)
-            if (u, v) not in graph._arcs:
+            removed_nodes.append(u)
+            if not has_arc(u, v):
                 is_negative = count < threshold
                 count += 1
-                bar.update()
                 yield u, v, is_negative
         for u in removed_nodes:
             sample_range.add(u)
 
-    with tqdm(total=max(m_remaining, 1), disable=quiet, desc="Remaining") as bar:
-        left_arc_nodes = SortedSet(list(range(n)))
-        right_arc_nodes = SortedSet([])
-        for pos, v in enumerate(order):
-            left_arc_nodes.discard(v)
-            total_allocation = allocation[">="][v] + allocation["<="][v]
-            low_int = max(0, allocation[">="][v] - arc_vacancies["->"][v])
-            high_int = min(
-                allocation[">="][v], arc_vacancies["<-"][v] - allocation["<="][v]
+    left_arc_nodes = NodeSet(n, order[start:])
+    right_arc_nodes = NodeSet(n, order[:start])
+    for v in order[start:stop]:
+        left_arc_nodes.discard(v)
+        total_allocation = allocation[">="][v] + allocation["<="][v]
+        low_int = max(0, allocation[">="][v] - arc_vacancies["->"][v])
+        high_int = min(
+            allocation[">="][v], arc_vacancies["<-"][v] - allocation["<="][v]
+        )
+        #nb_pos_to_the_left = ξ.randint(a=low_int, b=high_int,)
+        α = 1
+        β = 1/1000
+        nb_pos_to_the_left = round(low_int + ξ.betavariate(α, β)*(high_int-low_int))
+        assert nb_pos_to_the_left >= 0, f"{nb_pos_to_the_left=}"
+        nb_to_the_left = allocation["<="][v] + nb_pos_to_the_left
+        nb_to_the_right = allocation[">="][v] - nb_pos_to_the_left
+        assert nb_to_the_left + nb_to_the_right == total_allocation
+        assert nb_to_the_left >= 0
+        assert nb_to_the_right >= 0
+        # Generate to the left <-
+        if nb_to_the_left > 0:
+            yield from generate_arcs(
+                sample_range=left_arc_nodes,
+                q=nb_to_the_left,
+                threshold=allocation["<="][v],
+                shuffle=True,
             )
-            #nb_pos_to_the_left = ξ.randint(a=low_int, b=high_int,)
-            α = 1
-            β = 1/1000
-            nb_pos_to_the_left = round(low_int + ξ.betavariate(α, β)*(high_int-low_int))
-            assert nb_pos_to_the_left >= 0, f"{nb_pos_to_the_left=}"
-            nb_to_the_left = allocation["<="][v] + nb_pos_to_the_left
-            nb_to_the_right = allocation[">="][v] - nb_pos_to_the_left
-            assert nb_to_the_left + nb_to_the_right == total_allocation
-            assert nb_to_the_left >= 0
-            assert nb_to_the_right >= 0
-            # Generate to the left <-
-            if nb_to_the_left > 0:
-                yield from generate_arcs(
-                    sample_range=left_arc_nodes,
-                    q=nb_to_the_left,
-                    threshold=allocation["<="][v],
-                    shuffle=True,
-                )
-            # Generate to the right ->
-            if nb_to_the_right > 0:
-                yield from generate_arcs(sample_range=right_arc_nodes, q=nb_to_the_right)
-            # Add v to ordered sets
-            right_arc_nodes.add(v)
\ No newline at end of file
+        # Generate to the right ->
+        if nb_to_the_right > 0:
+            yield from generate_arcs(sample_range=right_arc_nodes, q=nb_to_the_right)
+        # Add v to ordered sets
+        right_arc_nodes.add(v)
+
+# -----------------------------------------------------------
+def sample_subset(rng, k, q):
+    """A random q of range(k) as a boolean mask, drawing either the q chosen or
+    the k - q left out, whichever is fewer"""
+    if 2 * q <= k:
+        mask = np.zeros(k, dtype=bool)
+        mask[rng.choice(k, q, replace=False)] = True
+    else:
+        mask = np.ones(k, dtype=bool)
+        mask[rng.choice(k, k - q, replace=False)] = False
+    return mask
+
+
+def gen_remaining_arcs_dense(ξ, graph, distances, n, m, m_neg_total, progress=None, rng=None, order=None, block_size=1 << 16):
+    """
+    As gen_remaining_arcs for instances with most of the possible arcs. The
+    plan is the same, but each node draws which of its vacancies on either
+    side of it in the order stay empty and takes every other one at once,
+    rather than drawing its predecessors one at a time. Its negative arcs are
+    a random subset of those from the left. Yields the arcs as (tails, heads,
+    is_negative) arrays of about `block_size` arcs, drawn from the numpy
+    Generator `rng`.
+    """
+    progress = progress or Progress(quiet=True)
+    if order is None:
+        order = determine_order(distances)
+    allocation, vacancies = plan_remaining_arcs(ξ, graph, n, m, m_neg_total, progress, rng, order)
+    order = np.asarray(order, dtype=np.int64)
+    pos = np.empty(n, dtype=np.int64)
+    pos[order] = np.arange(n)
+    negative = np.asarray(allocation["<="], dtype=np.int64)[order]
+    other = np.asarray(allocation[">="], dtype=np.int64)[order]
+    left_vacancies = np.asarray(vacancies["<-"], dtype=np.int64)[order]
+    right_vacancies = np.asarray(vacancies["->"], dtype=np.int64)[order]
+    # How many of the other arcs come from the left, as gen_arcs_to_nodes
+    low = np.maximum(0, other - right_vacancies)
+    high = np.minimum(other, left_vacancies - negative)
+    other_left = np.rint(low + rng.beta(1, 1 / 1000, size=n) * (high - low)).astype(np.int64)
+    # Positions of the tails of the arcs already into each position
+    tails, heads, _ = graph.arc_columns()
+    tails = pos[np.frombuffer(tails, dtype=np.int64)]
+    heads = pos[np.frombuffer(heads, dtype=np.int64)]
+    offsets, existing = csr(n, heads, tails)
+    vacant = np.empty(n, dtype=bool)
+    block, size = [], 0
+    for p in range(n):
+        vacant[:] = True
+        vacant[p] = False
+        vacant[existing[offsets[p] : offsets[p + 1]]] = False
+        left = np.flatnonzero(vacant[p + 1 :]) + p + 1
+        right = np.flatnonzero(vacant[:p])
+        assert len(left) == left_vacancies[p] and len(right) == right_vacancies[p]
+        left = left[sample_subset(rng, len(left), negative[p] + other_left[p])]
+        right = right[sample_subset(rng, len(right), other[p] - other_left[p])]
+        is_negative = np.concatenate((sample_subset(rng, len(left), negative[p]), np.zeros(len(right), dtype=bool)))
+        tails = order[np.concatenate((left, right))]
+        block.append((tails, np.full(len(tails), order[p]), is_negative))
+        size += len(tails)
+        if size >= block_size or p == n - 1:
+            yield tuple(np.concatenate(x) for x in zip(*block))
+            block, size = [], 0
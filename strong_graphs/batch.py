@@ -0,0 +1,86 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, List, NamedTuple
+from strong_graphs.generator import generate_instance
+
+__all__ = ["Job", "jobs_from_ranges", "read_manifest", "run_batch"]
+
+
+class Job(NamedTuple):
+    m: int
+    s: int
+    is_non_neg: bool = False
+    is_int: bool = True
+
+
+def parse_range(text: str) -> List[int]:
+    """Either a single integer or a python style range `start:stop[:step]`"""
+    if ":" in text:
+        return list(range(*(int(x) for x in text.split(":"))))
+    return [int(text)]
+
+
+def parse_bool(text: str) -> bool:
+    return text.strip().lower() in ("1", "true", "t", "yes", "y")
+
+
+def jobs_from_ranges(ms, seeds, is_non_neg=(False,), is_int=(True,)) -> List[Job]:
+    """Every combination of the given number of arcs, seeds and flags"""
+    return [Job(*x) for x in itertools.product(ms, seeds, is_non_neg, is_int)]
+
+
+def read_manifest(path) -> List[Job]:
+    """
+    One instance per line, `m s [is_non_neg] [is_int]`, separated by whitespace or
+    commas. Blank lines and lines starting with # are ignored.
+    """
+    jobs = []
+    with open(path) as f:
+        for line in f:
+            fields = line.replace(",", " ").split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            m, s, *flags = fields
+            jobs.append(Job(int(m), int(s), *(parse_bool(x) for x in flags)))
+    return jobs
+
+
+def run_job(job: Job, output_dir: str, file_format: str, cache=None):
+    start = time.perf_counter()
+    n = generate_instance(*job, output_dir=output_dir, file_format=file_format, cache=cache)
+    return job, n, time.perf_counter() - start
+
+
+def run_batch(jobs: Iterable[Job], output_dir="output/", workers=None, report=print, file_format="dimacs", cache=None):
+    """
+    Generates every job in a pool of worker processes, each written through
+    output exactly as the single instance command line would. Workers are reused
+    so interpreter start up and imports are paid once per worker. The workers
+    share an InstanceCache if one is given.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    output_dir = os.path.join(output_dir, "")
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count()
+    timings = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_job, job, output_dir, file_format, cache) for job in jobs]
+        for future in as_completed(futures):
+            job, n, elapsed = future.result()
+            timings.append((job, n, elapsed))
+            report(
+                f"m={job.m} s={job.s} is_non_neg={job.is_non_neg} "
+                f"is_int={job.is_int} n={n} {elapsed:.3f}s"
+            )
+    total = time.perf_counter() - start
+    arcs = sum(job.m for job in jobs)
+    report(
+        f"{len(jobs)} instances, {arcs} arcs in {total:.2f}s with {workers} workers: "
+        f"{len(jobs) / total:.2f} instances/s, {arcs / total:.0f} arcs/s"
+    )
+    return timings
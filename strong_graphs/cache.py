@@ -0,0 +1,200 @@
+"""
+An on-disk cache of generated instances, so that sweeps running several solvers
+over the same instances generate each of them once.
+
+An entry is the instance in the binary format of strong_graphs.formats, named
+by a hash of the generator parameters, the seed, the engine and the package
+version. The generator is deterministic per seed and engine, so an entry is
+exactly what generation would write; the package version must be bumped
+whenever that changes. A hit
+converts or copies the entry to the requested output, or hands it straight to
+a solver, without generating anything.
+
+Processes share a cache through file locks. Each entry is locked, by a lock
+file named by its key, while it is generated, served or evicted, so a process
+only ever waits for another using the same instance.
+When the entries take more than `max_bytes` the least recently used are
+evicted, a hit refreshes the modification time that orders them.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import strong_graphs
+from strong_graphs.formats import compressed, read_binary, suffixes, write_dimacs
+from strong_graphs.generator import generate_instance
+from strong_graphs.progress import Progress
+
+__all__ = ["InstanceCache", "cache_key"]
+
+
+def cache_key(m, s, is_non_neg, is_int, engine="python"):
+    parameters = {
+        "m": m,
+        "s": s,
+        "is_non_neg": bool(is_non_neg),
+        "is_int": bool(is_int),
+        "engine": engine,
+        "version": strong_graphs.__version__,
+    }
+    return hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()
+
+
+class InstanceCache:
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, "locks"), exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.bin")
+
+    @contextmanager
+    def lock(self, name):
+        """Exclusive lock called `name` shared by every process using the cache"""
+        with open(os.path.join(self.directory, "locks", f"{name}.lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def entry(self, m, s, is_non_neg, is_int, progress=None, verify=False, engine="python", workers=None):
+        """
+        Path of the entry of an instance, generated first on a miss. The entry
+        stays locked, so it cannot be evicted, until the context exits.
+        """
+        key = cache_key(m, s, is_non_neg, is_int, engine)
+        path = self.path(key)
+        with self.lock(key):
+            hit = os.path.exists(path)
+            if hit:
+                os.utime(path)
+                if verify:
+                    from strong_graphs.verify import verify_instance
+
+                    verification = verify_instance(read_binary(path))
+                    if not verification.ok:
+                        raise ValueError(f"cached {m=} {s=} failed verification: {verification}")
+            else:
+                self._generate(path, m, s, is_non_neg, is_int, progress, verify, engine, workers)
+            self._count("hits" if hit else "misses")
+            yield path
+        if not hit:
+            self.evict(keep=path)
+
+    def _generate(self, path, m, s, is_non_neg, is_int, progress, verify, engine, workers):
+        directory = tempfile.mkdtemp(dir=self.directory)
+        try:
+            generate_instance(
+                m, s, is_non_neg, is_int, output_dir=f"{directory}/",
+                file_format="binary", progress=progress, verify=verify, engine=engine, workers=workers,
+            )
+            os.replace(os.path.join(directory, f"strong-graph-{m}-{s}.bin"), path)
+        finally:
+            shutil.rmtree(directory)
+
+    def instance(self, m, s, is_non_neg, is_int, progress=None, verify=False, engine="python", workers=None):
+        """The instance as solver input, read from its entry without copying"""
+        with self.entry(m, s, is_non_neg, is_int, progress, verify, engine, workers) as path:
+            return read_binary(path)
+
+    def output(self, m, s, is_non_neg, is_int, output_dir="output/", to_file=True, file_format="dimacs", progress=None, verify=False, workers=None, compression=None, engine="python"):
+        """Writes the instance as generate_instance would and returns n. A miss
+        is generated with `engine`, and `workers` processes if parallel, which
+        also format the DIMACS arc lines"""
+        assert compression is None or file_format == "dimacs", "only DIMACS files are compressed"
+        progress = progress or Progress(quiet=True)
+        with self.entry(m, s, is_non_neg, is_int, progress, verify, engine, workers) as path:
+            instance = read_binary(path)
+            header = instance.header
+            with progress.stage("Output", total=header["arcs"]) as stage:
+                if file_format == "binary":
+                    with open(path, "rb") as source:
+                        with open(output_dir + header["title"] + ".bin", "wb") if to_file else sys.stdout.buffer as f:
+                            shutil.copyfileobj(source, f)
+                else:
+                    path = output_dir + header["title"] + suffixes[compression]
+                    with open(path, "wb") if to_file else sys.stdout.buffer as raw, compressed(raw, compression) as f:
+                        write_dimacs(f, instance, workers=workers)
+                stage.count = header["arcs"]
+        return header["parameters"]["n"]
+
+    def entries(self):
+        """(modification time, size, path) of every entry, oldest first"""
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".bin"):
+                path = os.path.join(self.directory, name)
+                try:
+                    x = os.stat(path)
+                except FileNotFoundError:  # Evicted by another process
+                    continue
+                found.append((x.st_mtime, x.st_size, path))
+        return sorted(found)
+
+    def evict(self, keep=None, max_bytes=None):
+        """Removes the least recently used entries, other than `keep`, until
+        they fit in max_bytes, which defaults to that of the cache"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes is None:
+            return
+        with self.lock("evict"):
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= max_bytes:
+                    break
+                if path == keep:
+                    continue
+                key = os.path.basename(path)[: -len(".bin")]
+                with self.lock(key):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        continue
+                total -= size
+                self._count("evictions")
+
+    def clear(self):
+        self.evict(max_bytes=0)
+
+    def _count(self, name):
+        with self.lock("stats"):
+            counts = self._counts()
+            counts[name] += 1
+            with open(os.path.join(self.directory, "stats.json"), "w") as f:
+                json.dump(counts, f)
+
+    def _counts(self):
+        counts = {"hits": 0, "misses": 0, "evictions": 0}
+        try:
+            with open(os.path.join(self.directory, "stats.json")) as f:
+                counts.update(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return counts
+
+    def stats(self):
+        entries = self.entries()
+        counts = self._counts()
+        lookups = counts["hits"] + counts["misses"]
+        return {
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            **counts,
+            "hit_rate": counts["hits"] / lookups if lookups else None,
+        }
@@ -1,4 +1,6 @@
-import networkx as nx
+import math
+from array import array
+import numpy as np
 
 
 class Network:
@@ -35,6 +37,17 @@ class Network:
         self._predecessors[v].add((u, w))
         self._successors[u].add((v, w))
 
+    def add_arcs(self, tails, heads, weights):
+        """add_arc for each of arrays of tails, heads and weights"""
+        for u, v, w in zip(tails.tolist(), heads.tolist(), weights.tolist()):
+            self.add_arc(u, v, w)
+
+    def has_arc(self, u, v):
+        return (u, v) in self._arcs
+
+    def out_degree(self, node_id):
+        return len(self._successors[node_id])
+
     def number_of_nodes(self):
         return len(self._predecessors)
 
@@ -55,19 +68,391 @@ class Network:
     def successors(self, node_id):
         yield from self._successors[node_id]
 
-    def normalise(self): 
-        divisor = min(abs(w) for _, _, w in self.arcs() if w != 0)
-        N = Network()
-        for node in self.nodes():
-            N.add_node(node)
-        for u, v, w in self.arcs():
-            N.add_arc(u, v, w/float(divisor))
-        return N
+    def arc_columns(self):
+        """Tail, head and weight arrays of the arcs in the order of arcs()"""
+        tails, heads, weights = array("q"), array("q"), array("q")
+        for u, successors in self._successors.items():
+            for v, w in successors:
+                tails.append(u)
+                heads.append(v)
+                if isinstance(w, float) and weights.typecode == "q":
+                    weights = array("d", weights)
+                weights.append(w)
+        return tails, heads, weights
+
+    def relabel(self, mapping):
+        """
+        Moves the arcs of every node u to mapping[u] in place, where mapping
+        permutes the nodes. Arcs are re-added in the order of arcs(), so the
+        result iterates exactly as a copy built by add_arc would.
+        """
+        arcs = list(self.arcs())
+        self._predecessors = {node: set() for node in self._predecessors}
+        self._successors = {node: set() for node in self._predecessors}
+        self._arcs = dict()
+        for u, v, w in arcs:
+            u, v = mapping[u], mapping[v]
+            self._arcs[(u, v)] = w
+            self._predecessors[v].add((u, w))
+            self._successors[u].add((v, w))
+
+    def normalise(self):
+        """
+        Divides every weight in place by the smallest nonzero absolute weight,
+        which is returned. Weights are held in tuples, so the sets of each node
+        are rebuilt in turn, in their own order, holding the weights of _arcs.
+        The arcs iterate as in a copy built by add_arc.
+        """
+        divisor = min(abs(w) for w in self._arcs.values() if w != 0)
+        x = float(divisor)
+        weights = self._arcs
+        for arc, w in weights.items():
+            weights[arc] = w / x
+        # The sets share the weights of _arcs rather than dividing again
+        for u, arcs in self._successors.items():
+            self._successors[u] = {(v, weights[u, v]) for v, _ in arcs}
+        for v, arcs in self._predecessors.items():
+            self._predecessors[v] = {(u, weights[u, v]) for u, _ in arcs}
+        return divisor
+
+
+class CompactNetwork:
+    """
+    A network that stores arcs once, as parallel tail/head/weight arrays, rather
+    than in a dictionary and two sets of tuples. It has the same interface as
+    Network, but nodes must be integers.
+
+    Compressed sparse row (CSR) indexes over predecessors and successors are built
+    on demand. Arcs added after the last build are kept in a pending set of
+    integer keys of their node positions, tail << 32 | head, which is folded
+    into the index once it holds a quarter as many arcs as the index does. The
+    indexes rebuilt grow geometrically, so the cost of rebuilding is amortised
+    over the arcs added, and the pending keys, at about 60 bytes each, add at
+    most a fifth of that to each arc.
+    """
+
+    min_pending = 1 << 16
+
+    def __init__(self, id=None, nodes=None):
+        self.id = id
+        self._nodes = array("q")
+        self._position = {}
+        self._contiguous = True  # node i is at position i
+        self._tails = array("q")
+        self._heads = array("q")
+        self._weights = array("q")
+        self._pending = set()
+        self._index = None
+        if nodes is not None:
+            for node in nodes:
+                self.add_node(node)
+
+    def __eq__(self, other):
+        return set(self.nodes()) == set(other.nodes()) and {
+            (u, v): w for u, v, w in self.arcs()
+        } == {(u, v): w for u, v, w in other.arcs()}
+
+    def add_node(self, node_id):
+        assert node_id not in self._position, f"{node_id} already a node"
+        self._contiguous = self._contiguous and node_id == len(self._nodes)
+        self._position[node_id] = len(self._nodes)
+        self._nodes.append(node_id)
+        return node_id
+
+    def add_arc(self, u, v, w=0):
+        assert u in self._position, f"{u} not a node"
+        assert v in self._position, f"{v} not a node"
+        assert u != v, f"no self loops {u} = {v}"
+        assert not self.has_arc(u, v), f"Arc already exists {(u,v)=}"
+        if isinstance(w, float) and self._weights.typecode == "q":
+            self._weights = array("d", self._weights)
+        self._tails.append(u)
+        self._heads.append(v)
+        self._weights.append(w)
+        self._pending.add(self._position[u] << 32 | self._position[v])
+        if len(self._pending) > self._pending_limit():
+            self._reindex()
+
+    def add_arcs(self, tails, heads, weights):
+        """
+        add_arc for arrays of tails, heads and weights, appended to the columns
+        at once. The arcs must be new, only their nodes are checked.
+        """
+        tails = np.asarray(tails, dtype=np.int64)
+        heads = np.asarray(heads, dtype=np.int64)
+        assert np.all(np.isin(tails, self._nodes)) and np.all(np.isin(heads, self._nodes)), "not nodes"
+        assert not np.any(tails == heads), "no self loops"
+        weights = np.asarray(weights)
+        if weights.dtype.kind == "f" and self._weights.typecode == "q":
+            self._weights = array("d", self._weights)
+        self._tails.frombytes(tails.tobytes())
+        self._heads.frombytes(heads.tobytes())
+        self._weights.frombytes(weights.astype(np.int64 if self._weights.typecode == "q" else np.float64).tobytes())
+        if len(self._pending) + len(tails) > self._pending_limit():
+            self._reindex()
+        else:
+            self._pending.update((self._positions(tails) << 32 | self._positions(heads)).tolist())
+
+    def has_arc(self, u, v):
+        i, j = self._position.get(v), self._position.get(u)
+        if i is None or j is None:
+            return False
+        key = j << 32 | i
+        if key in self._pending:
+            return True
+        index = self._index
+        if index is None or i >= index["nodes"]:
+            return False
+        offsets = index["pred_offsets"]
+        tails = index["pred_tails"][offsets[i] : offsets[i + 1]]
+        k = tails.searchsorted(j)
+        return k < len(tails) and tails[k] == j
+
+    def out_degree(self, node_id):
+        i = self._fresh_index()["succ_offsets"]
+        p = self._position[node_id]
+        return int(i[p + 1] - i[p])
+
+    def number_of_nodes(self):
+        return len(self._nodes)
+
+    def number_of_arcs(self):
+        return len(self._tails)
+
+    def nodes(self):
+        yield from self._nodes
+
+    def arcs(self):
+        yield from zip(self._tails, self._heads, self._weights)
+
+    def predecessors(self, node_id):
+        index = self._fresh_index()
+        yield from self._adjacent(
+            node_id, self._tails, index["pred"], index["pred_offsets"]
+        )
+
+    def successors(self, node_id):
+        index = self._fresh_index()
+        yield from self._adjacent(
+            node_id, self._heads, index["succ"], index["succ_offsets"]
+        )
+
+    def arc_columns(self):
+        """The arrays the arcs are stored in, not copies"""
+        return self._tails, self._heads, self._weights
+
+    def relabel(self, mapping):
+        """
+        Moves the arcs of every node u to mapping[u] in place, where mapping
+        permutes the nodes. The tail and head arrays are rewritten where they
+        are, then the index is rebuilt.
+        """
+        new_labels = np.array([mapping[u] for u in self._nodes], dtype=np.int64)
+        for column in (self._tails, self._heads):
+            if len(column):
+                np.frombuffer(column, dtype=np.int64)[:] = new_labels[self._positions(column)]
+        self._reindex()
+
+    def truncate(self, n_nodes, n_arcs):
+        """
+        Removes the nodes and arcs added after the network had n_nodes nodes and
+        n_arcs arcs, in place. The index is rebuilt only if it covers any of
+        them, the keys of arcs added since it was built are just dropped.
+        """
+        if n_arcs < len(self._tails):
+            tails = self._positions(self._tails[n_arcs:])
+            removed = tails << 32 | self._positions(self._heads[n_arcs:])
+            self._pending.difference_update(removed.tolist())
+        for node in self._nodes[n_nodes:]:
+            del self._position[node]
+        for column in (self._nodes, self._tails, self._heads, self._weights):
+            del column[n_nodes if column is self._nodes else n_arcs :]
+        self._contiguous = bool(
+            np.array_equal(np.frombuffer(self._nodes, dtype=np.int64), np.arange(len(self._nodes)))
+        )
+        index = self._index
+        if index is not None and (index["nodes"] > n_nodes or index["arcs"] > n_arcs):
+            self._reindex()
+
+    def normalise(self):
+        """
+        Divides every weight in place by the smallest nonzero absolute weight,
+        which is returned. The weights become floats, the index is unchanged.
+        """
+        if self._weights.typecode == "q":
+            self._weights = array("d", self._weights)
+        weights = np.frombuffer(self._weights, dtype=np.float64)
+        divisor = np.abs(weights[weights != 0]).min().item()
+        weights /= divisor
+        return divisor
+
+    def _adjacent(self, node_id, ends, perm, offsets):
+        p = self._position[node_id]
+        weights = self._weights
+        for i in perm[offsets[p] : offsets[p + 1]].tolist():
+            yield ends[i], weights[i]
 
+    def _fresh_index(self):
+        if (
+            self._index is None
+            or self._pending
+            or self._index["nodes"] != len(self._nodes)
+        ):
+            self._reindex()
+        return self._index
+
+    def _positions(self, labels):
+        """Node positions of an array of node ids"""
+        labels = np.frombuffer(labels, dtype=np.int64).copy()
+        if self._contiguous:
+            return labels
+        nodes = np.frombuffer(self._nodes, dtype=np.int64).copy()
+        order = np.argsort(nodes)
+        return order[np.searchsorted(nodes, labels, sorter=order)]
+
+    def _pending_limit(self):
+        """The most keys pending before the index is rebuilt, a quarter of the arcs it holds"""
+        return max(self.min_pending, self._index["arcs"] >> 2 if self._index is not None else 0)
+
+    def _reindex(self):
+        """Rebuilds the CSR indexes over all arcs, emptying the pending keys"""
+        n = len(self._nodes)
+        tails = self._positions(self._tails)
+        heads = self._positions(self._heads)
+        pred = np.lexsort((tails, heads))
+        succ = np.argsort(tails, kind="stable")
+        pred_offsets = np.zeros(n + 1, dtype=np.int64)
+        succ_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(heads, minlength=n), out=pred_offsets[1:])
+        np.cumsum(np.bincount(tails, minlength=n), out=succ_offsets[1:])
+        self._index = {
+            "nodes": n,
+            "arcs": len(tails),
+            "pred": pred,
+            "pred_offsets": pred_offsets,
+            "pred_tails": tails[pred],
+            "succ": succ,
+            "succ_offsets": succ_offsets,
+        }
+        self._pending = set()
+
+
+class NodeSet:
+    """
+    A set of the integers 0, ..., n - 1 held as a tree of 64 bit words, each bit
+    of a word saying whether the word below it has any bits set. Adding,
+    removing and finding the nearest member touch one word per level, and there
+    are only four levels for n up to 2^24, so they take constant time in
+    practice rather than the log n of a sorted container.
+    """
+
+    def __init__(self, n, members=()):
+        self.n = n
+        self._levels = []
+        members = np.fromiter(members, dtype=np.int64)
+        assert np.all((0 <= members) & (members < n)), f"members not in range({n})"
+        bits = np.zeros(-(-n // 64) * 64, dtype=bool)
+        bits[members] = True
+        self._len = int(np.count_nonzero(bits))
+        while True:
+            words = np.packbits(bits, bitorder="little").view("<u8")
+            self._levels.append(words.tolist())
+            if len(words) <= 1:
+                break
+            bits = np.zeros(-(-len(words) // 64) * 64, dtype=bool)
+            bits[: len(words)] = words != 0
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, x):
+        return 0 <= x < self.n and bool(self._levels[0][x >> 6] >> (x & 63) & 1)
+
+    def __iter__(self):
+        x = self.next_ge(0)
+        while x is not None:
+            yield x
+            x = self.next_ge(x + 1)
+
+    def add(self, x):
+        if x in self:
+            return
+        self._len += 1
+        for words in self._levels:
+            w = x >> 6
+            was_empty = not words[w]
+            words[w] |= 1 << (x & 63)
+            if not was_empty:
+                break
+            x = w
+
+    def remove(self, x):
+        assert x in self, f"{x} not in set"
+        self._len -= 1
+        for words in self._levels:
+            w = x >> 6
+            words[w] &= ~(1 << (x & 63))
+            if words[w]:
+                break
+            x = w
+
+    def discard(self, x):
+        if x in self:
+            self.remove(x)
+
+    def next_ge(self, x):
+        """The smallest member greater than or equal to x, None if there is none"""
+        levels = self._levels
+        for depth, words in enumerate(levels):
+            w = x >> 6
+            if w >= len(words):
+                return None
+            rest = words[w] >> (x & 63)
+            if rest:
+                x += (rest & -rest).bit_length() - 1
+                for words in reversed(levels[:depth]):
+                    word = words[x]
+                    x = (x << 6) + (word & -word).bit_length() - 1
+                return x
+            x = w + 1
+        return None
+
+    def prev_le(self, x):
+        """The largest member less than or equal to x, None if there is none"""
+        levels = self._levels
+        x = min(x, self.n - 1)
+        for depth, words in enumerate(levels):
+            if x < 0:
+                return None
+            w = x >> 6
+            rest = words[w] & ((2 << (x & 63)) - 1)
+            if rest:
+                x = (w << 6) + rest.bit_length() - 1
+                for words in reversed(levels[:depth]):
+                    x = (x << 6) + words[x].bit_length() - 1
+                return x
+            x = w - 1
+        return None
+
+    def closest(self, x):
+        """
+        As take_closest, the member closest to the number x and the smaller of
+        two that are equally close.
+        """
+        c = math.ceil(x)
+        after = self.next_ge(max(c, 0))
+        before = self.prev_le(c - 1)
+        if after is None:
+            return before
+        if before is None or after - x < x - before:
+            return after
+        return before
 
 
 def to_networkx(graph):
     """For drawing purposes I just convert my graph to networkx"""
+    import networkx as nx
+
     n = nx.DiGraph()
     for node in graph.nodes():
         n.add_node(node)
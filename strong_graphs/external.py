@@ -0,0 +1,314 @@
+"""
+Generating instances larger than memory.
+
+All but the tree and loop arcs, at most 2n of them, are remaining arcs. The
+arc generators only check new arcs against the tree and loop arcs, as no two
+remaining arcs into the same node are ever the same. So build_instance can
+append the remaining arcs to an ArcSpool on disk as they are generated, while
+the network keeps only the tree and loop arcs.
+
+The file is then written in two passes over the arcs. The first scatters them
+into buckets at random, and gathers the weight statistics and an index of the
+arcs out of every node for the depth on the way. The second shuffles each
+bucket in memory and writes it out. A random bucket and then a random order
+within the bucket is a random order of all the arcs. With buckets of about
+`bucket_arcs` arcs, memory is O(n + bucket_arcs) however large m is.
+
+The instance has the same nodes and arcs as the one generate_instance writes
+for the same seed. Only the order of the arc lines differs, and the last digit
+of the float weight moments, which are summed in different chunks.
+"""
+import itertools
+import os
+import random
+import tempfile
+from array import array
+import numpy as np
+from strong_graphs.formats import (
+    aligned,
+    comment_lines,
+    compressed,
+    dimacs_arc_chunks,
+    dimacs_preamble,
+    suffixes,
+    write_binary_header,
+)
+from strong_graphs.generator import build_instance, change_source_nodes, sample_parameters
+from strong_graphs.output import (
+    chunk_size,
+    header_features,
+    update_weight_statistics,
+    weight_statistics,
+)
+from strong_graphs.progress import Progress
+from strong_graphs.utils import bfs_depth, label_positions
+
+__all__ = ["ArcSpool", "generate_out_of_core", "output_out_of_core"]
+
+
+def record_dtype(weight_dtype):
+    return np.dtype([("tail", np.int64), ("head", np.int64), ("weight", weight_dtype)])
+
+
+class ArcSpool:
+    """
+    Arcs added one at a time and appended to a file of records, with at most
+    `chunk_size` of them held in memory. Stands in for a network as the
+    target of build_instance's remaining arcs.
+    """
+
+    def __init__(self, path, weight_dtype=np.int64, chunk_size=chunk_size):
+        self.path = path
+        self.dtype = record_dtype(weight_dtype)
+        self.chunk_size = chunk_size
+        self.min_abs = np.inf  # smallest nonzero absolute weight
+        self._count = 0
+        self._file = open(path, "wb")
+        self._clear()
+
+    def _clear(self):
+        self._tails, self._heads = array("q"), array("q")
+        self._weights = array("q" if self.dtype["weight"].kind == "i" else "d")
+
+    def add_arc(self, u, v, w):
+        self._tails.append(u)
+        self._heads.append(v)
+        self._weights.append(w)
+        if len(self._tails) == self.chunk_size:
+            self.flush()
+
+    def add_arcs(self, tails, heads, weights):
+        self._tails.frombytes(np.asarray(tails, dtype=np.int64).tobytes())
+        self._heads.frombytes(np.asarray(heads, dtype=np.int64).tobytes())
+        self._weights.frombytes(np.asarray(weights, dtype=self.dtype["weight"]).tobytes())
+        if len(self._tails) >= self.chunk_size:
+            self.flush()
+
+    def number_of_arcs(self):
+        return self._count + len(self._tails)
+
+    def flush(self):
+        k = len(self._tails)
+        if k == 0:
+            return
+        records = np.empty(k, dtype=self.dtype)
+        records["tail"] = np.frombuffer(self._tails, dtype=np.int64)
+        records["head"] = np.frombuffer(self._heads, dtype=np.int64)
+        records["weight"] = np.frombuffer(self._weights, dtype=self.dtype["weight"])
+        nonzero = np.abs(records["weight"][records["weight"] != 0])
+        if len(nonzero):
+            self.min_abs = min(self.min_abs, nonzero.min().item())
+        records.tofile(self._file)
+        self._count += k
+        self._clear()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def chunks(self):
+        """Tail, head and weight arrays of the arcs, chunk_size at a time"""
+        self.flush()
+        self._file.flush()
+        for i in range(0, self._count, self.chunk_size):
+            records = np.fromfile(
+                self.path, dtype=self.dtype, count=min(self.chunk_size, self._count - i),
+                offset=i * self.dtype.itemsize,
+            )
+            yield records["tail"], records["head"], records["weight"]
+
+
+def network_chunks(graph):
+    tails, heads, weights = graph.arc_columns()
+    weights = np.frombuffer(weights, dtype=np.int64 if weights.typecode == "q" else np.float64)
+    tails, heads = np.frombuffer(tails, dtype=np.int64), np.frombuffer(heads, dtype=np.int64)
+    for i in range(0, len(tails), chunk_size):
+        yield tails[i : i + chunk_size], heads[i : i + chunk_size], weights[i : i + chunk_size]
+
+
+class Buckets:
+    """Files that records are scattered to and read back from one at a time"""
+
+    def __init__(self, directory, name, k, dtype):
+        self.dtype = dtype
+        self.paths = [os.path.join(directory, f"{name}-{i}") for i in range(k)]
+        self._files = [open(path, "wb") for path in self.paths]
+
+    def scatter(self, records, buckets):
+        order = np.argsort(buckets, kind="stable")
+        counts = np.bincount(buckets, minlength=len(self.paths))
+        for i, part in enumerate(np.split(records[order], np.cumsum(counts)[:-1])):
+            if len(part):
+                part.tofile(self._files[i])
+
+    def close(self):
+        for f in self._files:
+            f.close()
+
+    def read(self, i):
+        records = np.fromfile(self.paths[i], dtype=self.dtype)
+        os.remove(self.paths[i])
+        return records
+
+
+def shuffled_chunks(shuffled, k, rng):
+    """Tail, head and weight arrays of the arcs, a bucket at a time in a random
+    order, in chunks of at most chunk_size"""
+    for i in range(k):
+        records = shuffled.read(i)
+        records = records[rng.permutation(len(records))]
+        for j in range(0, len(records), chunk_size):
+            chunk = records[j : j + chunk_size]
+            yield chunk["tail"], chunk["head"], chunk["weight"]
+
+
+def output_out_of_core(ξ, graph, spool, sum_of_distances, target_n_arcs, d, r, s, z, lb, ub, source, divisor=None, output_dir="output/", file_format="dimacs", progress=None, bucket_arcs=1 << 20, workers=None, compression=None):
+    """
+    As output, for the arcs of `graph` followed by those of `spool`, with every
+    weight divided by `divisor` if one is given. The buckets are kept next to
+    the spool. The "Scatter", "Depth" and "Output" stages are recorded in
+    `progress`.
+    """
+    assert file_format in ("dimacs", "binary"), f"unknown format {file_format}"
+    assert compression is None or file_format == "dimacs", "only DIMACS files are compressed"
+    progress = progress or Progress(quiet=True)
+    n_actual = graph.number_of_nodes()
+    m_actual = graph.number_of_arcs() + spool.number_of_arcs()
+    source_nodes = graph.out_degree(source)
+    filename = f"strong-graph-{target_n_arcs}-{s}"
+    nodes = list(graph.nodes())
+    ξ.shuffle(nodes)
+    ids = label_positions(np.array(nodes, dtype=np.int64), start=1)
+    rng = np.random.default_rng(ξ.getrandbits(64))
+    weight_dtype = np.float64 if divisor is not None or spool.dtype["weight"].kind == "f" else np.int64
+    dtype = record_dtype(weight_dtype)
+    k = max(1, -(-m_actual // bucket_arcs))
+    directory = os.path.dirname(spool.path)
+    shuffled = Buckets(directory, "shuffled", k, dtype)
+    # Bucket i of the adjacency holds the arcs out of the nodes with ids between
+    # i * n_actual / k + 1 and (i + 1) * n_actual / k, with heads counted from 0
+    arc_dtype = np.dtype([("tail", np.int64), ("head", np.int64)])
+    adjacency = Buckets(directory, "adjacency", k, arc_dtype)
+    degrees = np.zeros(n_actual + 1, dtype=np.int64)
+    stats = weight_statistics()
+    with progress.stage("Scatter", total=m_actual) as stage:
+        for tails, heads, weights in itertools.chain(network_chunks(graph), spool.chunks()):
+            if divisor is not None:
+                weights = weights / float(divisor)
+            update_weight_statistics(stats, weights)
+            records = np.empty(len(tails), dtype=dtype)
+            records["tail"] = ids(tails)
+            records["head"] = ids(heads)
+            records["weight"] = weights
+            shuffled.scatter(records, rng.integers(k, size=len(records)))
+            arcs = np.empty(len(records), dtype=arc_dtype)
+            arcs["tail"], arcs["head"] = records["tail"], records["head"] - 1
+            adjacency.scatter(arcs, (arcs["tail"] - 1) * k // n_actual)
+            degrees += np.bincount(records["tail"], minlength=n_actual + 1)
+            stage.update(len(records))
+        shuffled.close()
+        adjacency.close()
+        stage.count = m_actual
+    with progress.stage("Depth", total=m_actual) as stage:
+        offsets = np.cumsum(degrees)  # node ids count from 1, so offsets[0] == 0
+        path = os.path.join(directory, "heads")
+        heads = np.lib.format.open_memmap(path, mode="w+", dtype=np.int64, shape=(max(1, m_actual),))
+        for i in range(k):
+            records = adjacency.read(i)
+            records = records[np.argsort(records["tail"], kind="stable")]
+            if len(records):
+                start = offsets[records["tail"][0] - 1]
+                heads[start : start + len(records)] = records["head"]
+        source_id = int(ids(np.array([source]))[0])
+        depths = bfs_depth(offsets, heads, source_id - 1)
+        del heads
+        os.remove(path)
+        stage.count = m_actual
+    parameters = {
+        "n": n_actual - 1, "m": target_n_arcs, "d": d, "r": r, "s": s, "lb": lb, "ub": ub, "z": z
+    }
+    features = header_features(
+        n_actual, m_actual, target_n_arcs, sum_of_distances, source_nodes, int(depths.max()), stats
+    )
+    comments = comment_lines(filename, parameters, features)
+    with progress.stage("Output", total=m_actual) as stage:
+        if file_format == "binary":
+            header = {
+                "title": filename,
+                "nodes": n_actual,
+                "arcs": m_actual,
+                "source": source_id,
+                "weight_dtype": np.dtype(weight_dtype).str,
+                "comments": comments,
+                "parameters": parameters,
+                "features": features,
+            }
+            with open(output_dir + filename + ".bin", "wb") as f:
+                write_binary_header(f, header)
+                columns = [f.tell() + c * aligned(m_actual * 8) for c in range(3)]
+                written = 0
+                for i in range(k):
+                    records = shuffled.read(i)
+                    records = records[rng.permutation(len(records))]
+                    for c, name in enumerate(dtype.names):
+                        f.seek(columns[c] + written * 8)
+                        f.write(np.ascontiguousarray(records[name]).tobytes())
+                    written += len(records)
+                    stage.update(len(records))
+                f.truncate(columns[0] + 3 * aligned(m_actual * 8))
+        else:
+            with open(output_dir + filename + suffixes[compression], "wb") as raw, compressed(raw, compression) as f:
+                f.write(dimacs_preamble(filename, comments, n_actual, m_actual, source_id).encode())
+                for data in dimacs_arc_chunks(shuffled_chunks(shuffled, k, rng), workers):
+                    f.write(data)
+                    stage.update(data.count(b"\n"))
+        stage.count = m_actual
+
+
+def verify_spooled(network, spool, source, distances, tree_arcs):
+    """verify_instance for the arcs of the network and of the spool"""
+    from strong_graphs.verify import certify_distances, verify_instance
+
+    verification = verify_instance(network, source, distances, tree_arcs)
+    d = np.array([distances[u] for u in range(len(distances))])
+    violated, worst = verification.violated_arcs, verification.worst_reduced_cost
+    for tails, heads, weights in spool.chunks():
+        chunk_violated, _, chunk_worst = certify_distances(tails, heads, weights, d)
+        violated += chunk_violated
+        worst = chunk_worst if worst is None else min(worst, chunk_worst)
+    return verification._replace(
+        arcs=verification.arcs + spool.number_of_arcs(), violated_arcs=violated, worst_reduced_cost=worst
+    )
+
+
+def generate_out_of_core(m, s, is_non_neg, is_int, output_dir="output/", file_format="dimacs", progress=None, verify=False, temp_dir=None, bucket_arcs=1 << 20, workers=None, compression=None, engine="python"):
+    """generate_instance with the remaining arcs spooled to a temporary
+    directory, in `temp_dir` if given, and shuffled on disk. `engine` is as
+    for build_instance, `workers` the processes of both the parallel engine
+    and the output and `compression` as for output"""
+    ξ = random.Random(s)
+    d, n, z, r, lb, ub, D = sample_parameters(ξ, m, is_non_neg, is_int)
+    with tempfile.TemporaryDirectory(dir=temp_dir) as directory:
+        spool = ArcSpool(os.path.join(directory, "arcs"), np.int64 if is_int else np.float64)
+        try:
+            network, tree_arcs, distances, _, source = build_instance(
+                ξ, n, m, r, D, engine=engine, progress=progress, spool=spool, workers=workers
+            )
+            if verify:
+                verification = verify_spooled(network, spool, source, distances, tree_arcs)
+                if not verification.ok:
+                    raise ValueError(f"instance {m=} {s=} failed verification: {verification}")
+            divisor = None
+            if not is_int:
+                spool.flush()  # min_abs covers the arcs written so far
+                _, _, weights = network.arc_columns()
+                divisor = min(min((abs(w) for w in weights if w != 0), default=np.inf), spool.min_abs)
+            change_source_nodes(ξ, network, z)
+            output_out_of_core(
+                ξ, network, spool, 0, m, d, r, s, z, lb, ub, -1, divisor,
+                output_dir=output_dir, file_format=file_format, progress=progress, bucket_arcs=bucket_arcs,
+                workers=workers, compression=compression,
+            )
+        finally:
+            spool.close()
+    return n
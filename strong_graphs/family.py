@@ -0,0 +1,125 @@
+"""
+Nested families of instances: one seed written at several increasing numbers
+of arcs, each instance a superset of the one before it.
+
+The tree, distances, remapping and loop arcs are generated once, for the
+smallest m, by build_base, then grow_instance adds remaining arcs up to each
+m in turn and the instance is written through output as it is reached, with
+the dummy source joined to the network in place for as long as it is written. Every instance of a
+family has the same nodes, numbered the same way in every file, the same
+source arcs and the same optimal distances. Float weights are all divided by
+the smallest absolute weight of the smallest instance, so they too are the
+same in every instance.
+
+Families differ from the instances generate_instance writes for the same
+seeds, but are named the same way, so are best written to their own
+directory. n is determined from the smallest m, and raised if need be so that
+the largest m fits on n nodes.
+"""
+import math
+import random
+from array import array
+from contextlib import contextmanager
+import numpy as np
+from strong_graphs.data_structure import CompactNetwork
+from strong_graphs.generator import build_base, grow_instance, sample_parameters
+from strong_graphs.negative import nb_neg_arcs
+from strong_graphs.output import output
+from strong_graphs.progress import Progress
+
+__all__ = ["generate_family", "grow_family"]
+
+
+def family_nodes(ms, n):
+    """n, raised if the largest m needs more nodes, and checked against the
+    smallest, which must still hold a tree and its loop arcs"""
+    n = max(n, math.ceil((1 + math.sqrt(1 + 4 * ms[-1])) / 2))
+    if n > ms[0]:
+        raise ValueError(f"a family of m={ms[0]} to m={ms[-1]} needs {n} nodes, more than m={ms[0]} arcs")
+    return n
+
+
+class Scaled:
+    """A network as output reads it, with its weights divided by `divisor`"""
+
+    def __init__(self, network, divisor):
+        self.network = network
+        self.divisor = divisor
+
+    def __getattr__(self, name):
+        return getattr(self.network, name)
+
+    def arc_columns(self):
+        tails, heads, weights = self.network.arc_columns()
+        weights = np.frombuffer(weights, dtype=np.int64 if weights.typecode == "q" else np.float64)
+        return tails, heads, array("d", (weights / float(self.divisor)).tobytes())
+
+
+@contextmanager
+def with_source(network, source_nodes, divisor=None):
+    """
+    A CompactNetwork with the dummy source of change_source_nodes joined to
+    source_nodes in place, and removed again on exit, so each instance is
+    written without copying the network. With `divisor` the weights are
+    divided by it, which copies the weight column only.
+    """
+    n_nodes, n_arcs = network.number_of_nodes(), network.number_of_arcs()
+    network.add_node(-1)
+    source_nodes = np.array(source_nodes, dtype=np.int64)
+    network.add_arcs(np.full(len(source_nodes), -1), source_nodes, np.zeros(len(source_nodes), dtype=np.int64))
+    try:
+        yield network if divisor is None else Scaled(network, divisor)
+    finally:
+        network.truncate(n_nodes, n_arcs)
+
+
+def grow_family(ξ, ms, n, r, D, network_type=CompactNetwork, engine="python", progress=None, workers=None):
+    """
+    Builds the instance with ms[0] arcs and yields it, as build_instance returns
+    it, then grows it to each of the other ms and yields it again. The same
+    network is yielded each time, grown in place, and the order of the nodes
+    by distance and the engine's Generator are those of build_base throughout,
+    as the distances never change.
+    """
+    progress = progress or Progress(quiet=True)
+    network, tree_arcs, distances, mapping, source, order, rng = build_base(
+        ξ, n, ms[0], r, D, network_type, engine, progress
+    )
+    for m in ms:
+        grow_instance(ξ, network, distances, order, n, m, nb_neg_arcs(n, m, r), D, engine, rng, progress, workers)
+        yield network, tree_arcs, distances, mapping, source
+
+
+def generate_family(ms, s, is_non_neg, is_int, output_dir="output/", file_format="dimacs", progress=None, verify=False, engine="python", workers=None, compression=None):
+    """
+    Writes the instances of seed s with each number of arcs in ms, as
+    generate_instance does for a single one, and returns n. The stages of
+    every instance are recorded in `progress`.
+    """
+    ms = sorted(set(ms))
+    ξ = random.Random(s)
+    d, n, z, r, lb, ub, D = sample_parameters(ξ, ms[0], is_non_neg, is_int)
+    n = family_nodes(ms, n)
+    # Every instance shuffles its nodes with the same permutation
+    shuffle_seed = ξ.getrandbits(64)
+    source_nodes, divisor = None, None
+    for m, (network, tree_arcs, distances, _, source) in zip(
+        ms, grow_family(ξ, ms, n, r, D, engine=engine, progress=progress, workers=workers)
+    ):
+        if verify:
+            from strong_graphs.verify import verify_instance
+
+            verification = verify_instance(network, source, distances, tree_arcs)
+            if not verification.ok:
+                raise ValueError(f"instance {m=} {s=} failed verification: {verification}")
+        if source_nodes is None:
+            source_nodes = ξ.sample(range(n), z)
+            if not is_int:
+                _, _, weights = network.arc_columns()
+                divisor = min(abs(w) for w in weights if w != 0)
+        with with_source(network, source_nodes, divisor) as level:
+            output(
+                random.Random(shuffle_seed), level, 0, m, d, r, s, z, lb, ub, -1,
+                output_dir=output_dir, file_format=file_format, progress=progress, workers=workers, compression=compression,
+            )
+    return n
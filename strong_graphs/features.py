@@ -0,0 +1,60 @@
+"""
+Header features that depend on the structure of an instance rather than its
+weights, all computed from the arc columns with numpy.
+
+The node labels are mapped to positions through a table, the arcs sorted by
+tail into compressed sparse row form with a radix sort, and "Max depth", the
+most arcs on any of the paths with fewest arcs from the source, comes from an
+array based breadth first search over them, so the features take O(n + m)
+rather than the rounds of a unit weight Bellman-Ford.
+"""
+import numpy as np
+from strong_graphs.utils import bfs_depth, csr, label_positions
+
+__all__ = ["FeatureEngine", "degree_histogram"]
+
+
+def degree_histogram(degrees):
+    """Counts of the degrees 0, 1, 2-3, 4-7, ... as `lowest:count` pairs joined
+    by commas, which has no spaces so reads back from a comment line"""
+    _, bins = np.frexp(degrees)  # the bit length of each degree
+    counts = np.bincount(bins)
+    return ",".join(f"{(1 << b) >> 1}:{c}" for b, c in enumerate(counts.tolist()) if c)
+
+
+class FeatureEngine:
+    """
+    Computes the structural features of an instance, by default only "Max
+    depth". With `extra` it adds, from the same arrays, the histograms of out
+    and in degrees, the number of distinct distances if `distances` are given
+    and the depth of the shortest path tree if `tree_arcs` are given.
+    `distances` and `tree_arcs` are as build_instance returns them.
+    """
+
+    def __init__(self, extra=False, distances=None, tree_arcs=None):
+        self.extra = extra
+        self.distances = distances
+        self.tree_arcs = tree_arcs
+
+    def __call__(self, nodes, tails, heads, source):
+        """The features of the arcs from tails to heads over the nodes, all of
+        them numpy arrays of node labels"""
+        n = len(nodes)
+        positions = label_positions(nodes)
+        tails, heads = positions(tails), positions(heads)
+        s = int(positions(np.array([source]))[0])
+        depths = bfs_depth(*csr(n, tails, heads), s)
+        features = {"Max depth": int(depths.max())}
+        if not self.extra:
+            return features
+        features["Out degree histogram"] = degree_histogram(np.bincount(tails, minlength=n))
+        features["In degree histogram"] = degree_histogram(np.bincount(heads, minlength=n))
+        if self.distances is not None:
+            features["Distance levels"] = len(set(self.distances.values()))
+        if self.tree_arcs is not None:
+            tree = np.array(list(self.tree_arcs), dtype=np.int64).reshape(-1, 2)
+            tree_tails, tree_heads = positions(tree[:, 0]), positions(tree[:, 1])
+            root = np.setdiff1d(tree_tails, tree_heads)
+            root = int(root[0]) if len(root) else s
+            features["Tree depth"] = int(bfs_depth(*csr(n, tree_tails, tree_heads), root).max())
+        return features
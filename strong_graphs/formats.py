@@ -0,0 +1,386 @@
+"""
+Reading and writing instances in extended DIMACS format and in a binary
+container that can be memory mapped.
+
+The binary container is
+    8 bytes    magic b"SGRAPH01"
+    8 bytes    length of the header, little endian
+    header     JSON with the same comments, parameters and features as the
+               DIMACS file, the number of nodes and arcs, the source, the title
+               and the weight dtype
+    tails      int64[m]    each array starts on a 64 byte boundary
+    heads      int64[m]
+    weights    int64[m] or float64[m]
+Nodes are numbered from 1 as in the DIMACS file, so the two formats hold exactly
+the same instance and convert into each other losslessly.
+"""
+import ast
+import gzip
+import itertools
+import json
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import NamedTuple
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from strong_graphs.data_structure import Network
+from strong_graphs.utils import csr
+
+__all__ = ["Instance", "read_binary", "read_dimacs", "read_instance", "convert"]
+
+magic = b"SGRAPH01"
+alignment = 64
+
+
+def aligned(x):
+    return -(-x // alignment) * alignment
+
+
+# ---------------------------------------------------------------------------
+# Extended DIMACS
+def comment_lines(filename, parameters, features):
+    return [
+        "c Strong graph for shortest paths problem",
+        "c extended DIMACS format",
+        f"c filename: {filename}",
+        "c ",
+        "c Generator Parameters",
+        *(f"c {key}={value!r}" for key, value in parameters.items()),
+        "c",
+        "c Features",
+        *(f"c {key} {value}" for key, value in features.items()),
+    ]
+
+
+def dimacs_preamble(title, comments, n, m, source):
+    """Everything before the arc lines, source is numbered from 1"""
+    return "".join(f"{line}\n" for line in comments) + (
+        f"t {title}\nc\np sp {n:10} {m:10}\nc\nn {source:10}\nc\n"
+    )
+
+
+def dimacs_arcs(tails, heads, weights):
+    """Arc lines for sequences of python numbers"""
+    return "".join(
+        [f"a {u:10} {v:10} {w:10}\n" for u, v, w in zip(tails, heads, weights)]
+    )
+
+
+powers_of_ten = np.array([10**i for i in range(1, 20)], dtype=np.uint64)
+
+
+def dimacs_arc_bytes(tails, heads, weights):
+    """
+    The encoded dimacs_arcs of numpy arrays, formatted a digit at a time across
+    all the arcs at once. Integers, which must be above -2**63, are written
+    digit by digit from the right of their field, floats are written with
+    repr as python formats them.
+    """
+    k = len(tails)
+    fields = []
+    for x in (tails, heads, weights):
+        x = np.asarray(x)
+        if x.dtype.kind == "f":
+            text = np.array(list(map(repr, x.tolist())), dtype="S")
+            text = text.view(np.uint8).reshape(k, text.itemsize)
+            fields.append((text, np.count_nonzero(text, axis=1)))
+        else:
+            absolute = np.abs(x.astype(np.int64)).astype(np.uint64)
+            digits = np.searchsorted(powers_of_ten, absolute, side="right") + 1
+            fields.append(((absolute, digits, x < 0), digits + (x < 0)))
+    # Each field is right aligned in 10 characters, or as many as it needs
+    widths = [np.maximum(length, 10) for _, length in fields]
+    ends = np.cumsum(5 + widths[0] + widths[1] + widths[2])
+    starts = ends - 5 - widths[0] - widths[1] - widths[2]
+    out = np.full(ends[-1] if k else 0, ord(" "), dtype=np.uint8)
+    out[starts] = ord("a")
+    out[ends - 1] = ord("\n")
+    field_start = starts + 2
+    for (data, length), width in zip(fields, widths):
+        last = field_start + width - 1
+        if isinstance(data, tuple):
+            absolute, digits, is_negative = data
+            for j in range(int(digits.max(initial=0))):
+                rows = digits > j
+                out[last[rows] - j] = (absolute[rows] % 10).astype(np.uint8) + ord("0")
+                absolute //= 10
+            out[(last - digits)[is_negative]] = ord("-")
+        else:
+            first = last - length + 1
+            for j in range(data.shape[1]):
+                rows = length > j
+                out[first[rows] + j] = data[rows, j]
+        field_start = last + 2
+    return out.tobytes()
+
+
+# The ring of slots the formatting workers read, set once in each worker
+slots = None
+
+
+def attach_slots(handle):
+    global slots
+    from strong_graphs.shared import SharedArcs
+
+    slots = SharedArcs.attach(handle)
+
+
+def format_slot(start, stop):
+    return dimacs_arc_bytes(slots.tails[start:stop], slots.heads[start:stop], slots.weights[start:stop])
+
+
+def dimacs_arc_chunks(chunks, workers=None, slot_size=1 << 16):
+    """
+    dimacs_arc_bytes of each (tails, heads, weights) chunk, in order. With more
+    than one worker the chunks are formatted in a pool of processes, at most
+    two per worker ahead of the one being consumed. The chunks, cut to at
+    most slot_size arcs, are copied into a ring of slots in one SharedArcs and
+    the workers are only sent where they are, as in strong_graphs.parallel.
+    The formatted bytes come back through the pool, their length is only
+    known once they are formatted.
+    """
+    if workers is None or workers <= 1:
+        for chunk in chunks:
+            yield dimacs_arc_bytes(*chunk)
+        return
+    from strong_graphs.shared import SharedArcs
+
+    pieces = (
+        (tails[i : i + slot_size], heads[i : i + slot_size], weights[i : i + slot_size])
+        for tails, heads, weights in chunks
+        for i in range(0, len(tails), slot_size)
+    )
+    first = next(pieces, None)
+    if first is None:
+        return
+    # A slot is only written again once the piece in it has been consumed
+    ring = 2 * workers + 1
+    with SharedArcs.create(ring * slot_size, np.asarray(first[2]).dtype) as arcs, ProcessPoolExecutor(
+        max_workers=workers, initializer=attach_slots, initargs=(arcs.handle,)
+    ) as pool:
+        pending = deque()
+        for j, (tails, heads, weights) in enumerate(itertools.chain([first], pieces)):
+            start = j % ring * slot_size
+            stop = start + len(tails)
+            arcs.tails[start:stop] = tails
+            arcs.heads[start:stop] = heads
+            arcs.weights[start:stop] = weights
+            pending.append(pool.submit(format_slot, start, stop))
+            if len(pending) > 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+suffixes = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+@contextmanager
+def compressed(f, compression=None):
+    """
+    A binary file that compresses what is written to it into f, which is left
+    open. The gzip header has no timestamp, so the same instance always
+    compresses to the same bytes. zstd needs the zstandard package.
+    """
+    if compression is None:
+        yield f
+    elif compression == "gzip":
+        with gzip.GzipFile(filename="", mode="wb", compresslevel=6, fileobj=f, mtime=0) as z:
+            yield z
+    elif compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression needs the zstandard package")
+        with zstandard.ZstdCompressor().stream_writer(f, closefd=False) as z:
+            yield z
+    else:
+        raise ValueError(f"unknown compression {compression}")
+
+
+def parse_value(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def parse_comments(comments):
+    """Recovers the parameters and features written by comment_lines"""
+    parameters, features, section = {}, {}, None
+    for line in comments:
+        body = line[2:]
+        if body in ("Generator Parameters", "Features"):
+            section = body
+        elif section == "Generator Parameters" and "=" in body:
+            key, value = body.split("=", 1)
+            parameters[key] = parse_value(value)
+        elif section == "Features" and " " in body:
+            key, value = body.rsplit(" ", 1)
+            features[key] = parse_value(value)
+    return parameters, features
+
+
+def read_dimacs(path):
+    comments, title, n, source = [], None, 0, None
+    tails, heads, weights = array("q"), array("q"), array("q")
+    with open(path) as f:
+        for line in f:
+            kind = line[:1]
+            if kind == "a":
+                _, u, v, w = line.split()
+                tails.append(int(u))
+                heads.append(int(v))
+                try:
+                    weights.append(int(w))
+                except ValueError:
+                    if weights.typecode == "q":
+                        weights = array("d", weights)
+                    weights.append(float(w))
+            elif kind == "c":
+                if title is None:
+                    comments.append(line.rstrip("\n"))
+            elif kind == "t":
+                title = line[2:].rstrip("\n")
+            elif kind == "p":
+                n = int(line.split()[2])
+            elif kind == "n":
+                source = int(line.split()[1])
+    parameters, features = parse_comments(comments)
+    weights = np.frombuffer(weights, dtype=np.int64 if weights.typecode == "q" else np.float64)
+    header = {
+        "title": title,
+        "nodes": n,
+        "arcs": len(tails),
+        "source": source,
+        "weight_dtype": weights.dtype.str,
+        "comments": comments,
+        "parameters": parameters,
+        "features": features,
+    }
+    return Instance(
+        header,
+        np.frombuffer(tails, dtype=np.int64),
+        np.frombuffer(heads, dtype=np.int64),
+        weights,
+    )
+
+
+def write_dimacs(f, instance, chunk_size=1 << 16, workers=None):
+    """Writes to a binary file, formatting with `workers` as dimacs_arc_chunks"""
+    header = instance.header
+    f.write(
+        dimacs_preamble(
+            header["title"], header["comments"], header["nodes"], header["arcs"], header["source"]
+        ).encode()
+    )
+    chunks = (
+        [x[i : i + chunk_size] for x in instance[1:]] for i in range(0, header["arcs"], chunk_size)
+    )
+    for data in dimacs_arc_chunks(chunks, workers):
+        f.write(data)
+
+
+# ---------------------------------------------------------------------------
+# Binary
+def write_binary_header(f, header):
+    encoded = json.dumps(header).encode()
+    f.write(magic)
+    f.write(len(encoded).to_bytes(8, "little"))
+    f.write(encoded)
+    f.write(bytes(aligned(16 + len(encoded)) - 16 - len(encoded)))
+
+
+def write_binary_column(f, chunks):
+    """Writes an array, given in chunks, and pads to the next boundary"""
+    size = 0
+    for chunk in chunks:
+        data = np.ascontiguousarray(chunk).tobytes()
+        size += len(data)
+        f.write(data)
+    f.write(bytes(aligned(size) - size))
+
+
+def write_binary(f, instance):
+    write_binary_header(f, instance.header)
+    for column in instance[1:]:
+        write_binary_column(f, [column])
+
+
+def read_binary(path, mmap=True):
+    """The arrays are memory mapped, nothing is copied until they are used"""
+    with open(path, "rb") as f:
+        assert f.read(8) == magic, f"{path} is not a binary strong graph"
+        length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(length))
+    m = header["arcs"]
+    offset = aligned(16 + length)
+    columns = []
+    for dtype in (np.int64, np.int64, np.dtype(header["weight_dtype"])):
+        if m == 0:
+            columns.append(np.empty(0, dtype=dtype))
+        elif mmap:
+            columns.append(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(m,)))
+        else:
+            columns.append(np.fromfile(path, dtype=dtype, count=m, offset=offset))
+        offset += aligned(m * np.dtype(dtype).itemsize)
+    return Instance(header, *columns)
+
+
+def is_binary(path):
+    with open(path, "rb") as f:
+        return f.read(8) == magic
+
+
+def read_instance(path):
+    return read_binary(path) if is_binary(path) else read_dimacs(path)
+
+
+def convert(source, destination):
+    """DIMACS to binary or binary to DIMACS, depending on the source"""
+    if is_binary(source):
+        with open(destination, "wb") as f:
+            write_dimacs(f, read_binary(source))
+    else:
+        with open(destination, "wb") as f:
+            write_binary(f, read_dimacs(source))
+
+
+class Instance(NamedTuple):
+    """An instance as read from file, nodes are numbered from 1 to n"""
+
+    header: dict
+    tails: np.ndarray
+    heads: np.ndarray
+    weights: np.ndarray
+
+    def csr(self):
+        """
+        Offsets, heads and weights with the arcs leaving u at
+        offsets[u]:offsets[u + 1], offsets is indexed by node so has n + 2 entries
+        """
+        return csr(self.header["nodes"] + 1, self.tails, self.heads, self.weights)
+
+    def to_network(self, network_type=Network):
+        network = network_type(nodes=range(1, self.header["nodes"] + 1))
+        for u, v, w in zip(self.tails.tolist(), self.heads.tolist(), self.weights.tolist()):
+            network.add_arc(u, v, w)
+        return network
+
+
+if __name__ == "__main__":
+    import click
+
+    @click.command()
+    @click.argument("source", type=click.Path(exists=True))
+    @click.argument("destination", type=click.Path())
+    def convert_command(source, destination):
+        """Converts an instance between extended DIMACS and the binary format"""
+        convert(source, destination)
+
+    convert_command()  # pylint: disable=no-value-for-parameter
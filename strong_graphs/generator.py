@@ -2,8 +2,11 @@ import itertools
 import math
 import random
 from functools import partial
+import numpy as np
+from strong_graphs.features import FeatureEngine
 from strong_graphs.output import output
 from strong_graphs.data_structure import Network
+from strong_graphs.progress import Progress
 from strong_graphs.negative import (
     nb_neg_arcs,
     nb_neg_loop_arcs,
@@ -12,20 +15,21 @@ from strong_graphs.negative import (
 from strong_graphs.arc_generators import (
     gen_tree_arcs,
     gen_remaining_arcs,
+    gen_remaining_arcs_dense,
     gen_loop_arcs,
 )
 from strong_graphs.mapping import (
-    map_graph,
     map_distances,
     mapping_required,
 )
-from strong_graphs.visualise.draw import draw_graph
 from strong_graphs.utils import (
+    determine_order,
     nb_arcs_from_density,
-    shortest_path,
+    tree_distances,
+    tree_order,
 )
 
-__all__ = ["build_instance"]
+__all__ = ["build_base", "build_instance", "generate_instance", "grow_instance"]
 
 
 def arc_weight_tree(ξ, D, is_negative):
@@ -51,44 +55,232 @@ def arc_weight_remaining(ξ, D, δ, is_negative):
         assert x >= 0, f"{x=}"
         return x
 
+
+# ----------------------------------------------------------
+# Batched versions of the above for the numpy engine
+block_size = 1 << 16
+# Instances of the numpy engine with at least this fraction of the possible
+# arcs are generated by gen_remaining_arcs_dense
+dense_threshold = 0.5
+
+
+def sample_block(rng, D, a, b):
+    """Samples D for arrays of lower and upper bounds with a numpy Generator"""
+    if D.func is random.Random.randint:
+        return rng.integers(a, b, endpoint=True)
+    if D.func is random.Random.uniform:
+        return rng.uniform(a, b)
+    raise ValueError(f"No numpy equivalent of {D.func.__name__}")
+
+
+def arc_weights_tree(rng, D, is_negative):
+    a, b = D.keywords["a"], D.keywords["b"]
+    x = sample_block(
+        rng, D, np.where(is_negative, a, max(0, a)), np.where(is_negative, min(0, b), b)
+    )
+    assert np.all(np.where(is_negative, x <= 0, x >= 0))
+    return x
+
+
+def arc_weights_remaining(rng, D, δ, is_negative):
+    a, b = D.keywords["a"], D.keywords["b"]
+    x = sample_block(
+        rng, D, np.where(is_negative, np.maximum(δ, a), 0), np.where(is_negative, 0, b)
+    )
+    x = np.where(is_negative, x, x + np.maximum(δ, 0))
+    assert np.all(np.where(is_negative, x <= 0, x >= 0))
+    return x
+
+
+def add_sampled_arcs(ξ, D, network, arcs, distances, stage):
+    """Adds (u, v, is_negative) arcs with weights sampled one at a time"""
+    start = network.number_of_arcs()
+    for (u, v, is_negative) in stage.track(arcs):
+        δ = distances[v] - distances[u]
+        w = arc_weight_remaining(ξ, D, δ, is_negative)
+        assert (is_negative and w <= 0) or (not is_negative and w >= 0)
+        network.add_arc(u, v, w)
+    stage.count = network.number_of_arcs() - start
+
+
+def add_remaining_arcs(network, arcs, distances, rng, D, stage):
+    """Adds (u, v, is_negative) arcs a block at a time with batched weights. Only
+    arcs already in the network are checked by the arc generators, never arcs to
+    the same target node, so a block may be generated before it is added."""
+    arcs = iter(arcs)
+    blocks = (
+        tuple(np.array(x) for x in zip(*block))
+        for block in iter(lambda: list(itertools.islice(arcs, block_size)), [])
+    )
+    add_arc_blocks(network, blocks, distances, rng, D, stage)
+
+
+def add_arc_blocks(network, blocks, distances, rng, D, stage):
+    """Adds (tails, heads, is_negative) arrays of arcs with batched weights"""
+    distances = np.array([distances[i] for i in range(len(distances))])
+    for us, vs, is_negative in blocks:
+        ws = arc_weights_remaining(rng, D, distances[vs] - distances[us], is_negative)
+        network.add_arcs(us, vs, ws)
+        stage.update(len(us))
+
 def nb_current_non_pos_tree_loop(network):
     return sum(1 for u, v, w in network.arcs() if v == (u + 1) and w <= 0)
 
 
-def build_instance(ξ, n, m, r, D):
-    """The graph generation algorithm."""
+def build_instance(ξ, n, m, r, D, network_type=Network, engine="python", progress=None, spool=None, workers=None):
+    """The graph generation algorithm.
+
+    `network_type` is the class used to store the graph, either Network or the
+    array-backed CompactNetwork for large instances.
+
+    `engine` is either
+    - "python", every weight is sampled one at a time from D with ξ
+    - "numpy", weights are sampled in blocks with a numpy Generator seeded from ξ.
+      D must be a partial of random.Random.randint or random.Random.uniform.
+      Instances are reproducible for a given seed but differ from "python" ones.
+    - "parallel", as "python" but the remaining arcs are generated by `workers`
+      processes, see strong_graphs.parallel. Instances are reproducible for a
+      given seed whatever the number of workers, but differ from "python" ones.
+    - "dense", as "python" but the remaining arcs are generated by
+      gen_remaining_arcs_dense, with weights sampled in blocks as "numpy".
+      The "numpy" engine switches to it for instances with at least
+      dense_threshold of the possible arcs. "python" never does, so its
+      instances stay the same for a seed; choose "dense" for them.
+    Only "python" breaks ties between nodes at the same distance as earlier
+    releases did, which takes a search of the tree, the others by node.
+
+    `progress` is a strong_graphs.progress.Progress that draws the progress and
+    records the time, arcs added and peak memory of each stage, by default a quiet
+    one. Its metrics() are the structured per stage measurements.
+
+    `spool` is a strong_graphs.external.ArcSpool the remaining arcs are written
+    to instead of the network, which then only holds the tree and loop arcs.
+    The arc generators only check those for duplicates, so the arcs are the
+    same either way.
+    """
+    progress = progress or Progress(quiet=True)
+    network, tree_arcs, distances, mapping, source, order, rng = build_base(
+        ξ, n, m, r, D, network_type, engine, progress
+    )
+    remaining = network if spool is None else spool
+    grow_instance(ξ, network, distances, order, n, m, nb_neg_arcs(n, m, r), D, engine, rng, progress, workers, remaining)
+    return network, tree_arcs, distances, mapping, source
+
+
+def build_base(ξ, n, m, r, D, network_type=Network, engine="python", progress=None):
+    """
+    The stages of build_instance before the remaining arcs: the tree, the
+    order of the nodes by distance, the mapping and the loop arcs. Returns
+    the network, tree_arcs, distances, mapping and source as build_instance
+    does, then the order and the numpy Generator of the engine, which
+    grow_instance takes.
+    """
     assert n <= m <= n * (n - 1), f"invalid number of arcs {m=}"
-    network = Network(nodes=range(n))
+    assert engine in ("python", "numpy", "parallel", "dense"), f"unknown {engine=}"
+    progress = progress or Progress(quiet=True)
+    rng = np.random.default_rng(ξ.getrandbits(64)) if engine == "numpy" else None
+    network = network_type(nodes=range(n))
     # Create optimal shortest path tree
     m_neg = nb_neg_arcs(n, m, r)
     m_neg_tree = nb_neg_tree_arcs(ξ, n, m, m_neg)
     tree_arcs = set()
     source = 0
-    for u, v in gen_tree_arcs(ξ, n, m, m_neg_tree):
-        is_negative = network.number_of_arcs() < m_neg_tree
-        w = arc_weight_tree(ξ, D, is_negative)
-        tree_arcs.add((u, v))
-        network.add_arc(u, v, w)
-    distances = shortest_path(network) 
+    # Parents join the tree before their children, so distances are filled in
+    # as the tree arcs are generated
+    with progress.stage("Tree arcs", total=n - 1) as stage:
+        weighted_arcs = [] if engine == "python" else None
+        if rng is None:
+            distances = [0] * n
+            for u, v in stage.track(gen_tree_arcs(ξ, n, m, m_neg_tree)):
+                is_negative = network.number_of_arcs() < m_neg_tree
+                w = arc_weight_tree(ξ, D, is_negative)
+                tree_arcs.add((u, v))
+                network.add_arc(u, v, w)
+                if weighted_arcs is not None:
+                    weighted_arcs.append((u, v, w))
+                distances[v] = distances[u] + w
+        else:
+            arcs = list(gen_tree_arcs(ξ, n, m, m_neg_tree))
+            ws = arc_weights_tree(rng, D, np.arange(len(arcs)) < m_neg_tree)
+            for (u, v), w in zip(arcs, ws.tolist()):
+                tree_arcs.add((u, v))
+                network.add_arc(u, v, w)
+            tails, heads = np.array(arcs, dtype=np.int64).reshape(-1, 2).T
+            distances = tree_distances(n, tails, heads, ws, source).tolist()
+        if weighted_arcs is not None:
+            # Keyed in the order of earlier releases, which breaks ties in the order
+            distances = {u: distances[u] for u in tree_order(weighted_arcs, source)}
+        else:
+            distances = dict(enumerate(distances))
+        stage.count = network.number_of_arcs()
+    # Every consumer shares one order of the nodes by distance
+    with progress.stage("Order", total=n) as stage:
+        order = determine_order(distances)
+        stage.count = len(order)
     m_neg_tree_loop = min(m_neg_tree, nb_current_non_pos_tree_loop(network))
     m_neg_loop = nb_neg_loop_arcs(ξ, n, m, m_neg, m_neg_tree, m_neg_tree_loop)
-    if (mapping := mapping_required(ξ, distances, m_neg_loop)):
+    with progress.stage("Mapping", total=n) as stage:
+        mapping = mapping_required(ξ, distances, m_neg_loop, order)
+        stage.count = len(mapping) if mapping else 0
+    if mapping:
         print("Remapping")
-        tree_arcs = set((mapping[u], mapping[v]) for (u, v) in tree_arcs)
-        network = map_graph(network, mapping)
-        distances = map_distances(distances, mapping)
-        source = mapping[source]
-        m_neg_loop = min(m_neg_tree, sum(1 for u, v in tree_arcs if v == (u + 1) % n and w <= 0))
+        with progress.stage("Remapping", total=network.number_of_arcs()) as stage:
+            tree_arcs = set((mapping[u], mapping[v]) for (u, v) in tree_arcs)
+            network.relabel(mapping)
+            distances = map_distances(distances, mapping)
+            order = [mapping[u] for u in order]
+            source = mapping[source]
+            m_neg_loop = min(m_neg_tree, sum(1 for u, v in tree_arcs if v == (u + 1) % n and w <= 0))
+            stage.count = network.number_of_arcs()
     # Add the remaining arcs - first the loop arcs then the remaining arcs
-    for (u, v, is_negative) in itertools.chain(
-        gen_loop_arcs(ξ, network, distances, m_neg_loop - m_neg_tree_loop),
-        gen_remaining_arcs(ξ, network, distances, n, m, m_neg),
-    ):
-        δ = distances[v] - distances[u]
-        w = arc_weight_remaining(ξ, D, δ, is_negative)
-        assert (is_negative and w <= 0) or (not is_negative and w >= 0)
-        network.add_arc(u, v, w)
-    return network, tree_arcs, distances, mapping, source
+    loop_arcs = gen_loop_arcs(ξ, network, distances, m_neg_loop - m_neg_tree_loop)
+    if rng is None:
+        with progress.stage("Loop arcs", total=n) as stage:
+            add_sampled_arcs(ξ, D, network, loop_arcs, distances, stage)
+    else:
+        # Loop arcs must all be in place before the remaining arcs are allocated
+        with progress.stage("Loop arcs", total=n) as stage:
+            start = network.number_of_arcs()
+            add_remaining_arcs(network, list(loop_arcs), distances, rng, D, stage)
+            stage.count = network.number_of_arcs() - start
+    return network, tree_arcs, distances, mapping, source, order, rng
+
+
+def grow_instance(ξ, network, distances, order, n, m, m_neg, D, engine="python", rng=None, progress=None, workers=None, remaining=None):
+    """
+    Adds remaining arcs to a network holding at least the tree and loop arcs
+    until it has m arcs, m_neg of them negative, keeping `distances` optimal.
+    This is the last stage of build_instance, and can be repeated for larger m
+    to grow an instance, see strong_graphs.family. `remaining` is where the new
+    arcs go if not the network, `engine` and `rng` are as in build_instance.
+    """
+    progress = progress or Progress(quiet=True)
+    remaining = network if remaining is None else remaining
+    if engine == "numpy" and m >= dense_threshold * n * (n - 1):
+        engine = "dense"
+    with progress.stage("Remaining arcs", total=max(0, m - network.number_of_arcs())) as stage:
+        start = remaining.number_of_arcs()
+        if engine == "dense":
+            if rng is None:
+                rng = np.random.default_rng(ξ.getrandbits(64))
+            blocks = gen_remaining_arcs_dense(ξ, network, distances, n, m, m_neg, progress, rng, order)
+            add_arc_blocks(remaining, blocks, distances, rng, D, stage)
+        elif engine == "parallel":
+            from strong_graphs.parallel import gen_remaining_arcs_parallel
+
+            for block in gen_remaining_arcs_parallel(ξ, network, distances, n, m, m_neg, D, progress, order, workers):
+                remaining.add_arcs(*block)
+                stage.update(len(block[0]))
+        elif rng is None:
+            arcs = gen_remaining_arcs(ξ, network, distances, n, m, m_neg, progress, order=order)
+            add_sampled_arcs(ξ, D, remaining, arcs, distances, stage)
+        else:
+            add_remaining_arcs(
+                remaining,
+                gen_remaining_arcs(ξ, network, distances, n, m, m_neg, progress, rng, order),
+                distances, rng, D, stage,
+            )
+        stage.count = remaining.number_of_arcs() - start
  
 def determine_n_and_m(x, d):
     # Determine the number of nodes (n) and arcs (m) from a constant x = (n)(m) and d
@@ -112,9 +304,70 @@ def change_source_nodes(ξ, network, z):
     source_nodes = ξ.sample(range(n), z)
     for node in source_nodes:
         network.add_arc(-1, node, 0)
-    
+
+
+def sample_parameters(ξ, m, is_non_neg, is_int):
+    """The generator parameters d, n, z, r, lb, ub and D of an instance with m arcs"""
+    d = ξ.random()
+    n = determine_n(m, d)
+    z = ξ.randint(1, n)
+    r = 0 if is_non_neg else ξ.random()
+    lb = -10**ξ.randint(0, 10)
+    ub = 10**ξ.randint(0, 10)
+    D = partial(random.Random.randint if is_int else random.Random.uniform, a=lb, b=ub)
+    return d, n, z, r, lb, ub, D
+
+
+def generate_instance(m, s, is_non_neg, is_int, output_dir="output/", to_file=True, file_format="dimacs", progress=None, verify=False, cache=None, out_of_core=False, engine="python", workers=None, compression=None, extra_features=False):
+    """Samples the generator parameters from seed s and writes the instance with m
+    arcs, this is what the command line interface does for a single instance.
+    The stages of both generation and output are recorded in `progress`.
+    With `verify` the distances are certified before the instance is written.
+    With an InstanceCache the instance is only generated if it is not cached.
+    With `out_of_core` the remaining arcs are kept on disk rather than in memory,
+    see strong_graphs.external, but not with a cache. `engine` is as for
+    build_instance, also for cached and out of core instances, `workers` is
+    the processes of both the parallel engine and the output, and `compression`
+    is as for output. With `extra_features` the header has the extra features of
+    strong_graphs.features.FeatureEngine, which a cached or out of core
+    instance does not."""
+    assert not (extra_features and (cache is not None or out_of_core)), "extra features need the instance in memory"
+    if cache is not None and out_of_core:
+        raise ValueError("cached instances are generated in memory, out_of_core cannot be used with a cache")
+    if cache is not None:
+        return cache.output(
+            m, s, is_non_neg, is_int, output_dir, to_file, file_format, progress, verify, workers, compression, engine
+        )
+    if out_of_core:
+        from strong_graphs.external import generate_out_of_core
+
+        return generate_out_of_core(
+            m, s, is_non_neg, is_int, output_dir, file_format, progress, verify,
+            workers=workers, compression=compression, engine=engine,
+        )
+    ξ = random.Random(s)
+    d, n, z, r, lb, ub, D = sample_parameters(ξ, m, is_non_neg, is_int)
+    network, tree_arcs, distances, _, source = build_instance(
+        ξ, n, m, r, D, engine=engine, progress=progress, workers=workers
+    )
+    if verify:
+        from strong_graphs.verify import verify_instance
+
+        verification = verify_instance(network, source, distances, tree_arcs)
+        if not verification.ok:
+            raise ValueError(f"instance {m=} {s=} failed verification: {verification}")
+    if not is_int:
+        divisor = network.normalise()
+        distances = {u: x / divisor for u, x in distances.items()}
+    sum_of_distances = 0 #sum(distances.values())
+    change_source_nodes(ξ, network, z)
+    features = FeatureEngine(extra_features, distances, tree_arcs)
+    output(ξ, network, sum_of_distances, m, d, r, s, z, lb, ub, -1, output_dir=output_dir, to_file=to_file, file_format=file_format, progress=progress, workers=workers, compression=compression, features=features)
+    return n
+
 
 if __name__ == "__main__":
+    from strong_graphs.visualise.draw import draw_graph
 
     #m = 100
     s = 1
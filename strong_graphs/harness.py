@@ -0,0 +1,136 @@
+"""
+Runs the reference solvers of strong_graphs.solvers over instances, to measure
+how hard they are.
+
+An instance is either a file, DIMACS or binary, solved from its source, or a
+batch Job, generated as generate_instance would and solved from the root of
+the tree before the source nodes are added. The distances found for a Job must
+match those build_instance returned for it. Files carry no distances, so for
+them a result is correct if its distances certify as in strong_graphs.verify.
+dijkstra_potential is given a feasible potential: the distances of a Job, or
+0 for a file without negative weights. No potential is known for other files,
+so it does not run on them. Instances are solved in a pool of processes, and the results written as a CSV
+table with a row per instance and solver.
+"""
+import csv
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, NamedTuple
+import numpy as np
+from strong_graphs.batch import Job
+from strong_graphs.data_structure import CompactNetwork
+from strong_graphs.formats import read_instance
+from strong_graphs.generator import build_instance, sample_parameters
+from strong_graphs.solvers import solvers
+from strong_graphs.utils import csr
+from strong_graphs.verify import certify_distances, graph_columns
+
+__all__ = ["SolverRun", "instance_paths", "run_harness", "solve"]
+
+
+class SolverRun(NamedTuple):
+    instance: str
+    solver: str
+    nodes: int
+    arcs: int
+    seconds: float
+    scans: int
+    relaxations: int
+    negative_cycle: bool
+    correct: bool
+
+
+def is_correct(result, s, tails, heads, weights, expected=None):
+    distances = result.distances
+    if result.negative_cycle or distances[s] != 0 or not np.all(np.isfinite(distances)):
+        return False
+    if expected is not None:
+        if distances.dtype.kind == expected.dtype.kind == "i":
+            return bool(np.array_equal(distances, expected))
+        scale = max(1.0, float(np.abs(expected).max()))
+        return bool(np.allclose(distances, expected, rtol=0, atol=1e-9 * scale))
+    violated, _, _ = certify_distances(tails, heads, weights, distances)
+    return violated == 0
+
+
+def solve(name, graph, source, distances=None, names=None):
+    """
+    A SolverRun of each solver in `names`, all by default, on a network or an
+    Instance from the node `source`. `distances`, a mapping over the nodes, are
+    what the solvers must find if given, and the potential of dijkstra.
+    """
+    n, nodes, positions, tails, heads, weights = graph_columns(graph)
+    s = int(positions(np.array([source]))[0])
+    expected = None
+    if distances is not None:
+        expected = np.array([distances[u] for u in nodes.tolist()])
+    offsets, csr_heads, csr_weights = csr(n, tails, heads, weights)
+    runs = []
+    for solver in names or solvers:
+        arguments = (offsets, csr_heads, csr_weights, s)
+        if solver == "dijkstra":
+            if expected is None and len(weights) and weights.min() < 0:
+                continue  # No feasible potential is known
+            arguments += (expected,)
+        start = time.perf_counter()
+        result = solvers[solver](*arguments)
+        seconds = time.perf_counter() - start
+        runs.append(SolverRun(
+            name, solver, n, len(tails), seconds, result.scans, result.relaxations,
+            result.negative_cycle, is_correct(result, s, tails, heads, weights, expected),
+        ))
+    return runs
+
+
+def solve_item(item, names=None):
+    if isinstance(item, Job):
+        ξ = random.Random(item.s)
+        _, n, _, r, _, _, D = sample_parameters(ξ, item.m, item.is_non_neg, item.is_int)
+        network, _, distances, _, source = build_instance(ξ, n, item.m, r, D, network_type=CompactNetwork)
+        name = f"m={item.m} s={item.s} is_non_neg={item.is_non_neg} is_int={item.is_int}"
+        return solve(name, network, source, distances, names)
+    instance = read_instance(item)
+    return solve(str(item), instance, instance.header["source"], names=names)
+
+
+def instance_paths(paths):
+    """The files given and those in the directories given, in order"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found += sorted(
+                os.path.join(path, x) for x in os.listdir(path)
+                if not x.startswith(".") and os.path.isfile(os.path.join(path, x))
+            )
+        else:
+            found.append(path)
+    return found
+
+
+def run_harness(items: Iterable, names=None, workers=None, results=None, report=print):
+    """
+    Solves every item, a Job, a file or the files in a directory, with the
+    solvers in `names` in a pool of worker processes. Returns the SolverRuns in
+    the order of the items and writes them to the CSV file `results` if given.
+    """
+    items = [x for item in items for x in ([item] if isinstance(item, Job) else instance_paths([item]))]
+    workers = workers or os.cpu_count()
+    runs = [None] * len(items)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(solve_item, item, names): i for i, item in enumerate(items)}
+        for future in as_completed(futures):
+            runs[futures[future]] = future.result()
+            for run in runs[futures[future]]:
+                report(
+                    f"{run.instance} {run.solver} {run.seconds:.3f}s scans={run.scans} "
+                    f"relaxations={run.relaxations} {'ok' if run.correct else 'WRONG'}"
+                )
+    runs = [run for item_runs in runs for run in item_runs]
+    if results is not None:
+        with open(results, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(SolverRun._fields)
+            writer.writerows(runs)
+    return runs
@@ -1,7 +1,6 @@
 import copy
 from collections import defaultdict
 from strong_graphs.utils import determine_order
-from strong_graphs.data_structure import Network
 
 __all__ = ["map_distances", "map_graph", "mapping_required"]
 
@@ -69,10 +68,12 @@ def determine_nodes_by_distance(distances):
         nodes_by_distance[distance].add(node)
     return nodes_by_distance
 
-def mapping_required(ξ, distances, nb_neg_loop_arcs):
+def mapping_required(ξ, distances, nb_neg_loop_arcs, order=None):
+    """`order` is determine_order(distances) if it is already known"""
     if nb_neg_loop_arcs == 0:
         return None
-    order = determine_order(distances)
+    if order is None:
+        order = determine_order(distances)
     n = len(order)
     assert 0 <= nb_neg_loop_arcs < n, "Must have at least one non-negative-arc"
     assert n == len(set(order)), "No duplicates allowed"
@@ -89,7 +90,7 @@ def map_distances(distances, mapping):
 
 
 def map_graph(graph, mapping):
-    new_graph = Network()
+    new_graph = type(graph)()
     for node in graph.nodes():
         new_graph.add_node(node)
     for (u, v, w) in graph.arcs():
@@ -1,5 +1,6 @@
 from strong_graphs.utils import nb_arcs_from_density, nb_arcs_in_complete_dag
 import random
+import numpy as np
 from numpy import nextafter
 
 __all__ = [
@@ -34,6 +35,15 @@ def determine_alpha_beta(μ, control=100.0):
     return α, β
 
 
+def determine_alpha_beta_batched(μ, control=100.0):
+    """determine_alpha_beta for an array of means strictly between 0 and 1"""
+    μ = np.nextafter(μ, 0.5)
+    high = μ > 0.5
+    α = np.where(high, control, control * μ / (1 - μ))
+    β = np.where(high, control * (1 - μ) / μ, control)
+    return α, β
+
+
 def sample_number(ξ, min_value, max_value, expected) -> int:
     """Infers a beta distribution with given parameters """
     assert max_value >= expected >= min_value
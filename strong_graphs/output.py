@@ -1,81 +1,323 @@
+import math
 import sys
-import tqdm
-import statistics
-from strong_graphs.utils import bellman_ford
+from array import array
+from fractions import Fraction
+from operator import mul
+import numpy as np
+from strong_graphs.formats import (
+    comment_lines,
+    compressed,
+    dimacs_arc_chunks,
+    dimacs_preamble,
+    suffixes,
+    write_binary_column,
+    write_binary_header,
+)
+from strong_graphs.features import FeatureEngine
+from strong_graphs.progress import Progress
+from strong_graphs.utils import label_positions
 
-def output(ξ, graph, sum_of_distances, target_n_arcs, d, r, s, z, lb, ub, source, shuffle=True, output_dir="output/", to_file=True):
+chunk_size = 1 << 16
+
+
+class Moments:
+    """
+    Running count, min, max, mean and variance of a stream of numbers, updated a
+    chunk at a time so that statistics never need a second copy of the stream.
+
+    While the stream is integral the sums are kept exactly and the mean and
+    variance match statistics.mean and statistics.variance. Once a float arrives
+    the moments are merged chunk by chunk instead (Chan et al.).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.exact = True
+        self.sum = 0
+        self.sum_of_squares = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, values):
+        self.add(self.summarise(values, self.exact))
+
+    @staticmethod
+    def summarise(values, exact=True):
+        """
+        What update adds for a chunk of values, a list or numpy array: their
+        count, min and max, then their sum and sum of squares if integral and
+        `exact`, otherwise their mean and sum of squared deviations. Chunks
+        summarised in other processes and added in order give exactly the
+        moments of update.
+
+        The values are reduced with numpy. Integer sums are taken in int64 when
+        they cannot overflow and in Python integers otherwise, float sums with
+        math.fsum, so the summaries are those of the same sums over a list.
+        """
+        values = np.asarray(values)
+        k = len(values)
+        if k == 0:
+            return None
+        low, high = values.min(), values.max()
+        if values.dtype.kind != "O":  # Python integers too large for int64 stay as they are
+            low, high = low.item(), high.item()
+        if exact and values.dtype.kind in "iO":
+            bound = max(-low, high)
+            if values.dtype.kind == "i" and bound * bound * k < 1 << 63:
+                return k, low, high, (int(values.sum()), int(np.dot(values, values))), None
+            values = values.tolist()
+            return k, low, high, (sum(values), sum(map(mul, values, values))), None
+        values = values.astype(np.float64)
+        μ = math.fsum(values.tolist()) / k
+        # float_power squares with pow, as (x - μ) ** 2 does, rather than x * x
+        squares = np.float_power(values - μ, 2)
+        return k, low, high, None, (μ, math.fsum(squares.tolist()))
+
+    def add(self, summary):
+        """Adds a chunk summarised by summarise"""
+        if summary is None:
+            return
+        k, low, high, sums, deviations = summary
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+        if sums is not None and self.exact:
+            self.count += k
+            self.sum += sums[0]
+            self.sum_of_squares += sums[1]
+            return
+        self._make_inexact()
+        if deviations is None:  # An integral chunk summarised apart
+            total, squares = sums
+            deviations = float(Fraction(total, k)), float(Fraction(squares) - Fraction(total ** 2, k))
+        self._combine(k, *deviations)
+
+    def merge(self, other):
+        """Adds the moments of another stream, e.g. one chunk of the weights
+        summarised in another process"""
+        if other.count == 0:
+            return
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if self.exact and other.exact:
+            self.count += other.count
+            self.sum += other.sum
+            self.sum_of_squares += other.sum_of_squares
+            return
+        self._make_inexact()
+        self._combine(other.count, *other._float_moments())
+
+    def _float_moments(self):
+        """The mean and sum of squared deviations as floats"""
+        if not self.exact:
+            return self._mean, self._m2
+        return (
+            float(Fraction(self.sum, self.count)),
+            float(Fraction(self.sum_of_squares) - Fraction(self.sum ** 2, self.count)),
+        )
+
+    def _make_inexact(self):
+        if self.exact:
+            self.exact = False
+            if self.count:
+                self._mean, self._m2 = self._float_moments()
+
+    def _combine(self, k, μ, m2):
+        """Adds k numbers of mean μ and sum of squared deviations m2"""
+        δ = μ - self._mean
+        count = self.count + k
+        self._mean += δ * k / count
+        self._m2 += m2 + δ ** 2 * self.count * k / count
+        self.count = count
+
+    @staticmethod
+    def _convert(value):
+        """As the statistics module does, integers stay integers if possible"""
+        return value.numerator if value.denominator == 1 else float(value)
+
+    @property
+    def mean(self):
+        if self.exact:
+            return self._convert(Fraction(self.sum, self.count))
+        return self._mean
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return math.nan
+        if self.exact:
+            n = self.count
+            return self._convert(
+                Fraction(n * self.sum_of_squares - self.sum ** 2, n * (n - 1))
+            )
+        return self._m2 / (self.count - 1)
+
+
+def weight_statistics(weights=()):
+    """All the weight features in one pass over the weights, more weights can
+    be added a chunk at a time with update_weight_statistics"""
+    stats = {"weight": Moments(), "abs": Moments(), "negative": 0, "zero": 0, "min_abs": math.inf}
+    for i in range(0, len(weights), chunk_size):
+        update_weight_statistics(stats, weights[i : i + chunk_size])
+    return stats
+
+
+def update_weight_statistics(stats, chunk):
+    """Adds a chunk of weights, any sequence numpy takes, to the statistics"""
+    add_weight_summary(stats, summarise_weights(chunk, stats["weight"].exact))
+
+
+def summarise_weights(chunk, exact=True):
+    """What update_weight_statistics adds for a chunk of weights, see
+    Moments.summarise"""
+    chunk = np.asarray(chunk)
+    absolute = np.abs(chunk)
+    nonzero = absolute[absolute != 0]
+    return (
+        Moments.summarise(chunk, exact),
+        Moments.summarise(absolute, exact),
+        int(np.count_nonzero(chunk < 0)),
+        len(chunk) - len(nonzero),
+        nonzero.min().item() if len(nonzero) else math.inf,
+    )
+
+
+def add_weight_summary(stats, summary):
+    weight, absolute, negative, zero, min_abs = summary
+    stats["weight"].add(weight)
+    stats["abs"].add(absolute)
+    stats["negative"] += negative
+    stats["zero"] += zero
+    stats["min_abs"] = min(stats["min_abs"], min_abs)
+
+
+def header_features(n_actual, m_actual, target_n_arcs, sum_of_distances, source_nodes, max_depth, stats):
+    """The features written to the header, from the weight statistics"""
+    n_component = n_actual - 1
+    m_neg = stats["negative"]
+    m_zero = stats["zero"] - source_nodes
+    return {
+        "Number of nodes including dummy": n_actual,
+        "Number of arcs including dummy": m_actual,
+        "Sum of distances": sum_of_distances,
+        "Number of arcs": target_n_arcs,
+        "Density": target_n_arcs / n_component**2,
+        "Proportion of negative arcs": m_neg,
+        "Proportion of zero arcs": m_zero,
+        "Number of positive arcs": target_n_arcs - m_neg - m_zero,
+        "Max depth": max_depth,
+        "Weight max": stats["weight"].max,
+        "Weight min": stats["weight"].min,
+        "Weight mean": stats["weight"].mean,
+        "Weight variance": stats["weight"].variance,
+        "Abs weight max": stats["abs"].max,
+        "Abs weight min": stats["min_abs"],
+        "Abs weight mean": stats["abs"].mean,
+        "Abs weight variance": stats["abs"].variance,
+        "Source nodes": source_nodes,
+        "Source node ratio": source_nodes / float(n_component),
+    }
+
+
+def output(ξ, graph, sum_of_distances, target_n_arcs, d, r, s, z, lb, ub, source, shuffle=True, output_dir="output/", to_file=True, file_format="dimacs", progress=None, workers=None, compression=None, features=None):
     """
     Converts a graph in `extended DIMACS format' which is what is expected
-    by the algorithms in SPLib
-    
+    by the algorithms in SPLib, or the equivalent binary format of
+    strong_graphs.formats when file_format is "binary".
+
     Note that the node ordering is indexed from 1 not 0 so our nodes must be increased.
+
+    Arcs are held as compact columns and written in shuffled chunks, the shuffle
+    permutes arc indices so it draws the same numbers as shuffling the arcs.
+    Writing the arcs is recorded as the "Output" stage of `progress`.
+
+    DIMACS arc lines are formatted a chunk at a time with numpy, by a pool of
+    `workers` processes if more than one, and can be compressed with "gzip" or
+    "zstd". With more than one worker the weight statistics are also computed
+    in a pool, from the weights in shared memory. The file is the same
+    whatever the workers and, once decompressed, whatever the compression.
+
+    The structural features come from `features`, a FeatureEngine, by default
+    one computing only "Max depth"; any others it computes are added after the
+    weight features.
     """
+    assert file_format in ("dimacs", "binary"), f"unknown format {file_format}"
+    assert compression is None or file_format == "dimacs", "only DIMACS files are compressed"
+    features = features or FeatureEngine()
+    progress = progress or Progress(quiet=True)
     n_actual = graph.number_of_nodes()
     n_component = n_actual - 1
     m_actual = graph.number_of_arcs()
     m_component = target_n_arcs
-    source_nodes = len(graph._successors[source])
-    arc_weights = [w for _, _, w in graph.arcs()]
-    m_neg = sum(1 for w in arc_weights if w < 0)
-    min_abs = min(abs(w) for w in arc_weights if w != 0)
-    max_abs = max(abs(w) for w in arc_weights)
-    mean_abs = statistics.mean(abs(w) for w in arc_weights)
-    var_abs = statistics.variance(abs(w) for w in arc_weights)
-    m_zero = sum(1 for w in arc_weights if w == 0) - source_nodes
+    source_nodes = graph.out_degree(source)
+    tails, heads, weights = graph.arc_columns()
+    weight_type = np.int64 if weights.typecode == "q" else np.float64
+    if workers is not None and workers > 1:
+        from strong_graphs.shared import SharedArcs, shared_weight_statistics
+
+        with SharedArcs.create(len(weights), weight_type, weights_only=True) as arcs:
+            arcs.weights[:] = np.frombuffer(weights, dtype=weight_type)
+            stats = shared_weight_statistics(arcs, workers, chunk_size=chunk_size)
+    else:
+        stats = weight_statistics(weights)
     filename = f"strong-graph-{m_component}-{s}"  # Other input data required
+    nodes = list(graph.nodes())
     if shuffle:
-        nodes = list(graph.nodes())
         ξ.shuffle(nodes)
-        mapping = {u: i for i, u in enumerate(nodes)}
-    else:
-        mapping = {i: i for i in range(m)}
+    nodes = np.array(nodes, dtype=np.int64)
+    columns = [
+        np.frombuffer(tails, dtype=np.int64),
+        np.frombuffer(heads, dtype=np.int64),
+        np.frombuffer(weights, dtype=weight_type),
+    ]
 
     # Feature
-    unit_distances = bellman_ford(graph, source, unit_weight=True)
-    with open(output_dir + filename, "w") if to_file else sys.stdout as f:  #
-        f.write(
-            f"""c Strong graph for shortest paths problem
-c extended DIMACS format
-c filename: {filename}
-c 
-c Generator Parameters
-c n={n_component}
-c m={m_component}
-c {d=}
-c {r=}
-c {s=}
-c {lb=}
-c {ub=}
-c {z=}
-c
-c Features
-c Number of nodes including dummy {n_actual}
-c Number of arcs including dummy {m_actual}
-c Sum of distances {sum_of_distances}
-c Number of arcs {m_component}
-c Density {m_component / n_component**2}
-c Proportion of negative arcs {m_neg}
-c Proportion of zero arcs {m_zero}
-c Number of positive arcs {m_component - m_neg - m_zero}
-c Max depth {max(unit_distances.values())}
-c Weight max {max(arc_weights)}
-c Weight min {min(arc_weights)}
-c Weight mean {statistics.mean(arc_weights)}
-c Weight variance {statistics.mean(arc_weights)}
-c Abs weight max {max_abs}
-c Abs weight min {min_abs}
-c Abs weight mean {mean_abs}
-c Abs weight variance {var_abs}
-c Source nodes {source_nodes}
-c Source node ratio {source_nodes/float(n_component)}
-"""
-        )
-        f.write(f"t strong-graph-{m_component}-{s}\nc\n")
-        f.write(f"p sp {n_actual:10} {m_actual:10}\nc\n")
-        f.write(f"n {mapping[source]+1:10}\nc\n")
-        with tqdm.tqdm(total=m_actual, desc="Output") as bar:
-            arcs = list(graph.arcs())
-            ξ.shuffle(arcs)
-            for u, v, w in arcs:
-                bar.update()
-                f.write(f"a {mapping[u]+1:10} {mapping[v]+1:10} {w:10}\n")
+    structure = features(nodes, columns[0], columns[1], source)
+    parameters = {
+        "n": n_component, "m": m_component, "d": d, "r": r, "s": s, "lb": lb, "ub": ub, "z": z
+    }
+    features = header_features(
+        n_actual, m_actual, m_component, sum_of_distances, source_nodes,
+        structure.pop("Max depth"), stats,
+    )
+    features.update(structure)
+    comments = comment_lines(filename, parameters, features)
+    ids = label_positions(nodes, start=1)
+    source_id = int(ids(np.array([source]))[0])
+    order = array("q", range(m_actual))
+    ξ.shuffle(order)
+    order = np.frombuffer(order, dtype=np.int64)
+
+    def shuffled(column, is_node):
+        for i in range(0, m_actual, chunk_size):
+            x = column[order[i : i + chunk_size]]
+            yield ids(x) if is_node else x
+
+    if file_format == "binary":
+        header = {
+            "title": filename,
+            "nodes": n_actual,
+            "arcs": m_actual,
+            "source": source_id,
+            "weight_dtype": np.dtype(weight_type).str,
+            "comments": comments,
+            "parameters": parameters,
+            "features": features,
+        }
+        with open(output_dir + filename + ".bin", "wb") if to_file else sys.stdout.buffer as f:
+            write_binary_header(f, header)
+            with progress.stage("Output", total=m_actual) as stage:
+                for i, column in enumerate(columns):
+                    write_binary_column(f, shuffled(column, i < 2))
+                stage.count = m_actual
+        return
+    path = output_dir + filename + suffixes[compression]
+    with open(path, "wb") if to_file else sys.stdout.buffer as raw, compressed(raw, compression) as f:
+        f.write(dimacs_preamble(filename, comments, n_actual, m_actual, source_id).encode())
+        with progress.stage("Output", total=m_actual) as stage:
+            chunks = zip(*(shuffled(column, i < 2) for i, column in enumerate(columns)))
+            for data in dimacs_arc_chunks(chunks, workers):
+                f.write(data)
+                stage.update(data.count(b"\n"))
+            stage.count = m_actual
@@ -0,0 +1,105 @@
+"""
+Generating the remaining arcs in a pool of processes.
+
+Once plan_remaining_arcs has fixed how many arcs each node receives, the arcs
+into a node only depend on which nodes come before and after it in the order
+and on the tree and loop arcs already in the graph. The order is cut into
+`blocks` ranges of consecutive nodes, each generated with its own random
+stream spawned from one numpy SeedSequence, and the ranges are generated by
+the workers. Neither the ranges nor their streams depend on the number of
+workers, so neither does the instance.
+
+The number of arcs into each node is known from the plan, so every range has a
+known place in one SharedArcs buffer, which the workers write their arcs to.
+Nothing but the plan, once per worker, and arc counts are pickled.
+"""
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from strong_graphs.arc_generators import gen_arcs_to_nodes, plan_remaining_arcs
+from strong_graphs.generator import arc_weight_remaining
+from strong_graphs.progress import Progress
+from strong_graphs.shared import ArcsHandle, SharedArcs
+from strong_graphs.utils import determine_order
+
+__all__ = ["gen_remaining_arcs_parallel"]
+
+# What every block of an instance needs, set once in each worker
+shared = None
+
+
+def share(state, arcs):
+    """Sets the state of a worker, attaching to the arcs if given their handle"""
+    global shared
+    if isinstance(arcs, ArcsHandle):
+        arcs = SharedArcs.attach(arcs)
+    shared = (*state, arcs)
+
+
+def unshare():
+    global shared
+    shared = None
+
+
+def gen_block(start, stop, offset, seed):
+    """Writes the arcs into order[start:stop] to the shared arcs from offset
+    and returns how many there are"""
+    n, order, allocation, vacancies, existing, distances, D, arcs = shared
+    ξ = random.Random(seed)
+
+    def has_arc(u, v):
+        return u * n + v in existing
+
+    tails, heads, weights = [], [], []
+    for u, v, is_negative in gen_arcs_to_nodes(ξ, has_arc, n, order, allocation, vacancies, start, stop):
+        tails.append(u)
+        heads.append(v)
+        weights.append(arc_weight_remaining(ξ, D, distances[v] - distances[u], is_negative))
+    k = len(tails)
+    arcs.tails[offset : offset + k] = tails
+    arcs.heads[offset : offset + k] = heads
+    arcs.weights[offset : offset + k] = weights
+    return k
+
+
+def gen_remaining_arcs_parallel(ξ, graph, distances, n, m, m_neg_total, D, progress=None, order=None, workers=None, blocks=256):
+    """
+    As gen_remaining_arcs followed by sampling the weights, but yields the arcs
+    as (tails, heads, weights) arrays a block at a time, in the order. The
+    arrays are copied out of the shared memory, which is freed once the
+    generator is exhausted or closed. With one worker the blocks are generated
+    in this process.
+    """
+    progress = progress or Progress(quiet=True)
+    if order is None:
+        order = determine_order(distances)
+    allocation, vacancies = plan_remaining_arcs(ξ, graph, n, m, m_neg_total, progress, None, order)
+    tails, heads, _ = graph.arc_columns()
+    existing = set((np.frombuffer(tails, dtype=np.int64) * n + np.frombuffer(heads, dtype=np.int64)).tolist())
+    state = (n, list(order), allocation, vacancies, existing, [distances[u] for u in range(n)], D)
+    blocks = max(1, min(blocks, n))
+    bounds = [n * i // blocks for i in range(blocks + 1)]
+    streams = np.random.SeedSequence(ξ.getrandbits(128)).spawn(blocks)
+    seeds = [int.from_bytes(x.generate_state(4).tobytes(), "little") for x in streams]
+    # Where the arcs of each block start in the shared arcs
+    per_node = np.add(allocation["<="], allocation[">="])[np.asarray(order, dtype=np.int64)]
+    offsets = np.concatenate(([0], np.cumsum(per_node)))[bounds].tolist()
+    weight_dtype = np.int64 if D.func is random.Random.randint else np.float64
+    workers = workers or os.cpu_count()
+    with SharedArcs.create(offsets[-1], weight_dtype) as arcs:
+        if workers == 1:
+            share(state, arcs)
+            counts = map(gen_block, bounds[:-1], bounds[1:], offsets[:-1], seeds)
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=share, initargs=(state, arcs.handle))
+            counts = pool.map(gen_block, bounds[:-1], bounds[1:], offsets[:-1], seeds)
+        try:
+            for a, b, k in zip(offsets[:-1], offsets[1:], counts):
+                assert k == b - a, f"block has {k} arcs, not {b - a}"
+                yield arcs.tails[a:b].copy(), arcs.heads[a:b].copy(), arcs.weights[a:b].copy()
+        finally:
+            if workers == 1:
+                unshare()
+            else:
+                pool.shutdown(cancel_futures=True)
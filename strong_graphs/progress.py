@@ -0,0 +1,136 @@
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+__all__ = ["Progress", "Stage"]
+
+
+def peak_memory():
+    """High water mark of the resident memory of this process in bytes, if known"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Stage:
+    """
+    Wall clock time, item count and peak memory of one stage of generation.
+
+    When the progress is quiet, track hands back the iterable untouched and
+    update does nothing, so a disabled stage costs nothing per item. Otherwise
+    items are counted in batches of `every` and the bar is redrawn at most once
+    every `interval` seconds.
+    """
+
+    def __init__(self, name, total=None, bar=None, every=1 << 12, interval=0.1):
+        self.name = name
+        self.total = total
+        self.count = 0
+        self.seconds = None
+        self.peak_memory = None
+        self._bar = bar
+        self._every = every
+        self._interval = interval
+        self._drawn = time.perf_counter()
+
+    def track(self, iterable):
+        if self._bar is None:
+            return iterable
+        return self._tracked(iterable)
+
+    def _tracked(self, iterable):
+        k = 0
+        every = self._every
+        for x in iterable:
+            yield x
+            k += 1
+            if k == every:
+                self.update(k)
+                k = 0
+        self.update(k)
+
+    def update(self, k=1):
+        if self._bar is None:
+            return
+        self.count += k
+        if (now := time.perf_counter()) - self._drawn >= self._interval:
+            self._draw()
+            self._drawn = now
+
+    def _draw(self):
+        self._bar.update(self.count - self._bar.n)
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "seconds": self.seconds,
+            "count": self.count,
+            "peak_memory": self.peak_memory,
+        }
+
+
+class Progress:
+    """
+    Collects a Stage for every stage of generation and, unless quiet, draws a
+    progress bar for each. The stages are kept in order in `stages`.
+
+    `report` is called with each finished Stage, e.g. to log the metrics.
+
+    The peak memory of a stage is the high water mark of the whole process,
+    unless tracemalloc is tracing, when it is the peak of the memory traced
+    while the stage was open, nested stages included.
+    """
+
+    def __init__(self, quiet=False, every=1 << 12, interval=0.1, report=None):
+        self.quiet = quiet
+        self.every = every
+        self.interval = interval
+        self.report = report
+        self.stages = []
+        self._open = []  # stages entered but not exited, with their traced peaks
+
+    @contextmanager
+    def stage(self, name, total=None):
+        bar = None
+        if not self.quiet:
+            from tqdm import tqdm
+
+            bar = tqdm(total=total, desc=name)
+        stage = Stage(name, total, bar, self.every, self.interval)
+        self._traced_peak()
+        self._open.append([stage, 0])
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds = time.perf_counter() - start
+            self._traced_peak()
+            _, traced = self._open.pop()
+            stage.peak_memory = traced if tracemalloc.is_tracing() else peak_memory()
+            if bar is not None:
+                stage._draw()
+                bar.close()
+            self.stages.append(stage)
+            if self.report is not None:
+                self.report(stage)
+
+    def _traced_peak(self):
+        """Passes the traced peak so far to every open stage and resets it"""
+        if not tracemalloc.is_tracing():
+            return
+        _, peak = tracemalloc.get_traced_memory()
+        for x in self._open:
+            x[1] = max(x[1], peak)
+        tracemalloc.reset_peak()
+
+    def metrics(self):
+        """The recorded stages as a list of dictionaries"""
+        return [stage.as_dict() for stage in self.stages]
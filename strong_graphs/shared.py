@@ -0,0 +1,127 @@
+"""
+Arc columns in shared memory, so that worker processes read and write the
+arcs of an instance in place rather than pickling them.
+
+A SharedArcs is one multiprocessing.shared_memory segment holding the tails,
+heads and weights of up to `capacity` arcs as numpy arrays. The process that
+creates it owns it and frees it when its context exits. Workers attach with
+the small picklable `handle` and only close their view. Workers write to
+disjoint ranges of the arcs, so there is no locking. The arrays are views of
+the segment and must not be used once it is closed. A segment created with
+`weights_only` holds just the weights, 8 bytes an arc rather than 24, and
+its tails and heads are None.
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import NamedTuple
+import numpy as np
+from strong_graphs.output import add_weight_summary, chunk_size, summarise_weights, weight_statistics
+
+__all__ = ["ArcsHandle", "SharedArcs", "shared_weight_statistics"]
+
+
+class ArcsHandle(NamedTuple):
+    name: str
+    capacity: int
+    weight_dtype: str
+    weights_only: bool = False
+
+
+class SharedArcs:
+    def __init__(self, memory, capacity, weight_dtype, owner, weights_only=False):
+        self.memory = memory
+        self.capacity = capacity
+        self.weight_dtype = np.dtype(weight_dtype)
+        self.owner = owner
+        self.weights_only = weights_only
+        buffer = memory.buf
+        if weights_only:
+            self.tails = self.heads = None
+            self.weights = np.ndarray(capacity, dtype=self.weight_dtype, buffer=buffer)
+            return
+        self.tails = np.ndarray(capacity, dtype=np.int64, buffer=buffer)
+        self.heads = np.ndarray(capacity, dtype=np.int64, buffer=buffer, offset=8 * capacity)
+        self.weights = np.ndarray(capacity, dtype=self.weight_dtype, buffer=buffer, offset=16 * capacity)
+
+    @classmethod
+    def create(cls, capacity, weight_dtype=np.int64, weights_only=False):
+        size = (8 if weights_only else 24) * capacity
+        memory = shared_memory.SharedMemory(create=True, size=max(1, size))
+        return cls(memory, capacity, weight_dtype, owner=True, weights_only=weights_only)
+
+    @classmethod
+    def attach(cls, handle):
+        if sys.version_info >= (3, 13):
+            memory = shared_memory.SharedMemory(name=handle.name, track=False)
+        else:
+            # A worker started before the segment was created has a resource
+            # tracker of its own, which would unlink the segment when the
+            # worker exits, so only the owner registers it
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                memory = shared_memory.SharedMemory(name=handle.name)
+            finally:
+                resource_tracker.register = register
+        return cls(memory, handle.capacity, handle.weight_dtype, owner=False, weights_only=handle.weights_only)
+
+    @classmethod
+    def from_network(cls, network):
+        """A copy of the arcs of a network, in the order of arc_columns"""
+        tails, heads, weights = network.arc_columns()
+        arcs = cls.create(len(tails), np.int64 if weights.typecode == "q" else np.float64)
+        arcs.tails[:] = np.frombuffer(tails, dtype=np.int64)
+        arcs.heads[:] = np.frombuffer(heads, dtype=np.int64)
+        arcs.weights[:] = np.frombuffer(weights, dtype=arcs.weight_dtype)
+        return arcs
+
+    @property
+    def handle(self):
+        return ArcsHandle(self.memory.name, self.capacity, self.weight_dtype.str, self.weights_only)
+
+    def close(self):
+        """Drops the views and the mapping, and frees the segment if owned"""
+        self.tails = self.heads = self.weights = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def range_weight_summaries(handle, start, stop, chunk_size):
+    arcs = SharedArcs.attach(handle)
+    try:
+        return [
+            summarise_weights(arcs.weights[i : min(i + chunk_size, stop)])
+            for i in range(start, stop, chunk_size)
+        ]
+    finally:
+        arcs.close()
+
+
+def shared_weight_statistics(arcs, workers=None, ranges=None, chunk_size=chunk_size):
+    """
+    weight_statistics of the shared weights, computed a range per worker. The
+    ranges are cut on chunk boundaries and the chunks added in order, so the
+    statistics are exactly those of weight_statistics with the same chunk_size.
+    """
+    workers = workers or os.cpu_count()
+    chunks = -(-arcs.capacity // chunk_size)
+    ranges = max(1, min(ranges or workers, chunks))
+    bounds = [min(arcs.capacity, chunks * i // ranges * chunk_size) for i in range(ranges + 1)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(
+            range_weight_summaries, [arcs.handle] * ranges, bounds[:-1], bounds[1:], [chunk_size] * ranges
+        )
+        stats = weight_statistics()
+        for summaries in parts:
+            for summary in summaries:
+                add_weight_summary(stats, summary)
+    return stats
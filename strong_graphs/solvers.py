@@ -0,0 +1,150 @@
+"""
+Reference label-correcting shortest path solvers, to measure how hard an
+instance is.
+
+Each solves from a source over arcs in compressed sparse row form, as
+strong_graphs.utils.csr builds them, and counts its work: scans, the nodes
+whose arcs it examined, and relaxations, the labels it lowered. A label is
+lowered along a walk, and a label lowered along a walk of n arcs repeats a
+node, which happens only on or behind a negative cycle, so every solver stops
+there.
+"""
+import heapq
+import math
+from collections import deque
+from typing import NamedTuple
+import numpy as np
+
+__all__ = ["SolverResult", "fifo_bellman_ford", "goldberg_radzik", "dijkstra_potential", "solvers"]
+
+
+class SolverResult(NamedTuple):
+    distances: np.ndarray
+    scans: int
+    relaxations: int
+    negative_cycle: bool
+
+
+def start(offsets, heads, weights, source):
+    n = len(offsets) - 1
+    distances = [math.inf] * n
+    distances[source] = 0
+    return n, offsets.tolist(), heads.tolist(), weights.tolist(), distances, [0] * n
+
+
+def fifo_bellman_ford(offsets, heads, weights, source):
+    """Bellman-Ford with a first in first out queue of the nodes to scan (SPFA)"""
+    n, offsets, heads, weights, distances, walk = start(offsets, heads, weights, source)
+    queued = [False] * n
+    queued[source] = True
+    queue = deque([source])
+    scans = relaxations = 0
+    while queue:
+        u = queue.popleft()
+        queued[u] = False
+        scans += 1
+        d_u, k = distances[u], walk[u] + 1
+        for i in range(offsets[u], offsets[u + 1]):
+            v = heads[i]
+            d = d_u + weights[i]
+            if d < distances[v]:
+                distances[v], walk[v] = d, k
+                relaxations += 1
+                if k >= n:
+                    return SolverResult(np.array(distances), scans, relaxations, True)
+                if not queued[v]:
+                    queued[v] = True
+                    queue.append(v)
+    return SolverResult(np.array(distances), scans, relaxations, False)
+
+
+def goldberg_radzik(offsets, heads, weights, source):
+    """
+    Goldberg and Radzik's algorithm. Each pass takes the nodes lowered in the
+    last one that have an arc of negative reduced cost, sorts everything they
+    reach through arcs of reduced cost at most 0 topologically, and scans it in
+    that order.
+    """
+    n, offsets, heads, weights, distances, walk = start(offsets, heads, weights, source)
+    visited = [0] * n  # the pass a node was last reached by the search in
+    lowered, in_lowered = [source], [False] * n
+    scans = relaxations = passes = 0
+    while lowered:
+        passes += 1
+        roots = [
+            u for u in lowered
+            if any(distances[u] + weights[i] < distances[heads[i]] for i in range(offsets[u], offsets[u + 1]))
+        ]
+        for u in lowered:
+            in_lowered[u] = False
+        # Depth first search, the reverse post order is topological
+        order = []
+        for root in roots:
+            if visited[root] == passes:
+                continue
+            visited[root] = passes
+            stack = [(root, offsets[root])]
+            while stack:
+                u, i = stack[-1]
+                if i < offsets[u + 1]:
+                    stack[-1] = (u, i + 1)
+                    v = heads[i]
+                    if visited[v] != passes and distances[u] + weights[i] <= distances[v]:
+                        visited[v] = passes
+                        stack.append((v, offsets[v]))
+                else:
+                    stack.pop()
+                    order.append(u)
+        lowered = []
+        for u in reversed(order):
+            scans += 1
+            d_u, k = distances[u], walk[u] + 1
+            for i in range(offsets[u], offsets[u + 1]):
+                v = heads[i]
+                d = d_u + weights[i]
+                if d < distances[v]:
+                    distances[v], walk[v] = d, k
+                    relaxations += 1
+                    if k >= n:
+                        return SolverResult(np.array(distances), scans, relaxations, True)
+                    if not in_lowered[v]:
+                        in_lowered[v] = True
+                        lowered.append(v)
+    return SolverResult(np.array(distances), scans, relaxations, False)
+
+
+def dijkstra_potential(offsets, heads, weights, source, potential=None):
+    """
+    Dijkstra's algorithm on the reduced costs w + π(u) - π(v) of a potential π,
+    0 by default. A node whose label is lowered after it was scanned goes back
+    into the heap, so the distances are exact whatever the potential, and with
+    a feasible one, such as the distances build_instance returns, every node
+    is scanned once.
+    """
+    n, offsets, heads, weights, distances, walk = start(offsets, heads, weights, source)
+    π = [0] * n if potential is None else np.asarray(potential).tolist()
+    heap = [(-π[source], source)]
+    scans = relaxations = 0
+    while heap:
+        key, u = heapq.heappop(heap)
+        if key != distances[u] - π[u]:  # lowered since it was pushed
+            continue
+        scans += 1
+        d_u, k = distances[u], walk[u] + 1
+        for i in range(offsets[u], offsets[u + 1]):
+            v = heads[i]
+            d = d_u + weights[i]
+            if d < distances[v]:
+                distances[v], walk[v] = d, k
+                relaxations += 1
+                if k >= n:
+                    return SolverResult(np.array(distances), scans, relaxations, True)
+                heapq.heappush(heap, (d - π[v], v))
+    return SolverResult(np.array(distances), scans, relaxations, False)
+
+
+solvers = {
+    "fifo": fifo_bellman_ford,
+    "goldberg-radzik": goldberg_radzik,
+    "dijkstra": dijkstra_potential,
+}
@@ -2,9 +2,8 @@ import math
 import statistics
 from collections import defaultdict
 from typing import Hashable, Dict, List, Tuple
-from ordered_set import OrderedSet
-import tqdm
 from bisect import bisect_left, bisect_right
+import numpy as np
 
 
 def take_closest(myList, myNumber):
@@ -60,23 +59,163 @@ def nb_arcs_in_complete_dag(n):
     return round(n * (n - 1) / 2)
 
 
-def determine_order(distances: Dict[Tuple, int]) -> List[Hashable]:
-    """Sort tuple based on second value"""
-    return [x[0] for x in sorted(list(distances.items()), key=lambda x: x[1])]
+def determine_order(distances: Dict[Hashable, int]) -> List[Hashable]:
+    """
+    Nodes sorted by distance, nodes at the same distance staying in the order
+    of distances. Integer distances are radix sorted in O(n), floats fall back
+    to numpy's stable argsort.
+    """
+    nodes = list(distances)
+    values = np.array(list(distances.values()))
+    if values.dtype.kind == "i":
+        order = radix_argsort(values)
+    elif values.dtype.kind == "f":
+        order = np.argsort(values, kind="stable")
+    else:  # Integers too large for int64
+        order = sorted(range(len(nodes)), key=values.__getitem__)
+    return list(map(nodes.__getitem__, np.asarray(order, dtype=np.int64).tolist()))
+
+
+def radix_argsort(keys, bits=16):
+    """
+    Stable argsort of an integer array, least significant digit first. numpy
+    radix sorts arrays of 16 bit integers, so each pass over a digit is O(n).
+    """
+    order = np.arange(len(keys))
+    if len(keys) == 0:
+        return order
+    keys = (keys - keys.min()).astype(np.uint64)
+    for shift in range(0, max(int(keys.max()).bit_length(), 1), bits):
+        digit = ((keys[order] >> np.uint64(shift)) & np.uint64((1 << bits) - 1)).astype(np.uint16)
+        order = order[np.argsort(digit, kind="stable")]
+    return order
+
+
+def csr(n, tails, *columns):
+    """
+    Compressed sparse row form of arcs over the nodes 0, ..., n - 1: offsets,
+    with the arcs leaving u at offsets[u]:offsets[u + 1], then each of the
+    columns of the arcs in that order. Arcs leaving the same node keep their
+    order, tails are radix sorted so this takes O(n + m).
+    """
+    tails = np.asarray(tails, dtype=np.int64)
+    order = radix_argsort(tails)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=n), out=offsets[1:])
+    return (offsets, *(np.asarray(column)[order] for column in columns))
+
+
+def label_positions(nodes, start=0):
+    """
+    A function giving the positions, counted from start, of arrays of node
+    labels in the array nodes. Labels that are near consecutive, as the
+    generator numbers them, are mapped through a table built once, in O(1)
+    each, others by binary search.
+    """
+    n = len(nodes)
+    low = int(nodes.min()) if n else 0
+    if n and int(nodes.max()) - low < 2 * n:
+        table = np.empty(int(nodes.max()) - low + 1, dtype=np.int64)
+        table[nodes - low] = np.arange(start, start + n)
+
+        def positions(labels):
+            return table[labels - low]
+    else:
+        sorter = np.argsort(nodes)
+        ids = sorter + start
+
+        def positions(labels):
+            return ids[np.searchsorted(nodes, labels, sorter=sorter)]
 
+    return positions
 
-def shortest_path(tree):
+
+def shortest_path(tree, source=0):
     """Optimal path found using breadth first search on tree, O(n + m)"""
-    distances = defaultdict(int)
-    queue = set([0])
+    distances = tree_distances(tree.number_of_nodes(), *tree.arc_columns(), source)
+    return dict(enumerate(distances.tolist()))
+
+
+def tree_order(arcs, source=0):
+    """
+    The nodes of a tree, given as (u, v, w) arcs in the order they were added,
+    in the order the set based breadth first search of earlier releases reached
+    them in a Network. determine_order keeps nodes at the same distance in the
+    order of distances, so distances are keyed in this order for instances
+    with ties to stay as they were, whatever the class of the network.
+    """
+    successors = defaultdict(set)  # Filled as Network fills its own
+    for u, v, w in arcs:
+        successors[u].add((v, w))
+    order = [source]
+    queue = set([source])
     while queue:
         u = queue.pop()
-        for v, w in tree.successors(u):
-            distances[v] = distances[u] + w
+        for v, _ in successors[u]:
+            order.append(v)
             queue.add(v)
+    return order
+
+
+def tree_distances(n, tails, heads, weights, source=0):
+    """
+    Distances from source along the arcs of a tree over the nodes 0, ..., n - 1,
+    as an array indexed by node. The children of every node are held in a
+    compressed sparse row index and the tree is searched a level at a time.
+    Nodes the source cannot reach are at distance inf.
+    """
+    tails = np.asarray(tails, dtype=np.int64)
+    heads = np.asarray(heads, dtype=np.int64)
+    weights = np.asarray(weights)
+    offsets, children = csr(n, tails, np.arange(len(tails)))
+    distances = np.zeros(n, dtype=weights.dtype)
+    reached = np.zeros(n, dtype=bool)
+    reached[source] = True
+    level = np.array([source])
+    while len(level):
+        counts = offsets[level + 1] - offsets[level]
+        # Positions in children of the arcs out of every node in the level
+        starts = np.repeat(offsets[level] - np.cumsum(counts) + counts, counts)
+        arcs = children[starts + np.arange(counts.sum())]
+        level = heads[arcs]
+        distances[level] = distances[tails[arcs]] + weights[arcs]
+        reached[level] = True
+    if not reached.all():
+        distances = distances.astype(float)
+        distances[~reached] = np.inf
     return distances
 
 
+def bfs_depth(offsets, heads, source, block_size=1 << 20):
+    """
+    Depths from source, the fewest arcs on a path to each node, of a graph
+    held as offsets and heads in compressed sparse row form, with -1 for nodes
+    the source cannot reach. heads may be memory mapped, the arcs out of a
+    level are read in blocks of about block_size.
+    """
+    n = len(offsets) - 1
+    depths = np.full(n, -1, dtype=np.int64)
+    depths[source] = 0
+    level, depth = np.array([source]), 0
+    while len(level):
+        depth += 1
+        counts = offsets[level + 1] - offsets[level]
+        ends = np.cumsum(counts)
+        reached = []
+        start = 0
+        while start < len(level):
+            stop = max(start + 1, int(np.searchsorted(ends, ends[start] - counts[start] + block_size, "right")))
+            block, block_counts = level[start:stop], counts[start:stop]
+            positions = np.repeat(offsets[block] - np.cumsum(block_counts) + block_counts, block_counts)
+            v = np.asarray(heads[positions + np.arange(block_counts.sum())])
+            v = np.unique(v[depths[v] < 0])
+            depths[v] = depth
+            reached.append(v)
+            start = stop
+        level = np.concatenate(reached)
+    return depths
+
+
 def bellman_ford(graph, source, unit_weight=True):
     distances = defaultdict(lambda: float("inf"))
     distances[source] = 0
@@ -0,0 +1,124 @@
+"""
+Checks that an instance has the shortest path distances it claims to.
+
+Distances d are the shortest path distances from the source exactly when
+d[source] is 0, every reduced cost w + d[u] - d[v] is non-negative and every
+node is reached through arcs whose reduced cost is 0. The generator returns the
+tree it built, so certifying its distances is one vectorised pass over the
+arcs. Instances read from file carry no distances, so they are solved with a
+queue based Bellman-Ford (SPFA) that also detects negative cycles.
+"""
+from typing import NamedTuple, Optional
+import numpy as np
+from strong_graphs.formats import Instance
+from strong_graphs.solvers import fifo_bellman_ford
+from strong_graphs.utils import csr
+
+__all__ = ["Verification", "certify_distances", "spfa", "verify_instance"]
+
+
+class Verification(NamedTuple):
+    nodes: int
+    arcs: int
+    source_distance: float
+    negative_cycle: bool
+    unreachable: int  # nodes at infinite distance from the source
+    violated_arcs: int  # arcs with a negative reduced cost
+    loose_tree_arcs: int  # tree arcs with a reduced cost other than 0
+    worst_reduced_cost: Optional[float]
+
+    @property
+    def ok(self):
+        return self.source_distance == 0 and not (
+            self.negative_cycle or self.unreachable or self.violated_arcs or self.loose_tree_arcs
+        )
+
+
+def spfa(offsets, heads, weights, source):
+    """
+    Shortest path distances from source with the queue based Bellman-Ford
+    algorithm, strong_graphs.solvers.fifo_bellman_ford. Returns the distances
+    and whether a negative cycle was found, in which case the distances are
+    not final.
+    """
+    result = fifo_bellman_ford(offsets, heads, weights, source)
+    return result.distances, result.negative_cycle
+
+
+def certify_distances(tails, heads, weights, distances, tree=None, tolerance=None):
+    """
+    The number of arcs with a negative reduced cost, of tree arcs (given as a
+    boolean mask over the arcs) with a reduced cost other than 0, and the most
+    negative reduced cost. Arcs into or out of unreachable nodes are ignored.
+    Floating point weights are compared with a tolerance relative to the
+    largest distance.
+    """
+    distances = np.asarray(distances)
+    weights = np.asarray(weights)
+    if tolerance is None and weights.dtype.kind == distances.dtype.kind == "i":
+        tolerance = 0
+    elif tolerance is None:
+        finite = distances[np.isfinite(distances)]
+        tolerance = 1e-9 * max(1.0, float(np.abs(finite).max()) if len(finite) else 0.0)
+    d_u, d_v = distances[tails], distances[heads]
+    reachable = np.isfinite(d_u) & np.isfinite(d_v)
+    reduced = weights[reachable] + d_u[reachable] - d_v[reachable]
+    violated = int(np.count_nonzero(reduced < -tolerance))
+    loose = 0
+    if tree is not None:
+        loose = int(np.count_nonzero(np.abs(reduced[tree[reachable]]) > tolerance))
+    worst = reduced.min().item() if len(reduced) else None
+    return violated, loose, worst
+
+
+def graph_columns(graph):
+    """Arc columns of a network or Instance, with nodes numbered from 0"""
+    if isinstance(graph, Instance):
+        n = graph.header["nodes"]
+        nodes = np.arange(1, n + 1)
+        tails, heads, weights = graph.tails, graph.heads, graph.weights
+    else:
+        nodes = np.array(list(graph.nodes()), dtype=np.int64)
+        n = len(nodes)
+        tails, heads, weights = (np.asarray(x) for x in graph.arc_columns())
+    sorter = np.argsort(nodes)
+
+    def positions(labels):
+        return sorter[np.searchsorted(nodes, labels, sorter=sorter)]
+
+    return n, nodes, positions, positions(tails), positions(heads), np.asarray(weights)
+
+
+def verify_instance(graph, source=None, distances=None, tree_arcs=None):
+    """
+    Verifies a network, or an Instance read from file, from its source.
+
+    If `distances`, a mapping or array over the nodes, are given they are
+    certified against the arcs, and any `tree_arcs` must be tight. Otherwise
+    the distances are found with SPFA, which fails on a negative cycle.
+    """
+    n, nodes, positions, tails, heads, weights = graph_columns(graph)
+    if source is None:
+        source = graph.header["source"]
+    s = int(positions(np.array([source]))[0])
+    negative_cycle = False
+    if distances is None:
+        distances, negative_cycle = spfa(*csr(n, tails, heads, weights), s)
+    elif not isinstance(distances, np.ndarray):
+        distances = np.array([distances[u] for u in nodes.tolist()])
+    tree = None
+    if tree_arcs is not None:
+        tree_arcs = np.array(list(tree_arcs), dtype=np.int64).reshape(-1, 2)
+        tree_keys = positions(tree_arcs[:, 0]) * n + positions(tree_arcs[:, 1])
+        tree = np.isin(tails * n + heads, tree_keys)
+    violated, loose, worst = certify_distances(tails, heads, weights, distances, tree)
+    return Verification(
+        nodes=n,
+        arcs=len(tails),
+        source_distance=distances[s].item(),
+        negative_cycle=negative_cycle,
+        unreachable=int(np.count_nonzero(~np.isfinite(distances))),
+        violated_arcs=violated,
+        loose_tree_arcs=loose,
+        worst_reduced_cost=worst,
+    )
@@ -0,0 +1,44 @@
+import numpy as np
+from hypothesis import given
+import hypothesis.strategies as st
+from strong_graphs.arc_generators import (
+    determine_predecessor_vacancies,
+    distribute_batched,
+)
+from strong_graphs.data_structure import Network
+
+
+@given(
+    st.lists(st.integers(min_value=0, max_value=1000), min_size=1),
+    st.floats(min_value=0, max_value=1),
+    st.integers(min_value=0),
+)
+def test_distribute_batched(capacity, fraction, seed):
+    quantity = round(fraction * sum(capacity))
+    allocation = distribute_batched(np.random.default_rng(seed), capacity, quantity)
+    assert allocation.sum() == quantity
+    assert np.all((0 <= allocation) & (allocation <= capacity))
+
+
+def test_distribute_batched_expects_equal_shares_capped_at_capacity():
+    """Choices expect an equal share of what the full ones leave, here 45"""
+    capacity, quantity = [20, 60, 100, 100, 300], 200
+    rng = np.random.default_rng(0)
+    allocations = np.array([distribute_batched(rng, capacity, quantity) for _ in range(4000)])
+    assert np.allclose(allocations.mean(axis=0), [20, 45, 45, 45, 45], rtol=0.05)
+    assert np.all(allocations[:, 1:].std(axis=0) > 2)  # drawn, not just the share
+
+
+@given(st.integers(min_value=2, max_value=20), st.data())
+def test_vacancies_count_missing_arcs(n, data):
+    order = data.draw(st.permutations(range(n)))
+    network = Network(nodes=range(n))
+    for u, v in data.draw(st.sets(st.tuples(st.integers(0, n - 1), st.integers(0, n - 1)))):
+        if u != v:
+            network.add_arc(u, v)
+    vacancies = determine_predecessor_vacancies(network, order)
+    pos = {v: i for i, v in enumerate(order)}
+    for v in range(n):
+        left = sum(1 for u in range(n) if pos[u] > pos[v] and not network.has_arc(u, v))
+        right = sum(1 for u in range(n) if pos[u] < pos[v] and not network.has_arc(u, v))
+        assert (vacancies["<-"][v], vacancies["->"][v]) == (left, right)
@@ -0,0 +1,20 @@
+from strong_graphs.batch import Job, jobs_from_ranges, read_manifest, run_batch
+from strong_graphs.generator import generate_instance
+
+
+def test_batch_matches_single_instance(tmp_path):
+    jobs = jobs_from_ranges([200], range(2)) + [Job(300, 2, False, False)]
+    batch_dir, single_dir = tmp_path / "batch", tmp_path / "single"
+    single_dir.mkdir()
+    run_batch(jobs, output_dir=str(batch_dir), workers=2, report=lambda _: None)
+    for job in jobs:
+        generate_instance(*job, output_dir=f"{single_dir}/")
+    for path in single_dir.iterdir():
+        assert (batch_dir / path.name).read_bytes() == path.read_bytes()
+    assert len(list(batch_dir.iterdir())) == len(jobs)
+
+
+def test_read_manifest(tmp_path):
+    manifest = tmp_path / "manifest"
+    manifest.write_text("# m s is_non_neg is_int\n100 1\n\n200, 2, true, false\n")
+    assert read_manifest(manifest) == [Job(100, 1), Job(200, 2, True, False)]
@@ -0,0 +1,88 @@
+import threading
+import numpy as np
+import pytest
+import strong_graphs.cache
+from strong_graphs.batch import jobs_from_ranges, run_batch
+from strong_graphs.cache import InstanceCache, cache_key
+from strong_graphs.generator import generate_instance
+
+
+@pytest.mark.parametrize("file_format, suffix", [("dimacs", ""), ("binary", ".bin")])
+def test_cached_output_matches_generated(tmp_path, monkeypatch, file_format, suffix):
+    cache = InstanceCache(tmp_path / "cache")
+    for directory in ("generated", "miss", "hit"):
+        (tmp_path / directory).mkdir()
+    generate_instance(300, 3, False, False, output_dir=f"{tmp_path}/generated/", file_format=file_format)
+    n = generate_instance(300, 3, False, False, output_dir=f"{tmp_path}/miss/", file_format=file_format, cache=cache)
+    monkeypatch.setattr(strong_graphs.cache, "generate_instance", None)  # A hit must not generate
+    assert generate_instance(300, 3, False, False, output_dir=f"{tmp_path}/hit/", file_format=file_format, cache=cache) == n
+    expected = (tmp_path / "generated" / f"strong-graph-300-3{suffix}").read_bytes()
+    assert (tmp_path / "miss" / f"strong-graph-300-3{suffix}").read_bytes() == expected
+    assert (tmp_path / "hit" / f"strong-graph-300-3{suffix}").read_bytes() == expected
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+@pytest.mark.parametrize("engine", ["numpy", "parallel"])
+def test_cached_output_uses_engine(tmp_path, engine):
+    cache = InstanceCache(tmp_path / "cache")
+    for directory in ("generated", "cached", "python"):
+        (tmp_path / directory).mkdir()
+    generate_instance(2000, 5, False, True, output_dir=f"{tmp_path}/generated/", engine=engine, workers=2)
+    generate_instance(2000, 5, False, True, output_dir=f"{tmp_path}/cached/", cache=cache, engine=engine, workers=2)
+    generate_instance(2000, 5, False, True, output_dir=f"{tmp_path}/python/", cache=cache)
+    expected = (tmp_path / "generated" / "strong-graph-2000-5").read_bytes()
+    assert (tmp_path / "cached" / "strong-graph-2000-5").read_bytes() == expected
+    assert (tmp_path / "python" / "strong-graph-2000-5").read_bytes() != expected
+    assert cache.stats()["entries"] == 2
+    with pytest.raises(ValueError):
+        generate_instance(2000, 5, False, True, cache=cache, out_of_core=True)
+
+
+def test_instance_for_solver(tmp_path):
+    cache = InstanceCache(tmp_path)
+    instance = cache.instance(200, 1, True, True, verify=True)
+    again = cache.instance(200, 1, True, True, verify=True)
+    assert instance.header == again.header
+    assert all(np.array_equal(x, y) for x, y in zip(instance[1:], again[1:]))
+    assert cache_key(200, 1, True, True) != cache_key(200, 1, True, False)
+    assert cache_key(200, 1, True, True) != cache_key(200, 1, True, True, "numpy")
+
+
+def test_entries_lock_only_their_own_key(tmp_path):
+    cache = InstanceCache(tmp_path)
+    keys = {}
+    s = next(s for s in range(10 ** 4) if keys.setdefault(cache_key(200, s, False, True)[:2], s) != s)
+    with cache.entry(200, keys[cache_key(200, s, False, True)[:2]], False, True):
+        miss = threading.Thread(target=cache.instance, args=(200, s, False, True))
+        miss.start()
+        miss.join(timeout=60)
+        assert not miss.is_alive()
+    assert cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = InstanceCache(tmp_path)
+    for s in range(3):
+        cache.instance(200, s, False, True)
+    cache.instance(200, 0, False, True)  # 0 is now more recent than 1 and 2
+    cache.instance(200, 3, False, True)
+    sizes = {path: size for _, size, path in cache.entries()}
+    kept = [cache.path(cache_key(200, s, False, True)) for s in (0, 3)]
+    cache.max_bytes = sum(sizes[path] for path in kept)
+    cache.evict()
+    assert [path for _, _, path in cache.entries()] == kept
+    assert cache.stats()["evictions"] == 2
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+def test_batch_shares_cache(tmp_path):
+    cache = InstanceCache(tmp_path / "cache")
+    jobs = jobs_from_ranges([200], range(3))
+    for directory in ("first", "second"):
+        run_batch(jobs + jobs[:1], output_dir=str(tmp_path / directory), workers=2, report=lambda _: None, cache=cache)
+    for path in (tmp_path / "first").iterdir():
+        assert (tmp_path / "second" / path.name).read_bytes() == path.read_bytes()
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["hits"] + stats["misses"] == 8
@@ -0,0 +1,141 @@
+import random
+from functools import partial
+import pytest
+from hypothesis import given
+import hypothesis.strategies as st
+from sortedcontainers import SortedSet
+from strong_graphs.data_structure import Network, CompactNetwork, NodeSet
+from strong_graphs.generator import build_instance
+from strong_graphs.mapping import map_graph
+from strong_graphs.utils import nb_arcs_from_density, take_closest
+from strong_graphs.verify import verify_instance
+
+
+@given(
+    st.integers(min_value=2, max_value=30),
+    st.lists(st.tuples(st.integers(0, 29), st.integers(0, 29), st.integers(-9, 9))),
+)
+def test_compact_network_matches_network(n, arcs):
+    network, compact = Network(nodes=range(n)), CompactNetwork(nodes=range(n))
+    compact.min_pending = 4  # Force the index to be rebuilt repeatedly
+    for u, v, w in arcs:
+        if u < n and v < n and u != v and not network.has_arc(u, v):
+            assert not compact.has_arc(u, v)
+            network.add_arc(u, v, w)
+            compact.add_arc(u, v, w)
+            assert compact.has_arc(u, v)
+    assert compact.number_of_arcs() == network.number_of_arcs()
+    assert set(compact.arcs()) == set(network.arcs())
+    for node in range(n):
+        assert set(compact.successors(node)) == set(network.successors(node))
+        assert set(compact.predecessors(node)) == set(network.predecessors(node))
+        assert compact.out_degree(node) == network.out_degree(node)
+
+
+def test_compact_network_non_contiguous_nodes():
+    compact = CompactNetwork(nodes=range(3))
+    compact.add_arc(0, 1, 5)
+    compact.add_node(-1)
+    compact.add_arc(-1, 2, 0)
+    assert compact.has_arc(-1, 2) and not compact.has_arc(2, -1)
+    assert list(compact.successors(-1)) == [(2, 0)]
+    assert compact.out_degree(-1) == 1
+
+
+def test_compact_network_pending_arcs_are_a_fraction_of_the_index():
+    ξ = random.Random(1)
+    n = 100
+    compact = CompactNetwork(nodes=range(n))
+    compact.min_pending = 16
+    arcs = set()
+    while len(arcs) < 2000:
+        u, v = ξ.sample(range(n), 2)
+        if (u, v) not in arcs:
+            assert not compact.has_arc(u, v)
+            compact.add_arc(u, v, 1)
+            arcs.add((u, v))
+            indexed = compact._index["arcs"] if compact._index is not None else 0
+            assert len(compact._pending) <= max(16, indexed // 4)
+    tails, heads = zip(*ξ.sample(sorted(set((u, v) for u in range(n) for v in range(n) if u != v) - arcs), 50))
+    compact.add_arcs(tails, heads, [2] * 50)
+    assert all(compact.has_arc(u, v) for u, v in arcs | set(zip(tails, heads)))
+    assert compact.number_of_arcs() == 2050
+
+
+@pytest.mark.parametrize("network_type", [Network, CompactNetwork])
+def test_relabel_matches_map_graph(network_type):
+    ξ = random.Random(2)
+    n = 40
+    network = network_type(nodes=range(n))
+    for _ in range(200):
+        u, v = ξ.sample(range(n), 2)
+        if not network.has_arc(u, v):
+            network.add_arc(u, v, ξ.randint(-9, 9))
+    permutation = list(range(n))
+    ξ.shuffle(permutation)
+    mapping = dict(enumerate(permutation))
+    copy = map_graph(network, mapping)
+    network.relabel(mapping)
+    assert list(network.nodes()) == list(copy.nodes())
+    assert list(network.arcs()) == list(copy.arcs())
+    for node in range(n):
+        assert list(network.successors(node)) == list(copy.successors(node))
+        assert list(network.predecessors(node)) == list(copy.predecessors(node))
+    assert all(network.has_arc(u, v) for u, v, _ in copy.arcs())
+
+
+@pytest.mark.parametrize("network_type", [Network, CompactNetwork])
+def test_normalise_in_place_keeps_distances_optimal(network_type):
+    n = 40
+    D = partial(random.Random.uniform, a=-100, b=100)
+    network, tree_arcs, distances, _, source = build_instance(
+        random.Random(4), n, nb_arcs_from_density(n, 0.3), 0.5, D, network_type=network_type
+    )
+    arcs = list(network.arcs())
+    divisor = network.normalise()
+    assert divisor == min(abs(w) for _, _, w in arcs if w != 0)
+    copy = network_type(nodes=network.nodes())
+    for u, v, w in arcs:
+        copy.add_arc(u, v, w / divisor)
+    assert list(network.arcs()) == list(copy.arcs())
+    assert min(abs(w) for _, _, w in network.arcs() if w != 0) == 1
+    for u, v, w in network.arcs():
+        assert (v, w) in set(network.successors(u)) and (u, w) in set(network.predecessors(v))
+    distances = {u: x / divisor for u, x in distances.items()}
+    assert verify_instance(network, source, distances, tree_arcs).ok
+
+
+@pytest.mark.parametrize("n, d, r, s", [(20, 0.25, 0.5, 1), (50, 1, 0.9, 3)])
+@pytest.mark.parametrize("b", [2, 10 ** 9])
+def test_build_instance_with_compact_network(n, d, r, s, b):
+    """Both classes give the same instance, also with a narrow weight range
+    where many distances tie."""
+    m = nb_arcs_from_density(n, d)
+    instances = []
+    for network_type in (Network, CompactNetwork):
+        ξ = random.Random(s)
+        D = partial(random.Random.randint, a=-b, b=b)
+        instances.append(build_instance(ξ, n, m, r, D, network_type=network_type))
+    (net1, *rest1), (net2, *rest2) = instances
+    assert isinstance(net2, CompactNetwork)
+    assert set(net1.arcs()) == set(net2.arcs())
+    assert rest1 == rest2
+
+
+@given(
+    st.integers(min_value=1, max_value=5000),
+    st.lists(st.tuples(st.booleans(), st.floats(0, 1))),
+)
+def test_node_set_matches_sorted_set(n, operations):
+    nodes, sorted_nodes = NodeSet(n, [0]), SortedSet([0])
+    for is_add, x in operations:
+        y = int(x * (n - 1))
+        if is_add:
+            nodes.add(y)
+            sorted_nodes.add(y)
+        elif len(sorted_nodes) > 1:
+            nodes.discard(y)
+            sorted_nodes.discard(y)
+        assert len(nodes) == len(sorted_nodes)
+        assert nodes.closest(x * n) == take_closest(sorted_nodes, x * n)
+    assert list(nodes) == list(sorted_nodes)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from strong_graphs.data_structure import Network
+from strong_graphs.external import generate_out_of_core
+from strong_graphs.formats import read_instance
+from strong_graphs.generator import generate_instance
+from strong_graphs.utils import bellman_ford, bfs_depth
+
+
+def arcs(instance):
+    return sorted(zip(*(x.tolist() for x in instance[1:])))
+
+
+@pytest.mark.parametrize(
+    "m, s, is_int, file_format",
+    [(300, 1, True, "dimacs"), (1000, 2, False, "dimacs"), (2000, 3, True, "binary"), (800, 4, False, "binary")],
+)
+def test_out_of_core_matches_in_memory(tmp_path, m, s, is_int, file_format):
+    name = f"strong-graph-{m}-{s}" + (".bin" if file_format == "binary" else "")
+    for directory in ("memory", "disk"):
+        (tmp_path / directory).mkdir()
+    generate_instance(m, s, False, is_int, output_dir=f"{tmp_path}/memory/", file_format=file_format)
+    for verify in (True, False):
+        generate_out_of_core(
+            m, s, False, is_int, output_dir=f"{tmp_path}/disk/", file_format=file_format,
+            verify=verify, temp_dir=tmp_path, bucket_arcs=100,
+        )
+        memory, disk = read_instance(tmp_path / "memory" / name), read_instance(tmp_path / "disk" / name)
+        assert arcs(memory) == arcs(disk)
+    assert not np.array_equal(memory.tails, disk.tails)  # The arcs are shuffled differently
+    for key in ("title", "nodes", "arcs", "source", "weight_dtype", "parameters"):
+        assert memory.header[key] == disk.header[key]
+    for key, value in memory.header["features"].items():
+        assert disk.header["features"][key] == pytest.approx(value, rel=1e-12)
+    assert {path.name for path in tmp_path.iterdir()} == {"memory", "disk"}  # Spool removed
+
+
+@pytest.mark.parametrize("engine", ["numpy", "parallel", "dense"])
+def test_out_of_core_uses_engine(tmp_path, engine):
+    for directory in ("memory", "disk"):
+        (tmp_path / directory).mkdir()
+    m = 3000
+    generate_instance(m, 6, False, False, output_dir=f"{tmp_path}/memory/", engine=engine, workers=2)
+    generate_out_of_core(m, 6, False, False, output_dir=f"{tmp_path}/disk/", temp_dir=tmp_path, engine=engine, workers=2)
+    name = f"strong-graph-{m}-6"
+    assert arcs(read_instance(tmp_path / "memory" / name)) == arcs(read_instance(tmp_path / "disk" / name))
+
+
+def test_bfs_depth_matches_bellman_ford():
+    network = Network(nodes=range(30))
+    for u in range(30):
+        for v in (u * 7 % 30, (u + 1) % 30, u * u % 30):
+            if u != v and not network.has_arc(u, v) and v != 25:
+                network.add_arc(u, v, 1)
+    tails, heads, _ = (np.array(x) for x in network.arc_columns())
+    order = np.argsort(tails, kind="stable")
+    offsets = np.zeros(31, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=30), out=offsets[1:])
+    for block_size in (1, 4, 1 << 20):
+        depths = bfs_depth(offsets, heads[order], 0, block_size)
+        expected = bellman_ford(network, 0, unit_weight=True)
+        assert depths.tolist() == [expected.get(u, -1) for u in range(30)]
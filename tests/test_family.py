@@ -0,0 +1,59 @@
+import random
+from functools import partial
+import pytest
+from strong_graphs.family import generate_family, grow_family, with_source
+from strong_graphs.formats import read_binary
+from strong_graphs.utils import bellman_ford
+from strong_graphs.verify import verify_instance
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy", "parallel"])
+def test_grown_instances_keep_their_distances(engine):
+    D = partial(random.Random.randint, a=-100, b=100)
+    ms = [60, 200, 900, 1500]
+    previous = set()
+    for m, (network, tree_arcs, distances, _, source) in zip(
+        ms, grow_family(random.Random(4), ms, 40, 0.5, D, engine=engine, workers=1)
+    ):
+        arcs = set(network.arcs())
+        assert network.number_of_arcs() == len(arcs) >= m
+        assert previous < arcs
+        assert verify_instance(network, source, distances, tree_arcs).ok
+        assert bellman_ford(network, source, unit_weight=False) == distances
+        previous = arcs
+
+
+@pytest.mark.parametrize("min_pending", [1, 1 << 16])
+def test_with_source_leaves_the_network_as_it_was(min_pending):
+    D = partial(random.Random.uniform, a=-100, b=100)
+    family = grow_family(random.Random(2), [60, 200], 40, 0.5, D)
+    network, *_ = next(family)
+    network.min_pending = min_pending  # 1 rebuilds the index with the source in it
+    nodes, arcs = list(network.nodes()), list(network.arcs())
+    with with_source(network, [3, 5, 8], 2.0) as level:
+        assert level.number_of_nodes() == 41 and level.out_degree(-1) == 3
+        expected = [(u, v, w / 2.0) for u, v, w in arcs] + [(-1, x, 0.0) for x in (3, 5, 8)]
+        assert list(zip(*level.arc_columns())) == expected
+    assert list(network.nodes()) == nodes and list(network.arcs()) == arcs
+    assert not network.has_arc(-1, 3) and all(network.has_arc(u, v) for u, v, _ in arcs)
+    network, tree_arcs, distances, _, source = next(family)
+    assert network.number_of_arcs() >= 200 and verify_instance(network, source, distances, tree_arcs).ok
+
+
+@pytest.mark.parametrize("s, is_int", [(0, True), (1, False)])
+def test_family_files_are_nested(tmp_path, s, is_int):
+    ms = [1000, 3000, 10000]
+    n = generate_family(ms[::-1], s, False, is_int, output_dir=f"{tmp_path}/", file_format="binary", verify=True)
+    previous = set()
+    for m in ms:
+        instance = read_binary(tmp_path / f"strong-graph-{m}-{s}.bin")
+        assert instance.header["parameters"]["n"] == n
+        assert verify_instance(instance).ok
+        arcs = set(zip(*(x.tolist() for x in instance[1:])))
+        assert len(arcs) == instance.header["arcs"] and previous < arcs
+        previous = arcs
+
+
+def test_family_too_wide():
+    with pytest.raises(ValueError):
+        generate_family([100, 10 ** 6], 0, False, True)
@@ -0,0 +1,46 @@
+import random
+from functools import partial
+import numpy as np
+import pytest
+from strong_graphs.data_structure import CompactNetwork, Network
+from strong_graphs.features import FeatureEngine, degree_histogram
+from strong_graphs.generator import build_instance
+from strong_graphs.utils import bellman_ford, nb_arcs_from_density
+
+
+def test_degree_histogram():
+    assert degree_histogram(np.array([0, 1, 2, 3, 4, 7, 8, 0])) == "0:2,1:1,2:2,4:2,8:1"
+
+
+@pytest.mark.parametrize("labels", [range(-1, 29), range(0, 3000, 100)])
+def test_max_depth_matches_bellman_ford(labels):
+    labels = list(labels)
+    ξ = random.Random(2)
+    network = Network(nodes=labels)
+    for _ in range(60):
+        u, v = ξ.sample(labels, 2)
+        if not network.has_arc(u, v):
+            network.add_arc(u, v, 1)
+    tails, heads, _ = (np.asarray(x) for x in network.arc_columns())
+    nodes = np.array(labels)
+    ξ.shuffle(nodes)
+    reached = bellman_ford(network, labels[0], unit_weight=True)
+    depth = FeatureEngine()(nodes, tails, heads, labels[0])["Max depth"]
+    assert depth == max(reached.values())
+
+
+def test_extra_features():
+    n = 50
+    D = partial(random.Random.randint, a=-100, b=100)
+    network, tree_arcs, distances, _, source = build_instance(
+        random.Random(3), n, nb_arcs_from_density(n, 0.2), 0.5, D, network_type=CompactNetwork
+    )
+    tails, heads, _ = (np.asarray(x) for x in network.arc_columns())
+    nodes = np.array(list(network.nodes()))
+    features = FeatureEngine(True, distances, tree_arcs)(nodes, tails, heads, source)
+    out_degrees = sum(int(x.split(":")[1]) for x in features["Out degree histogram"].split(","))
+    assert out_degrees == n
+    assert features["Distance levels"] == len(set(distances.values()))
+    # The tree is a shortest path tree of unit depth at least that of the graph
+    assert 1 <= features["Max depth"] <= features["Tree depth"] <= n - 1
+    assert FeatureEngine()(nodes, tails, heads, source) == {"Max depth": features["Max depth"]}
@@ -0,0 +1,84 @@
+import gzip
+import numpy as np
+import pytest
+from hypothesis import given
+import hypothesis.strategies as st
+from strong_graphs.data_structure import CompactNetwork
+from strong_graphs.formats import convert, dimacs_arc_bytes, dimacs_arc_chunks, dimacs_arcs, read_binary, read_dimacs
+from strong_graphs.generator import generate_instance
+
+
+@pytest.mark.parametrize("m, s, is_int", [(300, 1, True), (200, 4, False)])
+def test_binary_matches_dimacs(tmp_path, m, s, is_int):
+    generate_instance(m, s, False, is_int, output_dir=f"{tmp_path}/")
+    generate_instance(m, s, False, is_int, output_dir=f"{tmp_path}/", file_format="binary")
+    dimacs = tmp_path / f"strong-graph-{m}-{s}"
+    binary = read_binary(f"{dimacs}.bin")
+    text = read_dimacs(dimacs)
+    assert binary.header == text.header
+    for x, y in zip(binary[1:], text[1:]):
+        assert np.array_equal(x, y) and x.dtype == y.dtype
+    # Converting either way reproduces the other file exactly
+    convert(f"{dimacs}.bin", tmp_path / "converted")
+    assert (tmp_path / "converted").read_bytes() == dimacs.read_bytes()
+    convert(dimacs, tmp_path / "converted.bin")
+    assert (tmp_path / "converted.bin").read_bytes() == (tmp_path / f"{dimacs}.bin").read_bytes()
+
+
+def test_csr_and_network(tmp_path):
+    generate_instance(300, 2, False, True, output_dir=f"{tmp_path}/", file_format="binary")
+    instance = read_binary(tmp_path / "strong-graph-300-2.bin")
+    offsets, heads, weights = instance.csr()
+    network = instance.to_network(CompactNetwork)
+    assert network.number_of_arcs() == instance.header["arcs"] == offsets[-1]
+    for u in network.nodes():
+        arcs = zip(heads[offsets[u] : offsets[u + 1]].tolist(), weights[offsets[u] : offsets[u + 1]].tolist())
+        assert sorted(arcs) == sorted(network.successors(u))
+
+
+@given(
+    st.lists(
+        st.tuples(
+            st.integers(1, 2**62),
+            st.integers(1, 2**62),
+            st.one_of(st.integers(-(2**63) + 1, 2**63 - 1), st.floats(allow_nan=False)),
+        ),
+    )
+)
+def test_dimacs_arc_bytes_matches_dimacs_arcs(arcs):
+    tails, heads, weights = zip(*arcs) if arcs else ((), (), ())
+    ints = [w for w in weights if isinstance(w, int)]
+    floats = [float(w) for w in weights]
+    for weights in (ints, floats):
+        k = len(weights)
+        expected = dimacs_arcs(tails[:k], heads[:k], weights).encode()
+        assert dimacs_arc_bytes(
+            np.array(tails[:k], dtype=np.int64), np.array(heads[:k], dtype=np.int64),
+            np.array(weights, dtype=np.int64 if weights is ints else np.float64),
+        ) == expected
+
+
+@pytest.mark.parametrize("dtype", [np.int64, np.float64])
+def test_parallel_arc_chunks_through_shared_slots(dtype):
+    rng = np.random.default_rng(3)
+    chunks = [
+        (rng.integers(1, 100, k), rng.integers(1, 100, k), (rng.standard_normal(k) * 1000).astype(dtype))
+        for k in (7, 0, 30, 1, 12, 25, 3, 16, 40, 9)
+    ]
+    expected = b"".join(dimacs_arc_chunks(chunks))
+    assert b"".join(dimacs_arc_chunks(chunks, workers=2, slot_size=8)) == expected
+
+
+@pytest.mark.parametrize("is_int", [True, False])
+def test_parallel_and_compressed_output_match_serial(tmp_path, is_int, monkeypatch):
+    monkeypatch.setattr("strong_graphs.output.chunk_size", 64)
+    generate_instance(1000, 3, False, is_int, output_dir=f"{tmp_path}/")
+    expected = (tmp_path / "strong-graph-1000-3").read_bytes()
+    (tmp_path / "parallel").mkdir()
+    generate_instance(1000, 3, False, is_int, output_dir=f"{tmp_path}/parallel/", workers=2)
+    assert (tmp_path / "parallel" / "strong-graph-1000-3").read_bytes() == expected
+    generate_instance(1000, 3, False, is_int, output_dir=f"{tmp_path}/", compression="gzip")
+    compressed = (tmp_path / "strong-graph-1000-3.gz").read_bytes()
+    assert gzip.decompress(compressed) == expected
+    generate_instance(1000, 3, False, is_int, output_dir=f"{tmp_path}/", compression="gzip")
+    assert (tmp_path / "strong-graph-1000-3.gz").read_bytes() == compressed
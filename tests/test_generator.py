@@ -1,9 +1,13 @@
+import math
 import random
 from functools import partial
 import pytest
-from strong_graphs.generator import build_instance
+from strong_graphs import generator
+from strong_graphs.data_structure import CompactNetwork, Network
+from strong_graphs.generator import build_instance, dense_threshold
 from strong_graphs.negative import nb_neg_arcs
 from strong_graphs.utils import nb_arcs_from_density, bellman_ford
+from strong_graphs.verify import verify_instance
 from hypothesis import given
 import hypothesis.strategies as st
 from collections import defaultdict
@@ -24,9 +28,9 @@ def test_seed_consistency(n, d, r, D_):
         D = partial(random.Random.randint, a=D_[0], b=D_[1])
         instances.append(build_instance(ξ, n, m, r, D))
     (
-        (net1, tree1, dist1, map1),
-        (net2, tree2, dist2, map2),
-        (net3, tree3, dist3, _),
+        (net1, tree1, dist1, map1, _),
+        (net2, tree2, dist2, map2, _),
+        (net3, tree3, dist3, _, _),
     ) = instances
     # Same seed matches.
     assert net1 == net2 and tree1 == tree2 and dist1 == dist2 and map1 == map2
@@ -47,10 +51,43 @@ def test_generator(n, d, r, D_min, D_max):
     x = random.randint(0, 10)
     print(x)
     ξ = random.Random(x)
-    net, _, dist1, map1 = build_instance(ξ, n, m, r, D)
+    net, _, dist1, map1, source = build_instance(ξ, n, m, r, D)
     assert  m <= net.number_of_arcs() <= m+n-1
     nb_non_pos = sum(1 for u, v, w in net.arcs() if w <= 0)
     m_neg = nb_neg_arcs(n, d, r)
     assert nb_non_pos >= m_neg
-    true_distances = bellman_ford(net, map1[0] if map1 else 0)
+    true_distances = bellman_ford(net, source, unit_weight=False)
     assert true_distances == dist1
+
+
+@pytest.mark.parametrize("D_func", [random.Random.randint, random.Random.uniform])
+@pytest.mark.parametrize("n, d, r", [(20, 0.25, 0.5), (30, 1, 0.9), (30, 0, 0.5)])
+def test_numpy_engine(n, d, r, D_func):
+    """The numpy engine is reproducible for a seed and its distances are optimal"""
+    m = nb_arcs_from_density(n, d)
+    D = partial(D_func, a=-100, b=100)
+    instances = [build_instance(random.Random(7), n, m, r, D, engine="numpy") for _ in range(2)]
+    (net1, tree1, dist1, map1, source), (net2, tree2, dist2, map2, _) = instances
+    assert net1 == net2 and tree1 == tree2 and dist1 == dist2 and map1 == map2
+    assert m <= net1.number_of_arcs() <= m + n - 1
+    true_distances = bellman_ford(net1, source, unit_weight=False)
+    assert all(math.isclose(true_distances[u], dist1[u], abs_tol=1e-6) for u in dist1)
+
+
+@pytest.mark.parametrize("network_type", [Network, CompactNetwork])
+@pytest.mark.parametrize("n, d, r", [(30, 1, 0.9), (40, 0.7, 0.5), (25, 0.3, 0)])
+def test_dense_engine(n, d, r, network_type, monkeypatch):
+    """Complement sampling gives exactly m arcs, none repeated, that the distances
+    certify, and is what the numpy engine, but not the python one, switches to
+    for dense instances"""
+    m = nb_arcs_from_density(n, d)
+    D = partial(random.Random.randint, a=-100, b=100)
+    net, tree, dist, _, source = build_instance(random.Random(3), n, m, r, D, network_type, engine="dense")
+    assert net.number_of_arcs() == m == len(set((u, v) for u, v, _ in net.arcs()))
+    assert verify_instance(net, source, dist, tree).ok
+    if m >= dense_threshold * n * (n - 1):
+        python, numpy = (build_instance(random.Random(3), n, m, r, D, network_type, engine) for engine in ("python", "numpy"))
+        assert numpy[0].number_of_arcs() == m
+        monkeypatch.setattr(generator, "dense_threshold", 2)  # never switch
+        assert set(python[0].arcs()) == set(build_instance(random.Random(3), n, m, r, D, network_type)[0].arcs())
+        assert set(numpy[0].arcs()) != set(build_instance(random.Random(3), n, m, r, D, network_type, "numpy")[0].arcs())
@@ -0,0 +1,26 @@
+import csv
+from strong_graphs.batch import Job
+from strong_graphs.generator import generate_instance
+from strong_graphs.harness import run_harness
+
+
+def test_harness_table(tmp_path):
+    generate_instance(500, 1, False, True, output_dir=f"{tmp_path}/")
+    generate_instance(500, 2, True, False, output_dir=f"{tmp_path}/", file_format="binary")
+    results = tmp_path.parent / f"{tmp_path.name}.csv"
+    runs = run_harness([tmp_path, Job(800, 3), Job(800, 4, False, False)], workers=2, results=results, report=lambda x: None)
+    names = [
+        str(tmp_path / "strong-graph-500-1"),
+        str(tmp_path / "strong-graph-500-2.bin"),
+        "m=800 s=3 is_non_neg=False is_int=True",
+        "m=800 s=4 is_non_neg=False is_int=False",
+    ]
+    # No feasible potential is known for the first file, which has negative weights
+    expected = [(name, solver) for name in names for solver in ("fifo", "goldberg-radzik", "dijkstra")]
+    assert [(run.instance, run.solver) for run in runs] == expected[:2] + expected[3:]
+    assert all(run.correct and not run.negative_cycle for run in runs)
+    # With the distances of a Job as potential every node is scanned once
+    assert all(run.scans == run.nodes for run in runs[-4::3])
+    with open(results) as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == len(runs) and rows[0]["solver"] == runs[0].solver
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+import pytest
+
+core = [
+    "strong_graphs.generator",
+    "strong_graphs.arc_generators",
+    "strong_graphs.negative",
+    "strong_graphs.mapping",
+    "strong_graphs.utils",
+    "strong_graphs.output",
+    "strong_graphs.data_structure",
+]
+plotting = ["matplotlib", "seaborn", "networkx", "palettable", "scipy"]
+
+
+def imported_modules(statement):
+    """Modules loaded by a fresh interpreter after running `statement`"""
+    script = f"import sys\n{statement}\nprint('\\n'.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    return set(result.stdout.split())
+
+
+@pytest.mark.parametrize("module", core)
+def test_core_imports_no_plotting_stack(module):
+    modules = imported_modules(f"import {module}")
+    assert module in modules
+    loaded = {m.split(".")[0] for m in modules} & set(plotting)
+    assert not loaded, f"{module} imports {loaded}"
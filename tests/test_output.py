@@ -0,0 +1,40 @@
+import math
+import random
+import statistics
+from array import array
+from hypothesis import given
+import hypothesis.strategies as st
+from strong_graphs import output as output_module
+from strong_graphs.output import Moments, weight_statistics
+
+
+@given(st.lists(st.integers(min_value=-10**10, max_value=10**10), min_size=2))
+def test_moments_exact_for_integers(values):
+    moments = Moments()
+    for i in range(0, len(values), 3):
+        moments.update(values[i : i + 3])
+    assert moments.mean == statistics.mean(values)
+    assert moments.variance == statistics.variance(values)
+    assert (moments.min, moments.max) == (min(values), max(values))
+
+
+@given(st.lists(st.floats(min_value=-1e6, max_value=1e6), min_size=2))
+def test_moments_floats(values):
+    moments = Moments()
+    moments.update([0])
+    for i in range(0, len(values), 3):
+        moments.update(values[i : i + 3])
+    values = [0] + values
+    assert math.isclose(moments.mean, statistics.mean(values), rel_tol=1e-9, abs_tol=1e-6)
+    assert math.isclose(moments.variance, statistics.variance(values), rel_tol=1e-6, abs_tol=1e-6)
+
+
+def test_weight_statistics_across_chunks(monkeypatch):
+    monkeypatch.setattr(output_module, "chunk_size", 7)
+    ξ = random.Random(0)
+    weights = [ξ.randint(-5, 5) for _ in range(100)]
+    stats = weight_statistics(array("q", weights))
+    assert stats["negative"] == sum(1 for w in weights if w < 0)
+    assert stats["zero"] == weights.count(0)
+    assert stats["min_abs"] == min(abs(w) for w in weights if w != 0)
+    assert stats["abs"].variance == statistics.variance(abs(w) for w in weights)
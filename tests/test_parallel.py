@@ -0,0 +1,22 @@
+import random
+from functools import partial
+import pytest
+from strong_graphs.data_structure import CompactNetwork, Network
+from strong_graphs.generator import build_instance
+from strong_graphs.utils import nb_arcs_from_density
+from strong_graphs.verify import verify_instance
+
+
+@pytest.mark.parametrize("n, d, r, s", [(40, 0.3, 0.5, 1), (80, 1, 0.9, 2), (100, 0, 0, 3)])
+def test_parallel_is_independent_of_workers(n, d, r, s):
+    m = nb_arcs_from_density(n, d)
+    D = partial(random.Random.randint, a=-100, b=100)
+    instances = []
+    for workers, network_type in ((1, Network), (2, Network), (3, CompactNetwork)):
+        network, tree_arcs, distances, _, source = build_instance(
+            random.Random(s), n, m, r, D, network_type=network_type, engine="parallel", workers=workers
+        )
+        assert network.number_of_arcs() == m
+        assert verify_instance(network, source, distances, tree_arcs).ok
+        instances.append((sorted(network.arcs()), distances))
+    assert instances[0] == instances[1] == instances[2]
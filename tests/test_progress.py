@@ -0,0 +1,35 @@
+import random
+from functools import partial
+from strong_graphs.generator import build_instance
+from strong_graphs.progress import Progress
+from strong_graphs.utils import nb_arcs_from_density
+
+
+def test_quiet_stage_leaves_iterable_alone():
+    items = range(10)
+    with Progress(quiet=True).stage("Items") as stage:
+        assert stage.track(items) is items
+
+
+def test_stage_counts_in_batches():
+    progress = Progress(every=3, interval=0)
+    with progress.stage("Items", total=10) as stage:
+        assert list(stage.track(range(10))) == list(range(10))
+    assert stage.count == 10
+    assert progress.stages == [stage] and stage.seconds >= 0
+
+
+def test_build_instance_metrics():
+    n, d, r = 30, 0.5, 0.5
+    m = nb_arcs_from_density(n, d)
+    D = partial(random.Random.randint, a=-100, b=100)
+    quiet, shown = Progress(quiet=True), Progress(every=7)
+    net1, *_ = build_instance(random.Random(3), n, m, r, D, progress=quiet)
+    net2, *_ = build_instance(random.Random(3), n, m, r, D, progress=shown)
+    assert net1 == net2
+    for progress in (quiet, shown):
+        metrics = {x["stage"]: x for x in progress.metrics()}
+        arcs = sum(metrics[x]["count"] for x in ("Tree arcs", "Loop arcs", "Remaining arcs"))
+        assert arcs == net1.number_of_arcs()
+        assert "Vacancies" in metrics and "Distribute" in metrics
+        assert all(x["seconds"] >= 0 for x in metrics.values())
@@ -1,4 +1,24 @@
-import pytest
-import hypothesis
+import hypothesis.strategies as st
+import numpy as np
+from hypothesis import given
+from strong_graphs.utils import determine_order, radix_argsort
 
 
+def sorted_order(distances):
+    return [x[0] for x in sorted(distances.items(), key=lambda x: x[1])]
+
+
+@given(st.dictionaries(st.integers(0, 10**6), st.integers(-10**15, 10**15)))
+def test_determine_order_integers(distances):
+    assert determine_order(distances) == sorted_order(distances)
+
+
+@given(st.dictionaries(st.integers(0, 10**6), st.floats(-1e9, 1e9)))
+def test_determine_order_floats(distances):
+    assert determine_order(distances) == sorted_order(distances)
+
+
+@given(st.lists(st.integers(0, 2**63 - 1)))
+def test_radix_argsort(keys):
+    keys = np.array(keys, dtype=np.int64)
+    assert radix_argsort(keys).tolist() == np.argsort(keys, kind="stable").tolist()
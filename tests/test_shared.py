@@ -0,0 +1,83 @@
+import random
+import subprocess
+import sys
+from functools import partial
+from pathlib import Path
+import numpy as np
+import pytest
+from strong_graphs.data_structure import CompactNetwork
+from strong_graphs.generator import build_instance
+from strong_graphs.output import weight_statistics
+from strong_graphs.shared import SharedArcs, shared_weight_statistics
+from strong_graphs.utils import nb_arcs_from_density
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.parametrize("D_func", [random.Random.randint, random.Random.uniform])
+def test_shared_weight_statistics(D_func, monkeypatch):
+    n = 60
+    network, *_ = build_instance(
+        random.Random(4), n, nb_arcs_from_density(n, 0.5), 0.5, partial(D_func, a=-50, b=50),
+        network_type=CompactNetwork,
+    )
+    monkeypatch.setattr("strong_graphs.output.chunk_size", 100)
+    expected = weight_statistics(network.arc_columns()[2])
+    with SharedArcs.from_network(network) as arcs:
+        stats = shared_weight_statistics(arcs, workers=2, ranges=5, chunk_size=100)
+    for key in ("negative", "zero", "min_abs"):
+        assert stats[key] == expected[key]
+    for key in ("weight", "abs"):
+        for moment in ("count", "min", "max", "mean", "variance"):
+            assert getattr(stats[key], moment) == getattr(expected[key], moment)
+        assert stats[key].exact == (D_func is random.Random.randint)
+
+
+def test_owner_frees_segment():
+    with SharedArcs.create(10) as arcs:
+        handle = arcs.handle
+        attached = SharedArcs.attach(handle)
+        attached.tails[:] = range(10)
+        attached.close()
+        assert arcs.tails.tolist() == list(range(10))
+    with pytest.raises(FileNotFoundError):
+        SharedArcs.attach(handle)
+
+
+def test_weights_only_segment():
+    with SharedArcs.create(10, np.float64, weights_only=True) as arcs:
+        attached = SharedArcs.attach(arcs.handle)
+        assert attached.tails is None and attached.heads is None
+        attached.weights[:] = np.arange(10) / 2
+        attached.close()
+        assert arcs.weights.tolist() == [i / 2 for i in range(10)]
+
+
+def test_attach_from_a_pool_started_before_the_segment():
+    """Workers forked before any segment existed start resource trackers of
+    their own, which must not unlink the segment when the workers exit"""
+    script = """
+from concurrent.futures import ProcessPoolExecutor
+from strong_graphs.shared import SharedArcs
+
+def total(handle):
+    arcs = SharedArcs.attach(handle)
+    try:
+        return int(arcs.weights.sum())
+    finally:
+        arcs.close()
+
+if __name__ == "__main__":
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        pool.submit(int).result()
+        with SharedArcs.create(10) as arcs:
+            arcs.weights[:] = range(10)
+            assert list(pool.map(total, [arcs.handle] * 2)) == [45, 45]
+            pool.shutdown()
+            attached = SharedArcs.attach(arcs.handle)  # not unlinked by the workers
+            assert attached.weights.sum() == 45
+            attached.close()
+"""
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, cwd=ROOT)
+    assert result.returncode == 0, result.stderr
+    assert "resource_tracker" not in result.stderr
@@ -0,0 +1,44 @@
+import random
+from functools import partial
+import numpy as np
+import pytest
+from strong_graphs.data_structure import Network
+from strong_graphs.generator import build_instance
+from strong_graphs.solvers import dijkstra_potential, solvers
+from strong_graphs.utils import csr, nb_arcs_from_density
+from strong_graphs.verify import graph_columns
+
+
+def arrays(network):
+    n, nodes, _, tails, heads, weights = graph_columns(network)
+    return nodes, csr(n, tails, heads, weights)
+
+
+@pytest.mark.parametrize("name", sorted(solvers))
+@pytest.mark.parametrize("n, d, r, D_func", [(40, 0.2, 0.5, random.Random.randint), (30, 0.8, 0.9, random.Random.uniform)])
+def test_solvers_find_the_distances(name, n, d, r, D_func):
+    D = partial(D_func, a=-100, b=100)
+    network, _, distances, _, source = build_instance(random.Random(5), n, nb_arcs_from_density(n, d), r, D)
+    nodes, columns = arrays(network)
+    result = solvers[name](*columns, int(np.flatnonzero(nodes == source)[0]))
+    assert not result.negative_cycle
+    assert np.allclose(result.distances, [distances[u] for u in nodes.tolist()], rtol=0, atol=1e-9)
+    assert result.scans >= n and result.relaxations >= n - 1
+
+
+@pytest.mark.parametrize("name", sorted(solvers))
+def test_solvers_find_negative_cycles(name):
+    network = Network(nodes=range(4))
+    for u, v, w in [(0, 1, 1), (1, 2, -2), (2, 3, 0), (3, 1, 1), (2, 0, 5)]:
+        network.add_arc(u, v, w)
+    assert solvers[name](*arrays(network)[1], 0).negative_cycle
+
+
+def test_dijkstra_scans_once_with_feasible_potential():
+    D = partial(random.Random.randint, a=-100, b=100)
+    network, _, distances, _, source = build_instance(random.Random(2), 50, 600, 0.7, D)
+    nodes, columns = arrays(network)
+    potential = np.array([distances[u] for u in nodes.tolist()])
+    result = dijkstra_potential(*columns, int(np.flatnonzero(nodes == source)[0]), potential)
+    assert result.scans == 50
+    assert np.array_equal(result.distances, potential)
@@ -0,0 +1,60 @@
+import random
+from collections import defaultdict
+from hypothesis import given
+import hypothesis.strategies as st
+import numpy as np
+from strong_graphs.arc_generators import gen_tree_arcs
+from strong_graphs.data_structure import Network
+from strong_graphs.utils import bellman_ford, csr, label_positions, tree_distances, tree_order
+
+
+@given(st.integers(min_value=2, max_value=200), st.integers(min_value=0))
+def test_tree_distances(n, seed):
+    ξ = random.Random(seed)
+    tree = Network(nodes=range(n))
+    for u, v in gen_tree_arcs(ξ, n, 2 * n, 0):
+        tree.add_arc(u, v, ξ.randint(-10, 10))
+    source = ξ.randrange(n)
+    distances = tree_distances(n, *tree.arc_columns(), source)
+    expected = bellman_ford(tree, source, unit_weight=False)
+    assert distances.tolist() == [expected[u] for u in range(n)]
+
+
+@given(st.integers(min_value=2, max_value=200), st.integers(min_value=0))
+def test_tree_order_matches_set_based_search(n, seed):
+    """The order shortest_path of earlier releases keyed its distances in"""
+    ξ = random.Random(seed)
+    tree, arcs = Network(nodes=range(n)), []
+    for u, v in gen_tree_arcs(ξ, n, 2 * n, 0):
+        arcs.append((u, v, ξ.randint(-10, 10)))
+        tree.add_arc(*arcs[-1])
+    distances = defaultdict(int)
+    queue = set([0])
+    while queue:
+        u = queue.pop()
+        for v, w in tree.successors(u):
+            distances[v] = distances[u] + w
+            queue.add(v)
+    assert tree_order(arcs) == list(distances)
+
+
+@given(st.lists(st.integers(-10**6, 10**6), unique=True, min_size=1), st.integers(0, 1))
+def test_label_positions(labels, start):
+    """Near consecutive labels go through a table, spread out ones a binary search"""
+    nodes = np.array(labels, dtype=np.int64)
+    positions = label_positions(nodes, start)
+    assert positions(nodes).tolist() == list(range(start, start + len(nodes)))
+    consecutive = np.random.default_rng(len(labels)).permutation(len(labels)) - 1
+    positions = label_positions(consecutive, start)
+    assert positions(consecutive[::-1]).tolist() == list(range(start + len(labels) - 1, start - 1, -1))
+
+
+@given(st.lists(st.tuples(st.integers(0, 9), st.integers(0, 9))))
+def test_csr_keeps_the_order_of_arcs_out_of_each_node(arcs):
+    tails = np.array([u for u, _ in arcs], dtype=np.int64)
+    heads = np.array([v for _, v in arcs], dtype=np.int64)
+    offsets, csr_heads, ids = csr(10, tails, heads, np.arange(len(arcs)))
+    for u in range(10):
+        out = ids[offsets[u] : offsets[u + 1]].tolist()
+        assert out == [i for i, (t, _) in enumerate(arcs) if t == u]
+        assert csr_heads[offsets[u] : offsets[u + 1]].tolist() == [arcs[i][1] for i in out]
@@ -0,0 +1,45 @@
+import random
+from functools import partial
+import numpy as np
+import pytest
+from strong_graphs.data_structure import CompactNetwork, Network
+from strong_graphs.formats import read_instance
+from strong_graphs.generator import build_instance, generate_instance
+from strong_graphs.utils import bellman_ford, csr, nb_arcs_from_density
+from strong_graphs.verify import spfa, verify_instance
+
+
+@pytest.mark.parametrize("network_type", [Network, CompactNetwork])
+@pytest.mark.parametrize("D_func", [random.Random.randint, random.Random.uniform])
+def test_certifies_generated_instance(network_type, D_func):
+    n = 40
+    D = partial(D_func, a=-100, b=100)
+    network, tree_arcs, distances, _, source = build_instance(
+        random.Random(5), n, nb_arcs_from_density(n, 0.3), 0.5, D, network_type=network_type
+    )
+    assert verify_instance(network, source, distances, tree_arcs).ok
+    assert verify_instance(network, source).ok
+    # Too short a distance breaks the arcs out of a leaf, too long its tree arc
+    parents = {u for u, _ in tree_arcs}
+    u = next(v for v in distances if v != source and v not in parents)
+    distances[u] += 1
+    verification = verify_instance(network, source, distances, tree_arcs)
+    assert not verification.ok and verification.loose_tree_arcs == 1
+
+
+def test_spfa_matches_bellman_ford_and_finds_negative_cycles():
+    network = Network(nodes=range(4))
+    for u, v, w in [(0, 1, 4), (0, 2, 1), (2, 1, -2), (1, 3, 1), (3, 2, 5)]:
+        network.add_arc(u, v, w)
+    columns = [np.asarray(x) for x in network.arc_columns()]
+    distances, negative_cycle = spfa(*csr(4, *columns), 0)
+    expected = bellman_ford(network, 0, unit_weight=False)
+    assert not negative_cycle and distances.tolist() == [expected[u] for u in range(4)]
+    network.add_arc(3, 0, -3)  # 0 -> 2 -> 1 -> 3 -> 0 costs -3
+    columns = [np.asarray(x) for x in network.arc_columns()]
+    assert spfa(*csr(4, *columns), 0)[1]
+
+
+def test_verify_file(tmp_path):
+    generate_instance(500, 3, False, True, output_dir=f"{tmp_path}/", verify=True)
+    assert verify_instance(read_instance(tmp_path / "strong-graph-500-3")).ok